@@ -3,7 +3,7 @@ Script to add Holy Basil as an alternative name for Tulsi
 """
 import logging
 from app import app, db
-from models import Plant, PlantCategory, PlantImage, Benefit, plant_benefits
+from models import Plant, PlantCategory, PlantImage, Benefit, plant_benefits, get_or_create
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
@@ -11,21 +11,11 @@ logger = logging.getLogger(__name__)
 
 def get_or_create_category(name):
     """Get or create a plant category by name"""
-    category = PlantCategory.query.filter_by(name=name).first()
-    if not category:
-        category = PlantCategory(name=name)
-        db.session.add(category)
-        logger.info(f"Created new category: {name}")
-    return category
+    return get_or_create(PlantCategory, name)
 
 def get_or_create_benefit(name):
     """Get or create a benefit by name"""
-    benefit = Benefit.query.filter_by(name=name).first()
-    if not benefit:
-        benefit = Benefit(name=name)
-        db.session.add(benefit)
-        logger.info(f"Created new benefit: {name}")
-    return benefit
+    return get_or_create(Benefit, name)
 
 def add_holy_basil():
     """Add Holy Basil to the database"""
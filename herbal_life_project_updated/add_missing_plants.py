@@ -3,30 +3,12 @@ Script to add missing plants to the database
 """
 import logging
 from app import app, db
-from models import Plant, PlantCategory, PlantImage, Benefit, plant_benefits
+from bulk_loader import BulkLoader
 
 # logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
 logger = logging.getLogger(__name__)
 
-def get_or_create_category(name):
-    """Get or create a plant category by name"""
-    category = PlantCategory.query.filter_by(name=name).first()
-    if not category:
-        category = PlantCategory(name=name)
-        db.session.add(category)
-        logger.info(f"Created new category: {name}")
-    return category
-
-def get_or_create_benefit(name):
-    """Get or create a benefit by name"""
-    benefit = Benefit.query.filter_by(name=name).first()
-    if not benefit:
-        benefit = Benefit(name=name)
-        db.session.add(benefit)
-        logger.info(f"Created new benefit: {name}")
-    return benefit
-
 def add_missing_plants():
     """Add missing plants from the provided data"""
     with app.app_context():
@@ -93,45 +75,19 @@ def add_missing_plants():
             }
         ]
         
-        for plant_data in missing_plants:
-            # Check if plant already exists
-            existing_plant = Plant.query.filter_by(name=plant_data["name"]).first()
-            if existing_plant:
+        # Existing plants are skipped; categories and benefits are created as needed
+        loader = BulkLoader()
+        records = [dict(plant_data, category=plant_data["category_name"]) for plant_data in missing_plants]
+        # Look the names up first so add_plant() can tell which ones are new
+        loader.preload(plants=records)
+        for plant_data, record in zip(missing_plants, records):
+            if loader.add_plant(record):
+                logger.info(f"Adding new plant: {plant_data['name']}")
+            else:
                 logger.info(f"Plant already exists: {plant_data['name']}")
-                continue
-                
-            # Get or create category
-            category = get_or_create_category(plant_data["category_name"])
-            
-            # Create the plant
-            new_plant = Plant(
-                name=plant_data["name"],
-                scientific_name=plant_data["scientific_name"],
-                description=plant_data["description"],
-                usage=plant_data["usage"],
-                category_id=category.id
-            )
-            db.session.add(new_plant)
-            db.session.flush()  # Flush to get the plant ID
-            
-            # Add benefits
-            for benefit_name in plant_data["benefits"]:
-                benefit = get_or_create_benefit(benefit_name)
-                new_plant.benefits.append(benefit)
-            
-            # Add image
-            plant_image = PlantImage(
-                plant_id=new_plant.id,
-                url=plant_data["image_url"],
-                alt_text=f"{plant_data['name']} image",
-                is_primary=True
-            )
-            db.session.add(plant_image)
-            
-            logger.info(f"Added new plant: {plant_data['name']}")
         
         # Commit the changes
-        db.session.commit()
+        loader.commit()
         logger.info("Successfully added missing plants")
 
 if __name__ == "__main__":
@@ -1,18 +1,23 @@
 import os
 import logging
+import threading
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from flask_login import LoginManager
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+import json_provider
+import replicas
+
+# Set up logging; LOG_LEVEL=DEBUG for verbose output
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+# GET API views may route their reads to a replica (replicas.py)
+db = SQLAlchemy(model_class=Base, session_options={"class_": replicas.RoutingSession})
 login_manager = LoginManager()
 
 def create_app():
@@ -23,19 +28,57 @@ def create_app():
     # Configure the database
     # Use SQLite by default for local development, PostgreSQL for production
     db_url = os.environ.get("DATABASE_URL")
-    if db_url and db_url.startswith("postgres://"):
-        # Heroku provides DATABASE_URL in postgres:// format, but SQLAlchemy requires postgresql://
-        db_url = db_url.replace("postgres://", "postgresql://", 1)
+    if db_url:
+        if db_url.startswith("postgres://"):
+            # Heroku provides DATABASE_URL in postgres:// format, but SQLAlchemy requires postgresql://
+            db_url = db_url.replace("postgres://", "postgresql://", 1)
         app.config["SQLALCHEMY_DATABASE_URI"] = db_url
     else:
         # Use SQLite for local development (no external database needed)
         app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///herbal_life.db"
         app.logger.info("Using SQLite database for local development")
+    
+    # Read-only replicas for the GET API, comma-separated; writes always go to the primary
+    replica_urls = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    replica_urls = [url.replace("postgres://", "postgresql://", 1) if url.startswith("postgres://") else url
+                    for url in replica_urls]
+    if replica_urls:
+        app.config["SQLALCHEMY_BINDS"] = replicas.binds(replica_urls)
+    # Seconds a failed replica is skipped, and reads stay on the primary after a write
+    app.config["REPLICA_RETRY_SECONDS"] = int(os.environ.get("REPLICA_RETRY_SECONDS", 30))
+    app.config["READ_YOUR_WRITES_SECONDS"] = int(os.environ.get("READ_YOUR_WRITES_SECONDS", 10))
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "pool_recycle": 300,
         "pool_pre_ping": True,
     }
+    
+    # Cache for the read-only catalog API responses
+    app.config["RESPONSE_CACHE_ENABLED"] = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"
+    app.config["RESPONSE_CACHE_MAX_ENTRIES"] = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 512))
+    app.config["RESPONSE_CACHE_TTL"] = int(os.environ.get("RESPONSE_CACHE_TTL", 60))
+    
+    # Seconds browsers and proxies may reuse an API response before revalidating it
+    app.config["API_CACHE_MAX_AGE"] = int(os.environ.get("API_CACHE_MAX_AGE", 0))
+    
+    # gzip/brotli for text responses of at least COMPRESS_MIN_SIZE bytes
+    app.config["RESPONSE_COMPRESSION"] = os.environ.get("RESPONSE_COMPRESSION", "1") != "0"
+    app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    app.config["COMPRESS_CACHE_ENTRIES"] = int(os.environ.get("COMPRESS_CACHE_ENTRIES", 256))
+    
+    # Hashed static URLs from build_assets.py's manifest, when one has been built
+    app.config["STATIC_FINGERPRINTS"] = os.environ.get("STATIC_FINGERPRINTS", "1") != "0"
+    
+    # Largest array accepted by POST /api/plants:bulk and /api/remedies:bulk
+    app.config["BULK_MAX_RECORDS"] = int(os.environ.get("BULK_MAX_RECORDS", 5000))
+    
+    # Opt-in per-endpoint SQL profiling, served at /debug/metrics to METRICS_TOKEN holders
+    app.config["SQL_INSTRUMENTATION"] = os.environ.get("SQL_INSTRUMENTATION", "0") == "1"
+    app.config["SLOW_QUERY_MS"] = float(os.environ.get("SLOW_QUERY_MS", 200))
+    app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+
+    # orjson-backed jsonify() that can splice in pre-encoded documents
+    json_provider.init_app(app)
 
     # Initialize the app with the extension
     db.init_app(app)
@@ -58,12 +101,63 @@ def create_app():
         from routes import register_routes
         register_routes(app)
         
-        # Create all database tables
-        db.create_all()
+        # Schema changes are an explicit step, never part of startup
+        @app.cli.command("upgrade-db")
+        def upgrade_db():
+            """Create missing tables and apply pending migrations"""
+            import migrations
+            migrations.create_schema(db.engine)
+        
+        # Track catalog writes and keep the full-text search index and the
+        # materialized API documents in step with them
+        import catalog_events
+        import search_index
+        import documents
+        catalog_events.install()
+        search_index.init_search(db.engine)  # picks the backend, no queries
+        
+        # Catalog GET responses are cached until the next catalog write
+        import response_cache
+        response_cache.init_app(app)
+        
+        # Compression runs after the validators, so it is registered before them
+        import compression
+        compression.init_app(app)
+        
+        # ETag and Cache-Control on the JSON API
+        import http_caching
+        http_caching.init_app(app)
         
-        app.logger.info("Database tables created successfully")
+        # Fingerprinted, precompressed static files served as immutable
+        import static_assets
+        static_assets.init_app(app)
+        
+        # Times statements on the primary and on the replica engines alike
+        import instrumentation
+        instrumentation.init_app(app, db.engines.values())
+        
+        # GET API reads round-robin over DATABASE_REPLICA_URLS, when set
+        replicas.init_app(app, db)
         
     return app
 
-# Create the application instance
-app = create_app()
+
+_app_lock = threading.Lock()
+
+
+def __getattr__(name):
+    """
+    Build the shared application instance the first time `app.app` is used.
+
+    Importing db, models or routes does not create an app; `from app import
+    app` creates it once per process and returns the same instance after.
+    asgi.py depends on this: it imports the models but serves without the
+    Flask app, and building the app at import time would be circular
+    anyway (create_app imports models, which import db from here).
+    """
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _app_lock:
+        if "app" not in globals():
+            globals()["app"] = create_app()
+    return globals()["app"]
@@ -0,0 +1,142 @@
+"""
+ASGI entry point serving the read-only catalog API from an async engine
+
+    pip install starlette uvicorn aiosqlite      # asyncpg instead of aiosqlite for PostgreSQL
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+
+Answers GET /api/plants, /api/remedies, /api/plants/<id>,
+/api/remedies/<id> and /api/search with the same JSON as the Flask app.
+Every query is awaited on a create_async_engine connection, so one worker
+keeps hundreds of requests in flight on its event loop instead of holding a
+thread per request while the database works. The queries themselves are the
+Flask app's (catalog_queries.py, documents.py, search_index.py), run on the
+sync facade of an AsyncSession through run_sync(); each database call in
+them becomes an await on the async driver.
+
+Writes, the HTML pages, login and /api/suggest stay with the Flask app
+(wsgi.py), and so do the response cache, ETags and compression; route GETs
+of the endpoints above here at the proxy and everything else there. The
+database is DATABASE_URL, as for the Flask app, with the driver swapped for
+its async counterpart; ASYNC_DATABASE_URL overrides it. The pool holds
+ASYNC_POOL_SIZE connections (default 10) plus ASYNC_MAX_OVERFLOW (default 20).
+"""
+import contextlib
+import logging
+import os
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+import catalog_queries
+import documents
+import json_provider
+import search_index
+from pagination import parse_limit
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Where Flask-SQLAlchemy resolves relative SQLite paths
+INSTANCE_PATH = os.path.join(HERE, 'instance')
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg', 'postgres': 'postgresql+asyncpg'}
+
+
+def async_database_url():
+    """The app's database URL with its async driver"""
+    if os.environ.get("ASYNC_DATABASE_URL"):
+        return make_url(os.environ["ASYNC_DATABASE_URL"])
+    url = make_url(os.environ.get("DATABASE_URL") or "sqlite:///herbal_life.db")
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == 'sqlite' and url.database and url.database != ':memory:' and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(INSTANCE_PATH, url.database))
+    return url
+
+
+def json_response(body, status_code=200):
+    """Response encoded like the Flask app's jsonify(), Fragments included"""
+    return Response(json_provider.encode(body) + b'\n', status_code=status_code, media_type='application/json')
+
+
+def list_endpoint(entity_type):
+    async def endpoint(request):
+        # Validate paging parameters up front so bad input is a 400, not a 500
+        try:
+            params = catalog_queries.parse_list_args(request.query_params, entity_type)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+
+        try:
+            async with request.app.state.sessions() as session:
+                body = await session.run_sync(catalog_queries.list_page, entity_type, params)
+            return json_response(body)
+        except Exception as e:
+            logger.error(f"Error retrieving {catalog_queries.LIST_KEYS[entity_type]}: {str(e)}")
+            return json_response({"error": str(e)}, 500)
+    return endpoint
+
+
+def detail_endpoint(entity_type):
+    async def endpoint(request):
+        entity_id = request.path_params['entity_id']
+        try:
+            async with request.app.state.engine.connect() as connection:
+                document = await connection.run_sync(documents.get_document, entity_type, entity_id)
+            if document is None:
+                return json_response({"error": f"{entity_type.capitalize()} {entity_id} not found"}, 404)
+            return json_response(json_provider.Fragment(document))
+        except Exception as e:
+            logger.error(f"Error retrieving {entity_type} {entity_id}: {str(e)}")
+            return json_response({"error": str(e)}, 500)
+    return endpoint
+
+
+async def search_catalog(request):
+    try:
+        limit = parse_limit(request.query_params.get('limit')) or 20
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    try:
+        # One ranked query across plants and remedies
+        async with request.app.state.engine.connect() as connection:
+            results = await connection.run_sync(
+                search_index.search_catalog, request.query_params.get('q', ''), limit=limit
+            )
+        return json_response({"results": results})
+    except Exception as e:
+        logger.error(f"Error searching catalog: {str(e)}")
+        return json_response({"error": str(e)}, 500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    url = async_database_url()
+    options = {"pool_recycle": 300, "pool_pre_ping": True}
+    if url.database != ':memory:':
+        options.update(pool_size=int(os.environ.get("ASYNC_POOL_SIZE", 10)),
+                       max_overflow=int(os.environ.get("ASYNC_MAX_OVERFLOW", 20)))
+    engine = create_async_engine(url, **options)
+    search_index.init_search(engine.sync_engine)  # picks the backend, no queries
+    app.state.engine = engine
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    logger.info(f"Async catalog API using {url.render_as_string(hide_password=True)}")
+    try:
+        yield
+    finally:
+        await engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/plants', list_endpoint('plant')),
+        Route('/api/plants/{entity_id:int}', detail_endpoint('plant')),
+        Route('/api/remedies', list_endpoint('remedy')),
+        Route('/api/remedies/{entity_id:int}', detail_endpoint('remedy')),
+        Route('/api/search', search_catalog),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,286 @@
+"""
+Script to benchmark the JSON API against a generated catalog
+
+    python benchmark_api.py --size 10k
+    python benchmark_api.py --size 10k --baseline benchmark_results/api-10k-abc1234.json
+
+Loads a seeded synthetic catalog (see catalog_generator.py) into a scratch
+database, then drives the list, detail, search and CRUD routes through the
+Flask test client. For every scenario it reports latency percentiles,
+sequential throughput, SQL statements per request and the peak Python
+memory allocated while serving (measured with tracemalloc in a separate
+pass, so tracing does not skew the timings).
+
+Results are written as JSON. With --baseline the run is compared against
+an earlier result file and exits with status 1 when a scenario's p95
+latency grew beyond --tolerance or it issues more queries per request.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+logging.basicConfig(level=logging.WARNING)
+
+SIZES = {"1k": 1000, "10k": 10000, "100k": 100000}
+
+SEARCH_TERMS = ["tulsi", "ginger", "digestion", "stress", "turmeric tea", "honey", "sleep", "ashwa",
+                "immunity", "neem paste", "joint pain", "cinnamon", "brahmi", "skin"]
+
+
+class QueryCounter:
+    """Counts the SQL statements an engine executes"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._increment)
+
+    def _increment(self, *args):
+        self.count += 1
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list of samples"""
+    ordered = sorted(samples)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scenarios(rng, plants, remedies, seed):
+    """
+    Ordered (name, next_request, on_response) triples.
+
+    next_request() returns (method, url, json_payload). The CRUD scenarios
+    share the ids created by the create scenarios: updates cycle through
+    them and deletes consume them, one per request. The edit scenarios
+    change one benefit or preparation step of a record whose latest
+    representation they keep, so their statement counts show whether an
+    update writes just that row or rebuilds the whole collection.
+    """
+    from catalog_generator import BENEFITS, generate_plants, generate_remedies
+
+    created = {"plants": [], "remedies": []}
+    latest = {"plants": {}, "remedies": {}}
+    new_plants = generate_plants(10 ** 9, seed + 1, start=plants)
+    new_remedies = generate_remedies(10 ** 9, seed + 1, start=remedies)
+
+    def get(url_factory):
+        return lambda: ("GET", url_factory(), None)
+
+    def collect(kind):
+        def on_response(response):
+            if response.status_code == 201:
+                created[kind].append(response.get_json()["id"])
+            if response.status_code in (200, 201):
+                latest[kind][response.get_json()["id"]] = response.get_json()
+        return on_response
+
+    def update(kind):
+        def next_request():
+            entity_id = created[kind][rng.randrange(len(created[kind]))]
+            return ("PUT", f"/api/{kind}/{entity_id}", {"description": f"Updated at {time.time()}"})
+        return next_request
+
+    def edit_benefit():
+        plant_id = created["plants"][rng.randrange(len(created["plants"]))]
+        benefits = latest["plants"][plant_id]["benefits"]
+        # Swap the last benefit for one the plant does not have
+        benefits = benefits[:-1] + [rng.choice([name for name in BENEFITS if name not in benefits])]
+        return ("PUT", f"/api/plants/{plant_id}", {"benefits": benefits})
+
+    def edit_step():
+        remedy_id = created["remedies"][rng.randrange(len(created["remedies"]))]
+        steps = [step["description"] for step in latest["remedies"][remedy_id]["preparation_steps"]]
+        steps[rng.randrange(len(steps))] = f"Stir and rest, updated at {time.time()}"
+        return ("PUT", f"/api/remedies/{remedy_id}", {"preparation_steps": steps})
+
+    def delete(kind):
+        return lambda: ("DELETE", f"/api/{kind}/{created[kind].pop()}", None)
+
+    return [
+        ("list_plants", get(lambda: "/api/plants?limit=50"), None),
+        ("list_plants_search", get(lambda: f"/api/plants?search={rng.choice(SEARCH_TERMS)}&limit=50"), None),
+        ("list_plants_summary", get(lambda: "/api/plants?view=summary&limit=50"), None),
+        ("list_remedies", get(lambda: "/api/remedies?limit=50"), None),
+        ("list_remedies_summary", get(lambda: "/api/remedies?view=summary&limit=50"), None),
+        ("list_remedies_search", get(lambda: f"/api/remedies?search={rng.choice(SEARCH_TERMS)}&limit=50"), None),
+        ("plant_detail", get(lambda: f"/api/plants/{rng.randint(1, plants)}"), None),
+        ("remedy_detail", get(lambda: f"/api/remedies/{rng.randint(1, remedies)}"), None),
+        ("search", get(lambda: f"/api/search?q={rng.choice(SEARCH_TERMS)}"), None),
+        ("suggest", get(lambda: f"/api/suggest?q={rng.choice(SEARCH_TERMS)[:3]}"), None),
+        ("create_plant", lambda: ("POST", "/api/plants", next(new_plants)), collect("plants")),
+        ("create_remedy", lambda: ("POST", "/api/remedies", next(new_remedies)), collect("remedies")),
+        ("update_plant", update("plants"), None),
+        ("update_remedy", update("remedies"), None),
+        ("edit_plant_benefit", edit_benefit, collect("plants")),
+        ("edit_remedy_step", edit_step, collect("remedies")),
+        ("delete_plant", delete("plants"), None),
+        ("delete_remedy", delete("remedies"), None),
+    ]
+
+
+def run_requests(client, next_request, on_response, count, counter=None):
+    """Issue count requests; returns (latencies in ms, statements executed, error responses)"""
+    latencies = []
+    queries = errors = 0
+    for _ in range(count):
+        method, url, payload = next_request()
+        before = counter.count if counter else 0
+        start = time.perf_counter()
+        response = client.open(url, method=method, json=payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if counter:
+            queries += counter.count - before
+        if response.status_code >= 400:
+            errors += 1
+        if on_response:
+            on_response(response)
+    return latencies, queries, errors
+
+
+def run_benchmark(client, counter, plan, requests, warmup, memory_requests):
+    results = {}
+    for name, next_request, on_response in plan:
+        run_requests(client, next_request, on_response, warmup)
+        latencies, queries, errors = run_requests(client, next_request, on_response, requests, counter)
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        run_requests(client, next_request, on_response, memory_requests)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+        results[name] = {
+            "requests": requests,
+            "errors": errors,
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "throughput_rps": round(len(latencies) / (sum(latencies) / 1000), 1),
+            "queries_per_request": round(queries / requests, 2),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+        row = results[name]
+        print(f"{name:<22} p50 {row['p50_ms']:>8.2f}  p95 {row['p95_ms']:>8.2f}  p99 {row['p99_ms']:>8.2f} ms"
+              f"  {row['throughput_rps']:>8.1f} req/s  {row['queries_per_request']:>6.2f} q/req"
+              f"  {row['peak_memory_kb']:>9.1f} KB" + (f"  {errors} errors" if errors else ""))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for scenarios that got slower or chattier than the baseline"""
+    regressions = []
+    for name, row in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        if row["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {row['p95_ms']} ms")
+        # Payload-dependent statements (new benefits and the like) vary a little
+        # between runs; an extra query per request is what an N+1 looks like
+        if row["queries_per_request"] > before["queries_per_request"] + 0.5:
+            regressions.append(f"{name}: queries/request {before['queries_per_request']} -> "
+                               f"{row['queries_per_request']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Herbal Life JSON API")
+    parser.add_argument("--size", choices=sorted(SIZES), default="1k",
+                        help="plants and remedies in the generated catalog (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per scenario")
+    parser.add_argument("--memory-requests", type=int, default=20,
+                        help="requests per scenario in the tracemalloc pass")
+    parser.add_argument("--response-cache", action="store_true",
+                        help="leave the in-process response cache on (off by default)")
+    parser.add_argument("--database-url", help="empty scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--output", help="result file (default: benchmark_results/api-<size>-<commit>.json)")
+    parser.add_argument("--baseline", help="earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative p95 growth over the baseline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        scratch.close()
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+    if not args.response_cache:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+
+    # Imported only now so the app picks up the scratch DATABASE_URL
+    from app import app, db
+    from catalog_generator import load_catalog
+
+    count = SIZES[args.size]
+    try:
+        with app.app_context():
+            start = time.perf_counter()
+            load_catalog(count, count, args.seed)
+            load_seconds = time.perf_counter() - start
+            print(f"Loaded {count} plants and {count} remedies into {db.engine.url!r} in {load_seconds:.1f}s")
+            counter = QueryCounter(db.engine)
+            dialect = db.engine.dialect.name
+
+        plan = scenarios(random.Random(args.seed), count, count, args.seed)
+        with app.test_client() as client:
+            scenario_results = run_benchmark(client, counter, plan, args.requests, args.warmup,
+                                             args.memory_requests)
+    finally:
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": dialect,
+        "size": args.size,
+        "seed": args.seed,
+        "response_cache": args.response_cache,
+        "load_seconds": round(load_seconds, 2),
+        "scenarios": scenario_results,
+    }
+    output = args.output or os.path.join("benchmark_results", f"api-{args.size}-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Script to benchmark response compression on the list endpoints
+
+    python benchmark_compression.py --plants 1000
+    python benchmark_compression.py --plants 10000 --repeat 20
+
+Loads a generated catalog (see catalog_generator.py) into a scratch
+database and requests each list endpoint through the test client with
+Accept-Encoding set to identity, gzip and (if the brotli package is
+installed) br. For each combination it reports the bytes on the wire and
+the median CPU time per request. The CPU time is given twice: "cold" with
+the compressed body cache emptied before every request, which is the cost
+of compressing, and "warm", which is what repeat requests for an unchanged
+catalog cost.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+logging.basicConfig(level=logging.WARNING)
+
+ENDPOINTS = ["/api/plants", "/api/remedies", "/api/plants?limit=20", "/api/remedies?limit=20"]
+
+
+def cpu_per_request(client, path, headers, repeat, before=None):
+    """(median CPU seconds, body bytes) of GET path"""
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.process_time()
+        response = client.get(path, headers=headers)
+        size = len(response.get_data())
+        samples.append(time.process_time() - start)
+    return statistics.median(samples), size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark compression of the list endpoints")
+    parser.add_argument("--plants", type=int, default=1000, help="plants and remedies in the scratch catalog")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=15, help="timed requests per combination")
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    scratch.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+
+    # Imported only now so the app picks up the scratch DATABASE_URL
+    from app import app
+    from catalog_generator import load_catalog
+    import compression
+
+    encodings = ["identity", *reversed(compression.available_encodings())]
+    try:
+        with app.app_context():
+            load_catalog(args.plants, args.plants, args.seed)
+        print(f"Catalog of {args.plants} plants and {args.plants} remedies; "
+              f"minimum size {app.config['COMPRESS_MIN_SIZE']} bytes")
+        print(f"{'endpoint':<24} {'encoding':<9} {'wire bytes':>12} {'ratio':>7} {'cold cpu':>11} {'warm cpu':>11}")
+        with app.test_client() as client:
+            for path in ENDPOINTS:
+                identity_size = None
+                for encoding in encodings:
+                    headers = {"Accept-Encoding": encoding}
+                    # Fills the response cache, so the timings isolate compression
+                    client.get(path, headers=headers)
+                    cold, size = cpu_per_request(client, path, headers, args.repeat,
+                                                 before=compression.compressed_bodies.clear)
+                    warm, _ = cpu_per_request(client, path, headers, args.repeat)
+                    identity_size = identity_size or size
+                    print(f"{path:<24} {encoding:<9} {size:>12,} {identity_size / size:>6.1f}x "
+                          f"{cold * 1000:>8.2f} ms {warm * 1000:>8.2f} ms")
+    finally:
+        os.unlink(scratch.name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
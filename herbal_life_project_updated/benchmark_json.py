@@ -0,0 +1,110 @@
+"""
+Script to benchmark JSON serialization of the plant list payload
+
+    python benchmark_json.py --plants 10000
+
+Loads a generated catalog (see catalog_generator.py) into a scratch
+database and encodes the full /api/plants payload in several ways:
+
+- Flask's default stdlib provider with to_dict()-shaped dicts
+- json_provider.FastJSONProvider with the same dicts, on orjson and on the
+  stdlib fallback
+- FastJSONProvider with the stored documents wrapped in Fragments, which
+  is what the list route does
+
+For each it reports the median encode time and the peak Python memory
+allocated while encoding (tracemalloc, in a separate pass). It finishes with
+end-to-end GET /api/plants timings through the test client for each backend.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def measure(func, repeat):
+    """(median seconds, peak traced bytes, result size) of calling func"""
+    size = len(func())
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return statistics.median(timings), peak, size
+
+
+def report(name, median, peak, size):
+    print(f"{name:<34} {median * 1000:>9.2f} ms  {peak / 1024 / 1024:>8.2f} MB peak  {size / 1024:>9.1f} KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of the plant list")
+    parser.add_argument("--plants", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=15, help="timed runs per encoder")
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    scratch.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+
+    # Imported only now so the app picks up the scratch DATABASE_URL
+    from flask.json.provider import DefaultJSONProvider
+    from app import app, db
+    from catalog_generator import load_catalog
+    from json_provider import BACKEND, FastJSONProvider, Fragment
+    from models import catalog_document
+
+    try:
+        with app.app_context():
+            load_catalog(args.plants, 0, args.seed)
+            stored = [row.document for row in db.session.execute(
+                db.select(catalog_document.c.document)
+                .where(catalog_document.c.entity_type == 'plant')
+                .order_by(catalog_document.c.entity_id)
+            )]
+        print(f"Encoding {len(stored)} plants (orjson {'available' if BACKEND == 'orjson' else 'not installed'})")
+
+        dicts = {"plants": [json.loads(document) for document in stored], "next_cursor": None}
+        fragments = {"plants": [Fragment(document) for document in stored], "next_cursor": None}
+        default = DefaultJSONProvider(app)
+        encoders = [
+            ("stdlib default provider, dicts", lambda: default.dumps(dicts).encode('utf-8')),
+        ]
+        backends = ["stdlib", "orjson"] if BACKEND == "orjson" else ["stdlib"]
+        for backend in backends:
+            provider = FastJSONProvider(app, backend)
+            encoders += [
+                (f"FastJSONProvider[{backend}], dicts", lambda p=provider: p.encode(dicts)),
+                (f"FastJSONProvider[{backend}], Fragments", lambda p=provider: p.encode(fragments)),
+            ]
+        for name, func in encoders:
+            report(name, *measure(func, args.repeat))
+
+        print(f"GET /api/plants ({len(stored)} plants per response)")
+        with app.test_client() as client:
+            for backend in backends:
+                app.json = FastJSONProvider(app, backend)
+                report(f"FastJSONProvider[{backend}]",
+                       *measure(lambda: client.get("/api/plants").get_data(), args.repeat))
+    finally:
+        os.unlink(scratch.name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
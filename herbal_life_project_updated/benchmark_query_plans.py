@@ -0,0 +1,143 @@
+"""
+Script to compare query plans and timings with and without the lookup indexes
+
+    python benchmark_query_plans.py --plants 20000 --remedies 20000
+
+Fills a scratch database (a temporary SQLite file unless --database-url is
+given) with synthetic plants and remedies, drops the lookup indexes of
+migration 2, and runs EXPLAIN and a timing loop for the hot lookups. It
+then recreates the indexes and runs them again. Only those indexes are
+touched; downgrading the whole schema would also drop the tables that later
+migrations add and the loader writes to.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def populate(loader, plants, remedies, seed=0):
+    """Queue synthetic plants and remedies on a BulkLoader"""
+    rng = random.Random(seed)
+    herbs = [f"Herb {i}" for i in range(500)]
+    benefits = [f"Benefit {i}" for i in range(200)]
+    for i in range(plants):
+        loader.add_plant({
+            "name": f"Plant {i}",
+            "scientific_name": f"Planta specimen {i}",
+            "description": "Synthetic plant",
+            "category": f"Plant category {i % 20}",
+            "benefits": rng.sample(benefits, 3),
+            "images": [f"/static/images/plant_{i}_{n}.jpg" for n in range(2)],
+        })
+    for i in range(remedies):
+        loader.add_remedy({
+            "name": f"Remedy {i}",
+            "short_description": "Synthetic remedy",
+            "description": "Synthetic remedy",
+            "usage": "As needed",
+            "category": f"Remedy category {i % 20}",
+            "benefits": rng.sample(benefits, 3),
+            "ingredients": rng.sample(herbs, 5),
+            "preparation_steps": [f"Step {n}" for n in range(1, 5)],
+        })
+    loader.commit()
+
+
+def lookups(plants, remedies):
+    """(label, statement) pairs for the queries the indexes are meant to serve"""
+    from sqlalchemy import func, select
+    from models import Plant, Remedy, Ingredient, PlantImage, PreparationStep, plant_benefits
+
+    plant_name = f"Plant {plants // 2}"
+    ids = list(range(min(plants, remedies) // 2, min(plants, remedies) // 2 + 50))
+    return [
+        ("plant by name", select(Plant.id).where(Plant.name == plant_name)),
+        ("remedies using an ingredient",
+         select(Ingredient.remedy_id).where(func.lower(Ingredient.name) == "herb 42")),
+        ("ingredients of 50 remedies (selectinload)",
+         select(Ingredient).where(Ingredient.remedy_id.in_(ids))),
+        ("steps of 50 remedies (selectinload)",
+         select(PreparationStep).where(PreparationStep.remedy_id.in_(ids))),
+        ("images of 50 plants (selectinload)",
+         select(PlantImage).where(PlantImage.plant_id.in_(ids))),
+        ("plants with a benefit",
+         select(plant_benefits.c.plant_id).where(plant_benefits.c.benefit_id == 7)),
+        ("remedies by doctor", select(Remedy.id).where(Remedy.doctor_id == 1)),
+    ]
+
+
+def explain(connection, statement):
+    """The database's plan for statement as a list of lines"""
+    sql = str(statement.compile(connection, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        return [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}")]
+
+
+def measure(engine, queries, repeat):
+    """Plan and mean execution time in milliseconds for each query"""
+    results = {}
+    with engine.connect() as connection:
+        for label, statement in queries:
+            plan = explain(connection, statement)
+            connection.execute(statement).all()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(statement).all()
+            results[label] = (plan, (time.perf_counter() - start) * 1000 / repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show query plans before and after the lookup indexes")
+    parser.add_argument("--plants", type=int, default=20000)
+    parser.add_argument("--remedies", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50, help="executions per timed query")
+    parser.add_argument("--database-url", help="empty scratch database (default: a temporary SQLite file)")
+    args = parser.parse_args(argv)
+
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        scratch.close()
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+
+    # Imported only now so the app picks up the scratch DATABASE_URL
+    from app import app, db
+    from bulk_loader import BulkLoader
+    import migrations
+
+    try:
+        with app.app_context():
+            migrations.create_schema(db.engine)
+            print(f"Loading {args.plants} plants and {args.remedies} remedies into {db.engine.url!r}")
+            populate(BulkLoader(batch_size=2000), args.plants, args.remedies)
+            queries = lookups(args.plants, args.remedies)
+
+            with db.engine.begin() as connection:
+                migrations.drop_lookup_indexes(connection)
+            before = measure(db.engine, queries, args.repeat)
+            with db.engine.begin() as connection:
+                migrations.add_lookup_indexes(connection)
+            after = measure(db.engine, queries, args.repeat)
+
+        for label, _ in queries:
+            (plan_before, ms_before), (plan_after, ms_after) = before[label], after[label]
+            print(f"\n{label}: {ms_before:.3f} ms -> {ms_after:.3f} ms ({ms_before / ms_after:.1f}x)")
+            print("  before: " + "\n          ".join(plan_before))
+            print("  after:  " + "\n          ".join(plan_after))
+    finally:
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Script to measure the cold-start time of workers and maintenance scripts
+
+    python benchmark_startup.py
+    python benchmark_startup.py --plants 10000 --repeat 10
+
+Each target is timed in a fresh Python process, so every module is imported
+from scratch just as it is when a gunicorn worker boots or a script such as
+update_plant_images.py is run. For each target it reports the median time
+spent in the import statement itself and the median wall time of the whole
+process, interpreter startup included.
+
+The targets run against a scratch SQLite database (or --database-url)
+holding a generated catalog. The schema is created once up front, as the
+deploy step would do.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TARGETS = [
+    ("import app (db, no app instance)", "import app"),
+    ("import models and routes", "import app, models, routes"),
+    ("from app import app", "from app import app"),
+    ("gunicorn preload (wsgi.py)", "import wsgi"),
+    ("async API (asgi.py)", "import asgi"),
+    ("asgi.py if it built the Flask app", "import asgi; from app import app"),
+    ("maintenance script import", "import update_plant_images"),
+]
+
+TIMER = "import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+
+
+def time_target(statement, env):
+    """(seconds inside the statement, wall seconds of the process)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", TIMER.format(statement=statement)], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    return float(result.stdout.strip().splitlines()[-1]), wall
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Herbal Life cold-start times")
+    parser.add_argument("--plants", type=int, default=1000, help="plants and remedies in the scratch catalog")
+    parser.add_argument("--repeat", type=int, default=7, help="processes started per target")
+    parser.add_argument("--database-url", help="existing database to start against instead of a scratch one")
+    args = parser.parse_args(argv)
+
+    scratch = None
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        scratch.close()
+        env["DATABASE_URL"] = f"sqlite:///{scratch.name}"
+        subprocess.run([sys.executable, "-c",
+                        "from app import app\n"
+                        "from catalog_generator import load_catalog\n"
+                        "with app.app_context():\n"
+                        f"    load_catalog({args.plants}, {args.plants})"],
+                       cwd=HERE, env=env, check=True)
+
+    try:
+        # Compile the bytecode caches first so every run measures the same thing
+        time_target("import wsgi, asgi, update_plant_images", env)
+        print(f"{'target':<34} {'import':>10} {'process':>10}")
+        for name, statement in TARGETS:
+            samples = [time_target(statement, env) for _ in range(args.repeat)]
+            inside = statistics.median(sample[0] for sample in samples)
+            wall = statistics.median(sample[1] for sample in samples)
+            print(f"{name:<34} {inside * 1000:>7.0f} ms {wall * 1000:>7.0f} ms")
+    finally:
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Script to fingerprint and precompress the static files
+
+    python build_assets.py            # after every change to static/, as a deploy step
+    python build_assets.py --prune    # also delete hashed files no longer in the manifest
+
+Every file under static/ is copied to static/dist/ with the first hex
+digits of its SHA-256 in the name (css/style.css becomes
+dist/css/style.<hash>.css). Text files (CSS, JavaScript, SVG, JSON) also
+get .gz and, when the brotli package is installed, .br copies compressed at
+the highest level, kept only when they are smaller than the original.
+Images are already compressed and are copied as they are.
+
+The mapping is written to static/dist/manifest.json, which static_assets.py
+reads when the app starts; restart the workers to pick up a new build.
+Older hashed files are left in place unless --prune is given, so pages
+rendered before a deploy keep working until their caches expire.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sys
+import time
+from static_assets import DIST_DIR, MANIFEST_NAME
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(HERE, 'static')
+# Generated by image_pipeline.py and referenced by stored URLs, not url_for
+SKIP_DIRS = {DIST_DIR, 'variants'}
+HASH_LENGTH = 12
+COMPRESSIBLE_TYPES = ('application/javascript', 'text/javascript', 'application/json', 'image/svg+xml')
+
+
+def compressible(path):
+    mimetype = mimetypes.guess_type(path)[0] or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def source_files(static_folder):
+    """Paths of the files to fingerprint, relative to static_folder and '/'-separated"""
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [name for name in dirs if name not in SKIP_DIRS]
+        dirs.sort()
+        for name in sorted(files):
+            if not name.startswith('.'):
+                yield os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+
+
+def hashed_name(source, data):
+    stem, ext = os.path.splitext(source)
+    return f"{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def write_file(path, data):
+    """Write data to path unless it is already there; written aside and renamed"""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def compressed_copies(data):
+    """(encoding, suffix, bytes) for each encoding that actually shrinks data"""
+    copies = [('gzip', '.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        copies.insert(0, ('br', '.br', brotli.compress(data, quality=11)))
+    return [copy for copy in copies if len(copy[2]) < len(data)]
+
+
+def build(static_folder=STATIC_FOLDER, prune=False):
+    """Fingerprint the static files and write the manifest; returns the manifest"""
+    assets = {}
+    for source in source_files(static_folder):
+        source_path = os.path.join(static_folder, *source.split('/'))
+        stat = os.stat(source_path)
+        with open(source_path, 'rb') as f:
+            data = f.read()
+        hashed = hashed_name(source, data)
+        target = os.path.join(static_folder, *hashed.split('/'))
+        write_file(target, data)
+        encodings = []
+        if compressible(source):
+            for encoding, suffix, compressed in compressed_copies(data):
+                write_file(target + suffix, compressed)
+                encodings.append(encoding)
+        assets[source] = {'path': hashed, 'encodings': encodings,
+                          'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        logger.debug(f"{source} -> {hashed} {encodings}")
+
+    # The manifest goes last, so the app never points at files not yet written
+    manifest_path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'assets': assets}, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    if prune:
+        prune_dist(static_folder, assets)
+    return assets
+
+
+def prune_dist(static_folder, assets):
+    """Delete the hashed files and compressed copies the manifest no longer lists"""
+    keep = {MANIFEST_NAME}
+    for entry in assets.values():
+        relative = entry['path'][len(DIST_DIR) + 1:]
+        keep.add(relative)
+        keep.update(relative + suffix for suffix in ('.gz', '.br'))
+    dist = os.path.join(static_folder, DIST_DIR)
+    removed = 0
+    for root, _, files in os.walk(dist):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, dist).replace(os.sep, '/') not in keep:
+                os.remove(path)
+                removed += 1
+    logger.info(f"Pruned {removed} stale files from {dist}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the Herbal Life static files")
+    parser.add_argument("--static-folder", default=STATIC_FOLDER, help="default: %(default)s")
+    parser.add_argument("--prune", action="store_true", help="delete hashed files left over from older builds")
+    args = parser.parse_args(argv)
+
+    if brotli is None:
+        logger.warning("brotli is not installed; only gzip copies will be written (pip install brotli)")
+    start = time.perf_counter()
+    assets = build(os.path.abspath(args.static_folder), args.prune)
+    compressed = sum(1 for entry in assets.values() if entry['encodings'])
+    logger.info(f"Fingerprinted {len(assets)} files ({compressed} precompressed) "
+                f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+Batched importer for plant and remedy records.
+
+The seed and import scripts used to resolve every category, benefit and
+duplicate check with its own SELECT, and some committed after every row.
+BulkLoader instead looks names up a batch at a time, with one IN query per
+model, and writes each batch with executemany INSERT statements:
+
+    loader = BulkLoader(batch_size=1000)
+    for record in records:
+        loader.add_plant(record)
+    loader.commit()
+
+Records use the same keys as the API payloads. Plants take name,
+scientific_name, description, usage, category, benefits, image (or
+image_url) and images; remedies take name, short_description, description,
+difficulty, usage, category, benefits, ingredients, preparation_steps and
+doctor_email or doctor_id. Images, ingredients and steps may be plain
+strings or dicts with the model's column names.
+
+Memory stays bounded by the batch size, not the catalog: plants and
+remedies whose name already exists are dropped when their batch is written,
+and only the category and benefit names the records use are remembered.
+Callers that need to know up front whether each record is new (the bulk
+API) call preload() with the records first; add_plant() and add_remedy()
+then answer from those lookups.
+"""
+import logging
+from sqlalchemy import insert, select
+from app import db
+import catalog_events
+from upsert import get_or_create_names
+from models import (
+    Plant, Remedy, PlantCategory, RemedyCategory, Benefit, PlantImage,
+    Ingredient, PreparationStep, User, plant_benefits, remedy_benefits
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# Names per IN (...) lookup, well under SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+# Keys of BulkLoader.created for the name-keyed lookup models
+CREATED_COUNTERS = {
+    PlantCategory: "plant_categories",
+    RemedyCategory: "remedy_categories",
+    Benefit: "benefits",
+}
+
+
+class BulkLoader:
+    """Collects plant and remedy records and writes them in batches"""
+
+    def __init__(self, session=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.session = session or db.session
+        self.batch_size = batch_size
+        self._plants = []
+        self._remedies = []
+        # Names queued in the current batch, to drop repeats before they are written
+        self._queued = {Plant: set(), Remedy: set()}
+        # Name to id of the rows looked up or written so far; plants and
+        # remedies only when preload() was used
+        self._names = {}
+        self._doctors = {}
+        self.created = {"plants": 0, "remedies": 0, "plant_categories": 0,
+                        "remedy_categories": 0, "benefits": 0}
+        self.skipped = {"plants": 0, "remedies": 0}
+
+    def _lookup(self, model, key, values):
+        """{key value: id} for the values that exist, one IN query per LOOKUP_CHUNK"""
+        values = list(values)
+        found = {}
+        for start in range(0, len(values), LOOKUP_CHUNK):
+            found.update(self.session.execute(
+                select(key, model.id).where(key.in_(values[start:start + LOOKUP_CHUNK]))
+            ).all())
+        return found
+
+    def preload(self, plants=(), remedies=()):
+        """
+        Look up only the names the given records use instead of whole tables.
+
+        Afterwards the loader knows nothing about other names, so only these
+        records may be added.
+        """
+        lookups = {
+            Plant: {record["name"] for record in plants},
+            Remedy: {record["name"] for record in remedies},
+            PlantCategory: {record.get("category") for record in plants},
+            RemedyCategory: {record.get("category") for record in remedies},
+            Benefit: {name for record in [*plants, *remedies] for name in record.get("benefits", [])},
+        }
+        for model, names in lookups.items():
+            self._names[model] = self._lookup(model, model.name, names - {None, ""})
+        self._resolve_doctors(remedies)
+
+    def id_of(self, model, name):
+        """Id of a preloaded plant or remedy called name, once it has been written"""
+        return self._names.get(model, {}).get(name)
+
+    def resolve(self, model, names):
+        """
+        Map names to ids for a name-keyed model, inserting the missing ones.
+
+        Used for categories and benefits; names not seen before cost one IN
+        query and one upsert for the whole list, and names another process
+        creates concurrently are picked up rather than failing the load.
+        """
+        known = self._names.setdefault(model, {})
+        unknown = list(dict.fromkeys(name for name in names if name and name not in known))
+        if unknown:
+            known.update(self._lookup(model, model.name, unknown))
+            missing = [name for name in unknown if name not in known]
+            if missing:
+                known.update(get_or_create_names(self.session, model, missing, known_missing=True))
+                self.created[CREATED_COUNTERS[model]] += len(missing)
+        return {name: known[name] for name in names if name}
+
+    def get_or_create(self, model, name):
+        """Id of the category or benefit called name, creating it if needed"""
+        return self.resolve(model, [name])[name]
+
+    def _queue(self, model, record, queue, label):
+        """
+        Queue record unless its name is already queued or known to exist.
+
+        Without preload() a name that exists in the database is only found
+        when the batch is written, so True means queued, not necessarily new.
+        """
+        name = record["name"]
+        preloaded = self._names.get(model)
+        if name in self._queued[model] or (preloaded is not None and name in preloaded):
+            self.skipped[label] += 1
+            logger.debug(f"{model.__name__} '{name}' already exists, skipping")
+            return False
+        self._queued[model].add(name)
+        queue.append(record)
+        if len(queue) >= self.batch_size:
+            self.flush()
+        return True
+
+    def add_plant(self, record):
+        """Queue a plant record; plants whose name already exists are skipped"""
+        return self._queue(Plant, record, self._plants, "plants")
+
+    def add_remedy(self, record):
+        """Queue a remedy record; remedies whose name already exists are skipped"""
+        return self._queue(Remedy, record, self._remedies, "remedies")
+
+    def _take_new(self, model, queue, label):
+        """Empty the queue, returning its records whose names are not in the database yet"""
+        records = list(queue)
+        queue.clear()
+        self._queued[model].clear()
+        if not records or model in self._names:
+            # Preloaded records were checked when they were added
+            return records
+        existing = self._lookup(model, model.name, [record["name"] for record in records])
+        if existing:
+            self.skipped[label] += len(existing)
+            logger.debug(f"Skipping {len(existing)} existing {label}")
+        return [record for record in records if record["name"] not in existing]
+
+    def _remember(self, model, ids):
+        # Only preloaded loaders report ids; others keep no per-row state
+        if model in self._names:
+            self._names[model].update(ids)
+
+    def _resolve_doctors(self, records):
+        emails = {record["doctor_email"] for record in records
+                  if record.get("doctor_email") and record["doctor_email"] not in self._doctors}
+        if emails:
+            self._doctors.update(self._lookup(User, User.email, emails))
+
+    def _flush_plants(self):
+        records = self._take_new(Plant, self._plants, "plants")
+        if not records:
+            return []
+        categories = self.resolve(PlantCategory, [record.get("category") for record in records])
+        benefits = self.resolve(Benefit, [name for record in records for name in record.get("benefits", [])])
+
+        # Rows come back matched by their unique name: asking for parameter
+        # order makes SQLite fall back to one INSERT per row, and NULLs are
+        # rendered so rows with and without a usage share one executemany
+        plant_ids = dict((name, row_id) for row_id, name in self.session.execute(
+            insert(Plant).returning(Plant.id, Plant.name).execution_options(render_nulls=True),
+            [{
+                "name": record["name"],
+                "scientific_name": record.get("scientific_name") or "",
+                "description": record.get("description") or "",
+                "usage": record.get("usage"),
+                "category_id": categories.get(record.get("category")),
+            } for record in records]
+        ))
+
+        image_rows = []
+        benefit_rows = []
+        self._remember(Plant, plant_ids)
+        for record in records:
+            plant_id = plant_ids[record["name"]]
+            for image in plant_images(record):
+                image_rows.append(dict(image, plant_id=plant_id))
+            for benefit_id in dict.fromkeys(benefits[name] for name in record.get("benefits", [])):
+                benefit_rows.append({"plant_id": plant_id, "benefit_id": benefit_id})
+        if image_rows:
+            self.session.execute(insert(PlantImage).execution_options(render_nulls=True), image_rows)
+        if benefit_rows:
+            self.session.execute(insert(plant_benefits), benefit_rows)
+
+        self.created["plants"] += len(plant_ids)
+        return list(plant_ids.values())
+
+    def _flush_remedies(self):
+        records = self._take_new(Remedy, self._remedies, "remedies")
+        if not records:
+            return []
+        categories = self.resolve(RemedyCategory, [record.get("category") for record in records])
+        benefits = self.resolve(Benefit, [name for record in records for name in record.get("benefits", [])])
+        self._resolve_doctors(records)
+
+        # Rows come back matched by their unique name: asking for parameter
+        # order makes SQLite fall back to one INSERT per row, and NULLs are
+        # rendered so rows with and without a usage share one executemany
+        remedy_ids = dict((name, row_id) for row_id, name in self.session.execute(
+            insert(Remedy).returning(Remedy.id, Remedy.name).execution_options(render_nulls=True),
+            [{
+                "name": record["name"],
+                "short_description": record.get("short_description") or "",
+                "description": record.get("description") or "",
+                "difficulty": record.get("difficulty") or "Medium",
+                "usage": record.get("usage") or "",
+                "category_id": categories.get(record.get("category")),
+                "doctor_id": record.get("doctor_id") or self._doctors.get(record.get("doctor_email")),
+            } for record in records]
+        ))
+
+        ingredient_rows = []
+        step_rows = []
+        benefit_rows = []
+        self._remember(Remedy, remedy_ids)
+        for record in records:
+            remedy_id = remedy_ids[record["name"]]
+            # Every row gets the same keys, so they share one executemany
+            for i, ingredient in enumerate(record.get("ingredients", [])):
+                if isinstance(ingredient, str):
+                    ingredient = {"name": ingredient}
+                order = ingredient.get("order")
+                ingredient_rows.append({"remedy_id": remedy_id, "name": ingredient["name"],
+                                        "order": i if order is None else order})
+            for i, step in enumerate(record.get("preparation_steps", [])):
+                if isinstance(step, str):
+                    step = {"description": step}
+                step_number = step.get("step_number")
+                step_rows.append({"remedy_id": remedy_id, "description": step["description"],
+                                  "step_number": i + 1 if step_number is None else step_number})
+            for benefit_id in dict.fromkeys(benefits[name] for name in record.get("benefits", [])):
+                benefit_rows.append({"remedy_id": remedy_id, "benefit_id": benefit_id})
+        if ingredient_rows:
+            self.session.execute(insert(Ingredient).execution_options(render_nulls=True), ingredient_rows)
+        if step_rows:
+            self.session.execute(insert(PreparationStep).execution_options(render_nulls=True), step_rows)
+        if benefit_rows:
+            self.session.execute(insert(remedy_benefits), benefit_rows)
+
+        self.created["remedies"] += len(remedy_ids)
+        return list(remedy_ids.values())
+
+    def flush(self):
+        """Write every queued record to the database without committing"""
+        plant_ids = self._flush_plants()
+        remedy_ids = self._flush_remedies()
+        # Core INSERTs bypass the ORM flush events
+        catalog_events.mark_changed(
+            self.session, catalog_events.CatalogChanges(plants=plant_ids, remedies=remedy_ids)
+        )
+
+    def commit(self):
+        """Write the queued records and commit the transaction"""
+        self.flush()
+        self.session.commit()
+        logger.info(f"Bulk load committed: created {self.created}, skipped {self.skipped}")
+
+
+# Text columns an API record must fill, as create_plant and create_remedy require
+REQUIRED_FIELDS = {
+    "plant": ("name", "scientific_name", "description"),
+    "remedy": ("name", "short_description", "description", "usage"),
+}
+OPTIONAL_STRINGS = {
+    "plant": ("usage", "category", "image", "image_url"),
+    "remedy": ("difficulty", "category", "doctor_email"),
+}
+# List key -> (key every dict element needs, the keys it may have); plain strings are accepted too
+CHILD_LISTS = {
+    "plant": {"images": ("url", {"url": str, "alt_text": str, "is_primary": bool})},
+    "remedy": {
+        "ingredients": ("name", {"name": str, "order": int}),
+        "preparation_steps": ("description", {"description": str, "step_number": int}),
+    },
+}
+
+
+def _child_error(key, item, required, types):
+    if isinstance(item, str):
+        return None if item else f"{key} must not contain empty strings"
+    if not isinstance(item, dict):
+        return f"{key} must contain strings or objects"
+    if not isinstance(item.get(required), str) or not item[required]:
+        return f"Every object in {key} needs a {required}"
+    for field, value in item.items():
+        if field not in types:
+            return f"Unknown field {field!r} in {key}"
+        if value is not None and (not isinstance(value, types[field]) or
+                                  (types[field] is int and isinstance(value, bool))):
+            return f"{key} {field} must be of type {types[field].__name__}"
+    return None
+
+
+def record_error(entity_type, record):
+    """Why an API record cannot be loaded, or None if it can"""
+    if not isinstance(record, dict):
+        return "Record must be an object"
+    for key in REQUIRED_FIELDS[entity_type]:
+        if not isinstance(record.get(key), str) or not record[key].strip():
+            return f"{key} is required"
+    for key in OPTIONAL_STRINGS[entity_type]:
+        if record.get(key) is not None and not isinstance(record[key], str):
+            return f"{key} must be a string"
+    if not isinstance(record.get("benefits", []), list):
+        return "benefits must be a list"
+    if not all(isinstance(name, str) and name for name in record.get("benefits", [])):
+        return "benefits must be non-empty strings"
+    for key, (required, types) in CHILD_LISTS[entity_type].items():
+        items = record.get(key, [])
+        if not isinstance(items, list):
+            return f"{key} must be a list"
+        for item in items:
+            error = _child_error(key, item, required, types)
+            if error:
+                return error
+    doctor_id = record.get("doctor_id")
+    if entity_type == "remedy" and doctor_id is not None and (
+            not isinstance(doctor_id, int) or isinstance(doctor_id, bool)):
+        return "doctor_id must be an integer"
+    return None
+
+
+def plant_images(record):
+    """Image rows for a plant record: the primary image first, then the others"""
+    primary = record.get("image") or record.get("image_url")
+    rows = []
+    if primary:
+        rows.append({"url": primary, "alt_text": f"{record['name']} image", "is_primary": True})
+    for image in record.get("images", []):
+        if isinstance(image, str):
+            image = {"url": image, "alt_text": None, "is_primary": False}
+        if image["url"] == primary:
+            continue
+        rows.append({"url": image["url"], "alt_text": image.get("alt_text"),
+                     "is_primary": bool(image.get("is_primary"))})
+    return rows
@@ -0,0 +1,179 @@
+"""
+Change tracking for the catalog models.
+
+Works out which plants and remedies a flush touched and hands that set to
+the registered listeners, so derived data (the search index, caches) can
+follow writes without every feature walking the session on its own.
+
+Flush listeners run inside the flush, on the session's connection, and so
+share its transaction. Commit listeners run once the transaction is durable
+and receive everything that changed since the previous commit.
+
+Each transaction that changes the catalog also increments the shared
+catalog_version row once. In-process state that follows commits through
+on_commit only sees this process's writes; comparing read_version()
+with the version it was built at tells it when another process has written.
+"""
+import logging
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from models import (
+    Plant, Remedy, PlantImage, ImageVariant, Ingredient, PreparationStep, Benefit,
+    PlantCategory, RemedyCategory, User, plant_benefits, remedy_benefits, catalog_version
+)
+
+logger = logging.getLogger(__name__)
+
+_flush_listeners = []
+_commit_listeners = []
+
+
+class CatalogChanges:
+    """Ids of the plants and remedies whose API representation may have changed"""
+
+    def __init__(self, plants=(), remedies=(), deleted_plants=(), deleted_remedies=()):
+        self.plants = set(plants)
+        self.remedies = set(remedies)
+        self.deleted_plants = set(deleted_plants)
+        self.deleted_remedies = set(deleted_remedies)
+        # catalog_version as of the transaction that made these changes
+        self.version = None
+
+    def update(self, other):
+        """Merge another set of changes into this one"""
+        self.plants |= other.plants
+        self.remedies |= other.remedies
+        self.deleted_plants |= other.deleted_plants
+        self.deleted_remedies |= other.deleted_remedies
+        # A row deleted later in the transaction stays deleted
+        self.plants -= self.deleted_plants
+        self.remedies -= self.deleted_remedies
+
+    def __bool__(self):
+        return bool(self.plants or self.remedies or self.deleted_plants or self.deleted_remedies)
+
+    def __repr__(self):
+        return (f"<CatalogChanges plants={sorted(self.plants)} remedies={sorted(self.remedies)} "
+                f"deleted_plants={sorted(self.deleted_plants)} deleted_remedies={sorted(self.deleted_remedies)}>")
+
+
+def on_flush(func):
+    """Register func(session, changes) to run inside every flush that touches the catalog"""
+    _flush_listeners.append(func)
+    return func
+
+
+def on_commit(func):
+    """Register func(changes) to run after every commit that touched the catalog"""
+    _commit_listeners.append(func)
+    return func
+
+
+def read_version(connection):
+    """The shared catalog version, as committed or as set by this connection's transaction"""
+    return connection.scalar(select(catalog_version.c.version).where(catalog_version.c.id == 1))
+
+
+def _bump_version(session):
+    connection = session.connection()
+    connection.execute(
+        update(catalog_version).where(catalog_version.c.id == 1).values(version=catalog_version.c.version + 1)
+    )
+    return read_version(connection)
+
+
+def collect_changes(session):
+    """Work out which plants and remedies the pending flush affects"""
+    changes = CatalogChanges()
+    connection = session.connection()
+
+    modified = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in list(session.new) + modified + list(session.deleted):
+        deleted = obj in session.deleted
+        if isinstance(obj, Plant):
+            (changes.deleted_plants if deleted else changes.plants).add(obj.id)
+        elif isinstance(obj, Remedy):
+            (changes.deleted_remedies if deleted else changes.remedies).add(obj.id)
+        elif isinstance(obj, PlantImage):
+            changes.plants.add(obj.plant_id)
+        elif isinstance(obj, (Ingredient, PreparationStep)):
+            changes.remedies.add(obj.remedy_id)
+        elif isinstance(obj, ImageVariant):
+            # Shared by every plant showing the same source image
+            changes.plants.update(connection.scalars(
+                select(PlantImage.plant_id).where(PlantImage.url == obj.source_url)
+            ))
+        elif obj in session.new:
+            # A new benefit, category or user is not referenced by anything yet
+            continue
+        elif isinstance(obj, Benefit):
+            changes.plants.update(connection.scalars(
+                select(plant_benefits.c.plant_id).where(plant_benefits.c.benefit_id == obj.id)
+            ))
+            changes.remedies.update(connection.scalars(
+                select(remedy_benefits.c.remedy_id).where(remedy_benefits.c.benefit_id == obj.id)
+            ))
+        elif isinstance(obj, PlantCategory):
+            changes.plants.update(connection.scalars(
+                select(Plant.id).where(Plant.category_id == obj.id)
+            ))
+        elif isinstance(obj, RemedyCategory):
+            changes.remedies.update(connection.scalars(
+                select(Remedy.id).where(Remedy.category_id == obj.id)
+            ))
+        elif isinstance(obj, User):
+            changes.remedies.update(connection.scalars(
+                select(Remedy.id).where(Remedy.doctor_id == obj.id)
+            ))
+
+    changes.plants -= changes.deleted_plants | {None}
+    changes.remedies -= changes.deleted_remedies | {None}
+    return changes
+
+
+def mark_changed(session, changes):
+    """
+    Report catalog changes made outside the ORM unit of work.
+
+    Bulk loaders that write with Core INSERT statements bypass the flush
+    events, so they call this to keep derived data in step.
+    """
+    if not changes:
+        return
+    for listener in _flush_listeners:
+        listener(session, changes)
+    pending = session.info.get('catalog_changes')
+    if pending is None:
+        pending = session.info['catalog_changes'] = CatalogChanges()
+        # Once per transaction
+        pending.version = _bump_version(session)
+    pending.update(changes)
+
+
+def _after_flush(session, flush_context):
+    changes = collect_changes(session)
+    mark_changed(session, changes)
+
+
+def _after_commit(session):
+    changes = session.info.pop('catalog_changes', None)
+    if not changes:
+        return
+    for listener in _commit_listeners:
+        try:
+            listener(changes)
+        except Exception as e:
+            # The data is already committed; a failing listener must not hide that
+            logger.error(f"Catalog commit listener {listener.__name__} failed: {str(e)}")
+
+
+def _after_rollback(session):
+    session.info.pop('catalog_changes', None)
+
+
+def install():
+    """Attach the change tracking listeners to every SQLAlchemy session"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
@@ -0,0 +1,209 @@
+"""
+Seeded generator for synthetic plant and remedy catalogs
+
+    python catalog_generator.py --plants 10000 --remedies 10000
+    python catalog_generator.py --plants 100000 --remedies 100000 --output catalog.ndjson.gz
+
+Records have the same shape as the API payloads and catalog_io.py lines,
+so they can be posted to the CRUD routes, loaded with BulkLoader or
+written to NDJSON. The same seed always produces the same catalog.
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+from app import app, db
+from models import User
+from bulk_loader import BulkLoader, DEFAULT_BATCH_SIZE
+from catalog_io import open_stream
+import migrations
+
+logger = logging.getLogger(__name__)
+
+HERBS = [
+    "Ashwagandha", "Tulsi", "Turmeric", "Ginger", "Neem", "Brahmi", "Shatavari", "Amla",
+    "Giloy", "Triphala", "Licorice", "Fenugreek", "Cardamom", "Cinnamon", "Clove", "Fennel",
+    "Coriander", "Cumin", "Moringa", "Guggul", "Arjuna", "Bhringraj", "Gotu Kola", "Haritaki",
+    "Bibhitaki", "Manjistha", "Punarnava", "Shilajit", "Kutki", "Vidanga", "Pippali", "Chamomile",
+    "Peppermint", "Lavender", "Rosemary", "Sage", "Thyme", "Lemon Balm", "Valerian", "Echinacea",
+    "Elderberry", "Calendula", "Dandelion", "Nettle", "Hibiscus", "Hawthorn", "Ginkgo", "Milk Thistle",
+    "Saw Palmetto", "Aloe Vera", "Holy Basil", "Jatamansi", "Vacha", "Yashtimadhu", "Bala", "Kalmegh",
+]
+PREFIXES = ["", "Wild", "Indian", "Mountain", "Golden", "Sweet", "Bitter", "Red", "White", "Black",
+            "Forest", "Desert", "Sacred", "Dwarf", "Giant", "Himalayan"]
+GENERA = ["Withania", "Ocimum", "Curcuma", "Zingiber", "Azadirachta", "Bacopa", "Asparagus",
+          "Phyllanthus", "Tinospora", "Glycyrrhiza", "Trigonella", "Elettaria", "Cinnamomum",
+          "Foeniculum", "Moringa", "Commiphora", "Terminalia", "Eclipta", "Centella", "Rubia",
+          "Boerhavia", "Picrorhiza", "Piper", "Matricaria", "Mentha", "Lavandula", "Salvia"]
+EPITHETS = ["somnifera", "tenuiflorum", "longa", "officinale", "indica", "monnieri", "racemosus",
+            "emblica", "cordifolia", "glabra", "foenum-graecum", "cardamomum", "verum", "vulgare",
+            "oleifera", "wightii", "arjuna", "prostrata", "asiatica", "cordifolia", "diffusa",
+            "kurroa", "longum", "chamomilla", "piperita", "angustifolia", "officinalis"]
+PLANT_CATEGORIES = ["Adaptogens", "Digestive Herbs", "Immune Boosters", "Nervines", "Rasayanas",
+                    "Respiratory Herbs", "Skin Care Herbs", "Culinary Herbs", "Women's Health",
+                    "Detoxifiers", "Anti-inflammatories", "Heart Tonics"]
+REMEDY_CATEGORIES = ["Digestive Health", "Respiratory Care", "Stress Relief", "Skin Care",
+                     "Immunity", "Sleep Support", "Joint Care", "Hair Care", "Detox", "Women's Health",
+                     "Energy and Vitality", "First Aid"]
+BENEFIT_VERBS = ["Supports", "Improves", "Reduces", "Relieves", "Strengthens", "Balances",
+                 "Soothes", "Promotes", "Enhances", "Calms"]
+BENEFIT_TARGETS = ["digestion", "immunity", "stress", "sleep quality", "inflammation", "joint pain",
+                   "skin health", "respiratory health", "memory", "energy levels", "blood sugar",
+                   "heart health", "liver function", "hair growth", "cough and cold", "anxiety",
+                   "menstrual discomfort", "circulation", "metabolism", "oral health"]
+BENEFITS = [f"{verb} {target}" for verb in BENEFIT_VERBS for target in BENEFIT_TARGETS]
+REMEDY_FORMS = ["Tea", "Decoction", "Tincture", "Paste", "Oil", "Powder", "Syrup", "Infusion",
+                "Compress", "Steam Inhalation", "Latte", "Gargle"]
+BASES = ["Water", "Honey", "Ghee", "Milk", "Coconut Oil", "Sesame Oil", "Jaggery", "Lemon Juice",
+         "Rock Salt", "Black Pepper", "Rose Water", "Almond Milk"]
+ACTIONS = ["Boil", "Steep", "Grind", "Mix", "Strain", "Warm", "Simmer", "Stir in", "Cool", "Store"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+DOCTORS = [
+    ("Dr. Vasant Lad", "vasant.lad@example.com"),
+    ("Dr. David Frawley", "david.frawley@example.com"),
+    ("Dr. Deepak Chopra", "deepak.chopra@example.com"),
+    ("Dr. Robert Svoboda", "robert.svoboda@example.com"),
+    ("Dr. Claudia Welch", "claudia.welch@example.com"),
+]
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def _numbered(base, number):
+    """base for the first of its name, then "base var. 2", "base var. 3" and so on"""
+    return base if number == 0 else f"{base} var. {number + 1}"
+
+
+def _sentences(rng, subject, benefits):
+    parts = [
+        f"{subject} has been used in traditional Ayurvedic practice for centuries.",
+        f"It is valued because it {benefits[0].lower()}" + (
+            f" and {benefits[1].lower()}." if len(benefits) > 1 else "."),
+        rng.choice([
+            "Modern studies have begun to examine its active compounds.",
+            "It is usually taken in small, regular doses.",
+            "Practitioners often combine it with warming spices.",
+            "It is considered suitable for most constitutions.",
+        ]),
+    ]
+    return " ".join(parts)
+
+
+def plant_record(rng, index):
+    """One synthetic plant in API payload form"""
+    combos = len(PREFIXES) * len(HERBS)
+    prefix = PREFIXES[index % len(PREFIXES)]
+    herb = HERBS[(index // len(PREFIXES)) % len(HERBS)]
+    name = _numbered(f"{prefix} {herb}".strip(), index // combos)
+    benefits = rng.sample(BENEFITS, rng.randint(2, 6))
+    slug = slugify(name)
+    return {
+        "name": name,
+        "scientific_name": f"{rng.choice(GENERA)} {rng.choice(EPITHETS)}",
+        "description": _sentences(rng, name, benefits),
+        "usage": f"{rng.choice(['Take', 'Drink', 'Apply'])} {rng.randint(1, 3)} times daily as "
+                 f"{rng.choice(['a tea', 'a powder with warm water', 'a paste', 'capsules'])}.",
+        "category": rng.choice(PLANT_CATEGORIES),
+        "benefits": benefits,
+        "image": f"/static/images/plants/{slug}.jpg",
+        "images": [f"/static/images/plants/{slug}_{n}.jpg" for n in range(1, rng.randint(1, 4))],
+    }
+
+
+def remedy_record(rng, index):
+    """One synthetic remedy in API payload form"""
+    combos = len(HERBS) * len(REMEDY_FORMS)
+    herb = HERBS[index % len(HERBS)]
+    form = REMEDY_FORMS[(index // len(HERBS)) % len(REMEDY_FORMS)]
+    name = _numbered(f"{herb} {form}", index // combos)
+    benefits = rng.sample(BENEFITS, rng.randint(2, 5))
+    ingredients = [herb] + rng.sample([h for h in HERBS if h != herb], rng.randint(1, 4))
+    ingredients += rng.sample(BASES, rng.randint(1, 3))
+    steps = [f"{rng.choice(ACTIONS)} the {ingredient.lower()} for {rng.randint(1, 15)} minutes."
+             for ingredient in ingredients[:rng.randint(3, 7)]]
+    return {
+        "name": name,
+        "short_description": f"A {form.lower()} of {herb} that {benefits[0].lower()}.",
+        "description": _sentences(rng, f"This {form.lower()}", benefits),
+        "difficulty": rng.choice(DIFFICULTIES),
+        "usage": f"Use {rng.randint(1, 3)} times daily for up to {rng.randint(1, 6)} weeks.",
+        "category": rng.choice(REMEDY_CATEGORIES),
+        "benefits": benefits,
+        "ingredients": ingredients,
+        "preparation_steps": steps,
+        "doctor_email": rng.choice(DOCTORS)[1] if rng.random() < 0.6 else None,
+    }
+
+
+def generate_plants(count, seed=0, start=0):
+    """Yield count plant records; the same seed and start give the same records"""
+    rng = random.Random(f"plants-{seed}")
+    for index in range(start, start + count):
+        yield plant_record(rng, index)
+
+
+def generate_remedies(count, seed=0, start=0):
+    """Yield count remedy records; the same seed and start give the same records"""
+    rng = random.Random(f"remedies-{seed}")
+    for index in range(start, start + count):
+        yield remedy_record(rng, index)
+
+
+def ensure_doctors():
+    """Create the doctor accounts the generated remedies refer to"""
+    existing = {user.email for user in User.query.filter(User.email.in_([email for _, email in DOCTORS]))}
+    for name, email in DOCTORS:
+        if email not in existing:
+            doctor = User(name=name, email=email, is_doctor=True)
+            doctor.set_password("doctor123")
+            db.session.add(doctor)
+    db.session.commit()
+
+
+def load_catalog(plants, remedies, seed=0, batch_size=DEFAULT_BATCH_SIZE):
+    """Write a generated catalog to the app database through BulkLoader, creating the schema if needed"""
+    migrations.create_schema(db.engine)
+    ensure_doctors()
+    loader = BulkLoader(batch_size=batch_size)
+    for record in generate_plants(plants, seed):
+        loader.add_plant(record)
+    for record in generate_remedies(remedies, seed):
+        loader.add_remedy(record)
+    loader.commit()
+    return loader
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Herbal Life catalog")
+    parser.add_argument("--plants", type=int, default=1000)
+    parser.add_argument("--remedies", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write NDJSON here instead of loading into the database")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        stream = open_stream(args.output, 'w')
+        try:
+            for record_type, records in (("plant", generate_plants(args.plants, args.seed)),
+                                         ("remedy", generate_remedies(args.remedies, args.seed))):
+                for record in records:
+                    stream.write(json.dumps(dict(record, type=record_type)))
+                    stream.write('\n')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        logger.info(f"Wrote {args.plants} plants and {args.remedies} remedies to {args.output}")
+        return
+
+    with app.app_context():
+        loader = load_catalog(args.plants, args.remedies, args.seed)
+        logger.info(f"Generated catalog: created {loader.created}, skipped {loader.skipped}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,187 @@
+"""
+Script to export and import the full catalog as NDJSON
+
+    python catalog_io.py export catalog.ndjson.gz
+    python catalog_io.py import catalog.ndjson.gz
+
+Each line is one JSON record with a "type" of "plant" or "remedy" and the
+same keys BulkLoader accepts, so an export from one database (e.g. SQLite)
+can be imported into another (e.g. PostgreSQL via DATABASE_URL). Both sides
+are generator pipelines and hold only one batch of records in memory:
+the export reads with yield_per server-side cursors, the import writes
+through BulkLoader and commits after every batch. Files ending in .gz are
+compressed transparently; "-" means stdin/stdout.
+
+Doctors are exported by email and must already exist on the importing side.
+Every line is checked like a bulk API record; the import stops at the first
+bad line, reporting it as path:line. The batches before it stay committed,
+and running the import again skips the names that already exist.
+"""
+import argparse
+import gzip
+import json
+import logging
+import sys
+from sqlalchemy import select
+from app import app, db
+from models import Plant, Remedy
+from query_options import plant_loader_options, remedy_loader_options
+from bulk_loader import BulkLoader, DEFAULT_BATCH_SIZE, record_error
+import migrations
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+logger = logging.getLogger(__name__)
+
+
+def open_stream(path, mode):
+    """Open path for text I/O, handling '-' and gzip compression"""
+    if path == '-':
+        return sys.stdout if mode == 'w' else sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def plant_record(plant):
+    """Export record for a plant"""
+    return {
+        "type": "plant",
+        "name": plant.name,
+        "scientific_name": plant.scientific_name,
+        "description": plant.description,
+        "usage": plant.usage,
+        "category": plant.category.name if plant.category else None,
+        "benefits": [benefit.name for benefit in plant.benefits],
+        "images": [
+            {"url": image.url, "alt_text": image.alt_text, "is_primary": bool(image.is_primary)}
+            for image in plant.images
+        ],
+    }
+
+
+def remedy_record(remedy):
+    """Export record for a remedy"""
+    return {
+        "type": "remedy",
+        "name": remedy.name,
+        "short_description": remedy.short_description,
+        "description": remedy.description,
+        "difficulty": remedy.difficulty,
+        "usage": remedy.usage,
+        "category": remedy.category.name if remedy.category else None,
+        "benefits": [benefit.name for benefit in remedy.benefits],
+        "ingredients": [
+            {"name": ingredient.name, "order": ingredient.order}
+            for ingredient in sorted(remedy.ingredients, key=lambda x: (x.order or 0, x.id))
+        ],
+        "preparation_steps": [
+            {"description": step.description, "step_number": step.step_number}
+            for step in sorted(remedy.preparation_steps, key=lambda x: x.step_number)
+        ],
+        "doctor_email": remedy.doctor.email if remedy.doctor else None,
+    }
+
+
+def iter_records(batch_size=DEFAULT_BATCH_SIZE):
+    """Yield export records for every plant, then every remedy, one batch at a time"""
+    sources = (
+        (Plant, plant_loader_options(), plant_record),
+        (Remedy, remedy_loader_options(), remedy_record),
+    )
+    for model, options, to_record in sources:
+        result = db.session.execute(
+            select(model).options(*options).order_by(model.id).execution_options(yield_per=batch_size)
+        )
+        # The identity map only holds weak references to unmodified objects,
+        # so each exported batch is released once the next one is fetched
+        for partition in result.scalars().partitions():
+            for entity in partition:
+                yield to_record(entity)
+
+
+def export_catalog(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Write the catalog to path as NDJSON"""
+    count = 0
+    stream = open_stream(path, 'w')
+    try:
+        for record in iter_records(batch_size):
+            stream.write(json.dumps(record, ensure_ascii=False))
+            stream.write('\n')
+            count += 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    logger.info(f"Exported {count} records to {path}")
+    return count
+
+
+def read_records(stream, name='-'):
+    """Yield (line number, record) for the records of an NDJSON stream, skipping blank lines"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{name}:{line_number}: Invalid JSON: {e}")
+
+
+def import_catalog(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Load the NDJSON catalog at path, committing after every batch"""
+    loader = BulkLoader(batch_size=batch_size)
+    pending = 0
+    stream = open_stream(path, 'r')
+    try:
+        for line_number, record in read_records(stream, path):
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{line_number}: Record must be an object")
+            record_type = record.pop("type", None)
+            if record_type not in ("plant", "remedy"):
+                logger.warning(f"{path}:{line_number}: Skipping record with unknown type: {record_type!r}")
+                continue
+            error = record_error(record_type, record)
+            if error:
+                raise ValueError(f"{path}:{line_number}: {error}")
+            if record_type == "plant":
+                loader.add_plant(record)
+            else:
+                loader.add_remedy(record)
+            pending += 1
+            if pending >= batch_size:
+                loader.commit()
+                pending = 0
+        loader.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    logger.info(f"Imported from {path}: created {loader.created}, skipped {loader.skipped}")
+    return loader
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import the Herbal Life catalog as NDJSON")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="NDJSON file (.gz for gzip, - for stdin/stdout)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="records per database round trip (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        if args.command == "export":
+            export_catalog(args.path, args.batch_size)
+        else:
+            # The target may be a brand new database
+            migrations.create_schema(db.engine)
+            try:
+                import_catalog(args.path, args.batch_size)
+            except ValueError as e:
+                logger.error(str(e))
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
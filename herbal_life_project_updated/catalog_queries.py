@@ -0,0 +1,89 @@
+"""
+The list queries behind /api/plants and /api/remedies.
+
+Shared by the Flask routes and the async read API (asgi.py). The
+arguments can be any mapping with get() and getlist(), such as Flask's
+request.args or Starlette's query_params. The queries run on a plain
+SQLAlchemy Session; the async app hands them the sync facade of an
+AsyncSession through run_sync(), so both apps answer with the same bodies.
+"""
+from sqlalchemy import select
+import documents
+import facets
+import projections
+import search_index
+from json_provider import Fragment
+from models import Plant, Remedy, PlantCategory, RemedyCategory, catalog_document
+from pagination import parse_limit, parse_projection, decode_cursor, paginate
+
+ENTITIES = {'plant': (Plant, PlantCategory), 'remedy': (Remedy, RemedyCategory)}
+# Key of the item list in the response body
+LIST_KEYS = {'plant': 'plants', 'remedy': 'remedies'}
+# Types of the cursor values for each sort order: (name, id) or (search rank, id)
+CURSOR_TYPES = {'name': ((str,), (int,)), 'rank': ((int, float), (int,))}
+
+
+def parse_list_args(args, entity_type):
+    """Validated paging, projection, filter and facet parameters; raises ValueError"""
+    model, _ = ENTITIES[entity_type]
+    # Search results are ordered by rank, everything else by name
+    sort = 'rank' if args.get('search') else 'name'
+    return {
+        "limit": parse_limit(args.get('limit')),
+        "sort": sort,
+        "cursor": decode_cursor(args.get('cursor'), sort, CURSOR_TYPES[sort]),
+        "fields": parse_projection(args.get('fields'), args.get('view'),
+                                   model.api_fields, model.api_summary_fields),
+        "filters": facets.parse_filters(args, entity_type),
+        "facets": facets.parse_facets(args.get('facets'), entity_type),
+        "category": args.get('category'),
+        "search": args.get('search'),
+    }
+
+
+def list_page(session, entity_type, params):
+    """Response body of one list page: the items, next_cursor and any requested facets"""
+    model, category_model = ENTITIES[entity_type]
+    fields = params["fields"]
+    if fields:
+        # Only the columns behind the requested keys
+        query = projections.projection_query(session, entity_type, fields)
+    else:
+        # Page through ids and their stored API documents; no ORM objects are built
+        query = session.query(catalog_document.c.document, model.name, model.id).join(
+            catalog_document, documents.join_condition(entity_type, model.id)
+        )
+
+    # Apply filters if provided; the facet counts respect `scope` too
+    scope = []
+    category = params["category"]
+    if category and category.lower() != 'all':
+        scope.append(model.category_id.in_(
+            select(category_model.id).where(category_model.name.ilike(f'%{category}%'))
+        ))
+    query = query.filter(*scope, *facets.filter_clauses(entity_type, params["filters"]))
+
+    if params["sort"] == 'rank':
+        # Full-text match over names, descriptions, ingredients and benefits, best ranked first
+        matches = search_index.match(params["search"], entity_type)
+        query = query.join(matches, matches.c.entity_id == model.id).add_columns(matches.c.rank)
+        scope.append(model.id.in_(select(matches.c.entity_id)))
+        order_by, key = (matches.c.rank, model.id), lambda row: (row.rank, row.id)
+    else:
+        order_by, key = (model.name, model.id), lambda row: (row.name, row.id)
+
+    # Execute the query one page at a time
+    rows, next_cursor = paginate(query, order_by, key, limit=params["limit"], cursor=params["cursor"],
+                                 sort=params["sort"])
+
+    if fields:
+        items = projections.project_rows(session.connection(), entity_type, fields, rows)
+    else:
+        # Stored documents are spliced into the body without re-encoding
+        items = [Fragment(row.document) for row in rows]
+    body = {LIST_KEYS[entity_type]: items, "next_cursor": next_cursor}
+    if params["facets"]:
+        # Grouped counts over everything the filters select, not just this page
+        body["facets"] = facets.facet_counts(session.connection(), entity_type, params["facets"],
+                                             params["filters"], scope)
+    return body
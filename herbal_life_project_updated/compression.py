@@ -0,0 +1,129 @@
+"""
+gzip and brotli compression of dynamic responses.
+
+Text responses (JSON, HTML, CSS, JavaScript) of at least
+COMPRESS_MIN_SIZE bytes are compressed with the best encoding the client
+lists in Accept-Encoding: brotli when the brotli package is installed,
+gzip otherwise. Smaller bodies go out as they are, since the encoding
+overhead would outweigh the saving. Streamed responses are compressed
+chunk by chunk as they are sent.
+
+Responses that are already encoded are left alone. This covers the
+precompressed static files served by static_assets and any file sent
+with send_file. Compressed bodies are cached under their ETag, so a hit in
+response_cache pays for compression once per catalog version rather
+than once per request. The ETag of a compressed response becomes weak,
+because the bytes differ from the identity body while the content does not.
+Conditional requests are evaluated beforehand on the uncompressed body by
+http_caching, so 304 Not Modified still works.
+"""
+import gzip
+import zlib
+from flask import current_app, request
+from response_cache import ResponseCache
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_CACHE_ENTRIES = 256
+# Fast settings; cached bodies are compressed once, everything else on every request
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/javascript', 'image/svg+xml')
+
+# (etag, encoding) -> compressed body
+compressed_bodies = ResponseCache(max_entries=DEFAULT_CACHE_ENTRIES, ttl=24 * 60 * 60)
+
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding():
+    """The preferred encoding the request accepts, or None"""
+    accepted = request.accept_encodings
+    for encoding in available_encodings():
+        if accepted[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            data = process(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ''
+    if response.cache_control.no_transform:
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def compress_response(response):
+    """Compress the response body when it is large enough and the client accepts it"""
+    if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or not _compressible(response)):
+        return response
+    min_size = current_app.config.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE)
+    if not response.is_streamed and response.content_length is not None and response.content_length < min_size:
+        return response
+
+    # The body depends on Accept-Encoding from here on, whichever way it goes
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        etag, weak = response.get_etag()
+        key = (etag, encoding) if etag else None
+        body = compressed_bodies.get(key) if key else None
+        if body is None:
+            body = compress(response.get_data(), encoding)
+            if key:
+                compressed_bodies.set(key, body)
+        response.set_data(body)
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+    response.content_encoding = encoding
+    return response
+
+
+def init_app(app):
+    """
+    Register the compression hook on the app.
+
+    Call before http_caching.init_app: after_request hooks run in reverse
+    order, so this one then sees the validators already applied.
+    """
+    if not app.config.get("RESPONSE_COMPRESSION", True):
+        return
+    compressed_bodies.max_entries = app.config.get("COMPRESS_CACHE_ENTRIES", DEFAULT_CACHE_ENTRIES)
+    app.after_request(compress_response)
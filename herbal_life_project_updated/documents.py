@@ -0,0 +1,236 @@
+"""
+Materialized JSON documents behind the plant and remedy read APIs.
+
+The catalog_document table holds the serialized to_dict() output of every
+plant and remedy. The list and detail routes read those strings with one
+indexed query and splice them into the response body as json_provider
+Fragments, so serving a page builds no ORM objects and encodes no JSON.
+
+Documents are regenerated inside the flush that changes an entity or
+anything it embeds (category, benefits, images, ingredients, steps, doctor),
+using the affected ids worked out by catalog_events, so they commit or roll
+back together with the catalog rows.
+"""
+import logging
+from sqlalchemy import and_, delete, insert, select
+import catalog_events
+import json_provider
+from models import (
+    Plant, Remedy, PlantCategory, RemedyCategory, PlantImage, ImageVariant, Benefit, Ingredient,
+    PreparationStep, User, plant_benefits, remedy_benefits, catalog_document, image_srcset
+)
+
+logger = logging.getLogger(__name__)
+
+# Documents are regenerated for this many entities per query
+BATCH_SIZE = 500
+
+
+def encode(data):
+    """Serialize like the app's jsonify(): sorted keys, compact, UTF-8"""
+    return json_provider.dumps(data)
+
+
+def _grouped(rows):
+    grouped = {}
+    for entity_id, value in rows:
+        grouped.setdefault(entity_id, []).append(value)
+    return grouped
+
+
+def category_info(category_id, name):
+    """The category_info value of a document"""
+    return {"id": category_id, "name": name} if name is not None else None
+
+
+def doctor_info(doctor_id, name, is_doctor):
+    """The doctor value of a remedy document"""
+    return {"id": doctor_id, "name": name, "is_doctor": is_doctor} if doctor_id is not None else None
+
+
+def plant_benefit_names(connection, ids):
+    """{plant id: [benefit names]} in Plant.benefits order"""
+    return _grouped(connection.execute(
+        select(plant_benefits.c.plant_id, Benefit.name)
+        .join(Benefit, Benefit.id == plant_benefits.c.benefit_id)
+        .where(plant_benefits.c.plant_id.in_(ids))
+        .order_by(plant_benefits.c.plant_id, Benefit.id)
+    ))
+
+
+def plant_image_urls(connection, ids):
+    """{plant id: [image urls]} in Plant.images order, the primary image first"""
+    return _grouped(connection.execute(
+        select(PlantImage.plant_id, PlantImage.url)
+        .where(PlantImage.plant_id.in_(ids))
+        .order_by(PlantImage.plant_id, PlantImage.id)
+    ))
+
+
+def image_srcsets(connection, urls):
+    """{image url: image_srcset()} for the given source images that have variants"""
+    if not urls:
+        return {}
+    variants = _grouped(
+        (source_url, (image_format, width, url))
+        for source_url, image_format, width, url in connection.execute(
+            select(ImageVariant.source_url, ImageVariant.format, ImageVariant.width, ImageVariant.url)
+            .where(ImageVariant.source_url.in_(urls))
+            .order_by(ImageVariant.source_url, ImageVariant.format, ImageVariant.width)
+        )
+    )
+    return {url: image_srcset(triples) for url, triples in variants.items()}
+
+
+def plant_documents(connection, ids):
+    """Yield (id, document dict) for the given plants, matching Plant.to_dict()"""
+    rows = connection.execute(
+        select(Plant.id, Plant.name, Plant.scientific_name, Plant.description, Plant.usage,
+               Plant.category_id, PlantCategory.name)
+        .outerjoin(PlantCategory, PlantCategory.id == Plant.category_id)
+        .where(Plant.id.in_(ids))
+    ).all()
+    benefits = plant_benefit_names(connection, ids)
+    images = plant_image_urls(connection, ids)
+    srcsets = image_srcsets(connection, {urls[0] for urls in images.values()})
+
+    for plant_id, name, scientific_name, description, usage, category_id, category_name in rows:
+        urls = images.get(plant_id, [])
+        yield plant_id, {
+            "id": plant_id,
+            "name": name,
+            "scientific_name": scientific_name,
+            "category": category_name,
+            "category_id": category_id,
+            "category_info": category_info(category_id, category_name),
+            "benefits": benefits.get(plant_id, []),
+            "description": description,
+            "usage": usage,
+            "image": urls[0] if urls else None,
+            "image_srcset": srcsets.get(urls[0]) if urls else None,
+            "images": urls,
+        }
+
+
+def remedy_benefit_names(connection, ids):
+    """{remedy id: [benefit names]} in Remedy.benefits order"""
+    return _grouped(connection.execute(
+        select(remedy_benefits.c.remedy_id, Benefit.name)
+        .join(Benefit, Benefit.id == remedy_benefits.c.benefit_id)
+        .where(remedy_benefits.c.remedy_id.in_(ids))
+        .order_by(remedy_benefits.c.remedy_id, Benefit.id)
+    ))
+
+
+def remedy_ingredient_names(connection, ids):
+    """{remedy id: [ingredient names]} in Remedy.ingredients order"""
+    return _grouped(connection.execute(
+        select(Ingredient.remedy_id, Ingredient.name)
+        .where(Ingredient.remedy_id.in_(ids))
+        .order_by(Ingredient.remedy_id, Ingredient.order, Ingredient.id)
+    ))
+
+
+def remedy_preparation_steps(connection, ids):
+    """{remedy id: [{"number", "description"}]} ordered by step number"""
+    return _grouped(
+        (remedy_id, {"number": number, "description": description})
+        for remedy_id, number, description in connection.execute(
+            select(PreparationStep.remedy_id, PreparationStep.step_number, PreparationStep.description)
+            .where(PreparationStep.remedy_id.in_(ids))
+            .order_by(PreparationStep.remedy_id, PreparationStep.step_number, PreparationStep.id)
+        )
+    )
+
+
+def remedy_documents(connection, ids):
+    """Yield (id, document dict) for the given remedies, matching Remedy.to_dict()"""
+    rows = connection.execute(
+        select(Remedy.id, Remedy.name, Remedy.short_description, Remedy.description,
+               Remedy.difficulty, Remedy.usage, Remedy.category_id, RemedyCategory.name,
+               User.id, User.name, User.is_doctor)
+        .outerjoin(RemedyCategory, RemedyCategory.id == Remedy.category_id)
+        .outerjoin(User, User.id == Remedy.doctor_id)
+        .where(Remedy.id.in_(ids))
+    ).all()
+    benefits = remedy_benefit_names(connection, ids)
+    ingredients = remedy_ingredient_names(connection, ids)
+    steps = remedy_preparation_steps(connection, ids)
+
+    for (remedy_id, name, short_description, description, difficulty, usage, category_id,
+         category_name, doctor_id, doctor_name, is_doctor) in rows:
+        yield remedy_id, {
+            "id": remedy_id,
+            "name": name,
+            "short_description": short_description,
+            "category": category_name,
+            "category_id": category_id,
+            "category_info": category_info(category_id, category_name),
+            "difficulty": difficulty,
+            "ingredients": ingredients.get(remedy_id, []),
+            "description": description,
+            "preparation_steps": steps.get(remedy_id, []),
+            "usage": usage,
+            "benefits": benefits.get(remedy_id, []),
+            "doctor": doctor_info(doctor_id, doctor_name, is_doctor),
+        }
+
+
+BUILDERS = {'plant': plant_documents, 'remedy': remedy_documents}
+
+
+def _delete_documents(connection, entity_type, ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        connection.execute(delete(catalog_document).where(and_(
+            catalog_document.c.entity_type == entity_type,
+            catalog_document.c.entity_id.in_(ids[start:start + BATCH_SIZE])
+        )))
+
+
+def write_documents(connection, entity_type, ids):
+    """Replace the stored documents of the given entities with their current data"""
+    ids = sorted(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        _delete_documents(connection, entity_type, batch)
+        rows = [
+            {"entity_type": entity_type, "entity_id": entity_id, "document": encode(data)}
+            for entity_id, data in BUILDERS[entity_type](connection, batch)
+        ]
+        if rows:
+            connection.execute(insert(catalog_document), rows)
+
+
+@catalog_events.on_flush
+def _sync_documents(session, changes):
+    """Regenerate the documents a flush invalidated, in the same transaction"""
+    connection = session.connection()
+    _delete_documents(connection, 'plant', changes.deleted_plants)
+    _delete_documents(connection, 'remedy', changes.deleted_remedies)
+    write_documents(connection, 'plant', changes.plants)
+    write_documents(connection, 'remedy', changes.remedies)
+
+
+def rebuild(connection):
+    """Regenerate every document from the catalog tables"""
+    connection.execute(delete(catalog_document))
+    write_documents(connection, 'plant', list(connection.scalars(select(Plant.id))))
+    write_documents(connection, 'remedy', list(connection.scalars(select(Remedy.id))))
+    logger.info("Catalog documents rebuilt")
+
+
+def get_document(connection, entity_type, entity_id):
+    """The stored JSON text of one plant or remedy, or None if it does not exist"""
+    return connection.scalar(
+        select(catalog_document.c.document).where(and_(
+            catalog_document.c.entity_type == entity_type,
+            catalog_document.c.entity_id == entity_id
+        ))
+    )
+
+
+def join_condition(entity_type, id_column):
+    """ON clause joining catalog_document to the entity table's id column"""
+    return and_(catalog_document.c.entity_type == entity_type, catalog_document.c.entity_id == id_column)
+
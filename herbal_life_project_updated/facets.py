@@ -0,0 +1,172 @@
+"""
+Server-side filters and facet counts for the plant and remedy lists.
+
+Filters (query parameters of /api/plants and /api/remedies):
+
+    category_id   exact category id
+    benefit       benefit id; repeat or comma-separate for "has all of these"
+    difficulty    remedies only, exact value such as Easy
+    doctor        remedies only, the doctor's user id
+    ingredient    remedies only, ingredient name (case-insensitive); repeatable, all must match
+
+`facets=category,benefit,...` adds a "facets" object with one list of
+{"value", "name", "count"} per requested facet, most frequent first. The
+value is what goes back into the filter parameter. Counts cover the rows
+the other filters (and search) select. Single-choice facets (category,
+difficulty, doctor) ignore their own filter, so the alternatives keep their
+counts. Multi-choice facets (benefit, ingredient) narrow as values are
+added. Every facet is one grouped aggregate query over the indexed
+foreign key and association columns. No entity is loaded.
+"""
+from sqlalchemy import func, select
+from models import (
+    Plant, Remedy, PlantCategory, RemedyCategory, Benefit, Ingredient, User, plant_benefits, remedy_benefits
+)
+
+# Values returned per facet; categories, difficulties and doctors are few
+FACET_LIMIT = 50
+
+FILTERS = {
+    'plant': ('category_id', 'benefit'),
+    'remedy': ('category_id', 'benefit', 'difficulty', 'doctor', 'ingredient'),
+}
+FACETS = {
+    'plant': ('category', 'benefit'),
+    'remedy': ('category', 'benefit', 'difficulty', 'doctor', 'ingredient'),
+}
+# Facet name -> the filter it refines, for the facets that ignore their own filter
+SINGLE_CHOICE = {'category': 'category_id', 'difficulty': 'difficulty', 'doctor': 'doctor'}
+
+_MODELS = {'plant': Plant, 'remedy': Remedy}
+_CATEGORIES = {'plant': PlantCategory, 'remedy': RemedyCategory}
+_BENEFIT_LINKS = {'plant': plant_benefits.c.plant_id, 'remedy': remedy_benefits.c.remedy_id}
+
+
+def _split(values):
+    return [value.strip() for item in values for value in item.split(',') if value.strip()]
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value!r}")
+
+
+def parse_filters(args, entity_type):
+    """The facet filters present in the request args, validated; raises ValueError"""
+    filters = {}
+    for name in FILTERS[entity_type]:
+        values = _split(args.getlist(name))
+        if not values:
+            continue
+        if name == 'benefit':
+            filters[name] = sorted({_int(value, name) for value in values})
+        elif name == 'ingredient':
+            filters[name] = sorted({value.lower() for value in values})
+        elif len(values) > 1:
+            raise ValueError(f"Only one {name} can be given")
+        elif name == 'difficulty':
+            filters[name] = values[0]
+        else:
+            filters[name] = _int(values[0], name)
+    return filters
+
+
+def parse_facets(value, entity_type):
+    """Parse the comma-separated `facets` parameter"""
+    if not value:
+        return []
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in FACETS[entity_type]]
+    if unknown:
+        raise ValueError(f"Unknown facets: {', '.join(unknown)}")
+    return names
+
+
+def filter_clauses(entity_type, filters, exclude=None):
+    """WHERE clauses on the entity table for the given filters, leaving out `exclude`"""
+    model = _MODELS[entity_type]
+    link = _BENEFIT_LINKS[entity_type]
+    clauses = []
+    for name, value in filters.items():
+        if name == exclude:
+            continue
+        if name == 'category_id':
+            clauses.append(model.category_id == value)
+        elif name == 'benefit':
+            # One indexed lookup per benefit; together they require all of them
+            clauses += [model.id.in_(select(link).where(link.table.c.benefit_id == benefit_id))
+                        for benefit_id in value]
+        elif name == 'difficulty':
+            clauses.append(Remedy.difficulty == value)
+        elif name == 'doctor':
+            clauses.append(Remedy.doctor_id == value)
+        elif name == 'ingredient':
+            clauses += [Remedy.id.in_(
+                select(Ingredient.remedy_id).where(func.lower(Ingredient.name) == ingredient)
+            ) for ingredient in value]
+    return clauses
+
+
+def _top(value, clauses, count=None):
+    """Subquery of the FACET_LIMIT most frequent values, as (value, count)"""
+    count = (count if count is not None else func.count()).label('count')
+    return (
+        select(value.label('value'), count)
+        .where(value.isnot(None), *clauses)
+        .group_by(value)
+        .order_by(count.desc(), value)
+        .limit(FACET_LIMIT)
+        .subquery()
+    )
+
+
+def _named(top, name_column, id_column):
+    """(value, name, count) rows of a _top() subquery joined to the names"""
+    return (
+        select(top.c.value, name_column, top.c.count)
+        .join_from(top, id_column.table, id_column == top.c.value)
+        .order_by(top.c.count.desc(), name_column)
+    )
+
+
+def facet_counts(connection, entity_type, names, filters, scope=()):
+    """
+    {facet: [{"value", "name", "count"}]} for the requested facets.
+
+    `scope` holds extra clauses on the entity table that every count
+    respects, such as the search match. Values are counted on the indexed
+    foreign key columns alone; names are joined to the top values afterwards.
+    """
+    model = _MODELS[entity_type]
+    counts = {}
+    for name in names:
+        clauses = list(scope) + filter_clauses(entity_type, filters, exclude=SINGLE_CHOICE.get(name))
+        if name == 'category':
+            category = _CATEGORIES[entity_type]
+            query = _named(_top(model.category_id, clauses), category.name, category.id)
+        elif name == 'benefit':
+            link = _BENEFIT_LINKS[entity_type]
+            scoped = [link.in_(select(model.id).where(*clauses))] if clauses else []
+            query = _named(_top(link.table.c.benefit_id, scoped), Benefit.name, Benefit.id)
+        elif name == 'difficulty':
+            top = _top(Remedy.difficulty, clauses)
+            query = select(top.c.value, top.c.value, top.c.count).order_by(top.c.count.desc(), top.c.value)
+        elif name == 'doctor':
+            query = _named(_top(Remedy.doctor_id, clauses), User.name, User.id)
+        else:
+            scoped = [Ingredient.remedy_id.in_(select(Remedy.id).where(*clauses))] if clauses else []
+            # Ingredient rows, read off ix_ingredient_name_lower alone; COUNT(DISTINCT
+            # remedy_id) would differ only for a remedy listing an ingredient twice
+            top = _top(func.lower(Ingredient.name), scoped)
+            # Shown with the capitalization of its first spelling
+            display = (
+                select(Ingredient.name).where(func.lower(Ingredient.name) == top.c.value)
+                .limit(1).scalar_subquery()
+            )
+            query = select(top.c.value, display, top.c.count).order_by(top.c.count.desc(), top.c.value)
+        counts[name] = [
+            {"value": value, "name": label, "count": count} for value, label, count in connection.execute(query)
+        ]
+    return counts
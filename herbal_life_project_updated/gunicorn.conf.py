@@ -0,0 +1,62 @@
+"""
+gunicorn settings for serving Herbal Life in production
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Everything is driven by environment variables:
+
+    BIND                  address to listen on (default 0.0.0.0:$PORT, PORT default 5000)
+    WEB_CONCURRENCY       worker processes (default 2 x CPUs + 1)
+    GUNICORN_THREADS      threads per worker; above 1 uses the gthread worker (default 4)
+    GUNICORN_TIMEOUT      seconds before a silent worker is killed and replaced (default 30)
+    GUNICORN_GRACEFUL_TIMEOUT
+                          seconds workers get to finish in-flight requests on
+                          reload or shutdown (default 30)
+    GUNICORN_KEEPALIVE    seconds to hold idle keep-alive connections (default 5)
+    GUNICORN_MAX_REQUESTS recycle a worker after this many requests, 0 to never
+                          (default 2000, with up to 10% jitter)
+    PRELOAD_APP           0 to import the app in each worker instead of once
+                          in the master (default 1)
+    ACCESS_LOG            access log path, "-" for stdout (default: off)
+
+Reloading: kill -HUP <master pid> replaces the workers gracefully. In-flight
+requests finish within the graceful timeout. With PRELOAD_APP the workers
+are forked from the master's already imported code, so HUP picks up
+configuration changes but not new code. To deploy new code without
+dropping connections:
+1. kill -USR2 <master pid> to start a new master next to the old one.
+2. kill -WINCH <old pid> to stop the old workers.
+3. kill -QUIT <old pid> to stop the old master.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+preload_app = os.environ.get("PRELOAD_APP", "1") == "1"
+accesslog = os.environ.get("ACCESS_LOG")
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+# Worker heartbeat files in memory rather than on a possibly slow disk
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def post_fork(server, worker):
+    """Drop the database connections inherited from the master"""
+    if not server.cfg.preload_app:
+        return
+    from app import app, db
+
+    # close=False leaves the master's sockets alone; the worker opens its own
+    with app.app_context():
+        for engine in db.engines.values():  # the primary and any read replicas
+            engine.dispose(close=False)
+    server.log.info(f"Worker {worker.pid} ready")
+
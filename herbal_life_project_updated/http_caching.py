@@ -0,0 +1,40 @@
+"""
+HTTP validators and Cache-Control headers for the JSON API.
+
+Every successful GET under /api/ gets a strong ETag, and conditional
+requests are answered with 304 Not Modified. The ETag is a SHA-1 of the
+body. Views wrapped in response_cache.cached_response compute it once per
+catalog version, so revalidating against a warm cache costs a dictionary
+lookup and no JSON work.
+
+There is no Last-Modified: the time a response was generated says nothing
+about when the catalog changed, and deletions leave no timestamp behind, so
+If-Modified-Since could not be answered correctly. Clients revalidate with
+If-None-Match.
+"""
+from flask import current_app, request
+
+DEFAULT_MAX_AGE = 0
+
+
+def add_validators(response):
+    """Attach ETag and Cache-Control, then apply conditional headers"""
+    if request.method not in ('GET', 'HEAD') or not request.path.startswith('/api/'):
+        return response
+    if response.status_code != 200 or response.is_streamed or response.cache_control.no_store:
+        return response
+
+    if not response.get_etag()[0]:
+        response.add_etag()
+
+    # Allow shared caches to keep the body but make them revalidate once it is stale
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get("API_CACHE_MAX_AGE", DEFAULT_MAX_AGE)
+    response.cache_control.must_revalidate = True
+
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    """Register the validator hook on the app"""
+    app.after_request(add_validators)
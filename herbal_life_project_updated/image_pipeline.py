@@ -0,0 +1,230 @@
+"""
+Resized WebP and AVIF copies of the plant images, for responsive srcsets
+
+    python image_pipeline.py                  # every image that has no variants yet
+    python image_pipeline.py --force --workers 4
+
+Each plant image stored under the app's static folder gets one copy per
+width in WIDTHS narrower than the original (plus one at the original width
+when that is below the largest step), in every format the installed
+Pillow can encode. The copies are written to static/variants/ and recorded,
+with their dimensions, as ImageVariant rows. Plant.to_dict() and the stored
+API documents expose them as image_srcset. Variants are keyed by source URL,
+so a file shown by several plants is processed once.
+
+The batch job spreads the encoding over worker processes. Images added
+through the plant API are processed in a background thread once the request
+has committed (see schedule()). Pillow is an optional dependency; without it
+nothing is generated and image_srcset stays null.
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from sqlalchemy import exists, select
+from app import db
+from models import PlantImage, ImageVariant
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Variant widths in pixels; the plant cards render at up to ~500 CSS pixels
+WIDTHS = (320, 640, 1280)
+QUALITY = {'avif': 55, 'webp': 80}
+# Directory under the static folder that receives the variants
+VARIANT_DIR = 'variants'
+
+
+def available_formats():
+    """Variant formats the installed Pillow can encode, in srcset order"""
+    if Image is None:
+        return ()
+    return tuple(image_format for image_format in ('avif', 'webp') if features.check(image_format))
+
+
+def source_path(app, url):
+    """Path under app.static_folder of a static image URL, or None if it is not a local file"""
+    prefix = app.static_url_path.rstrip('/') + '/'
+    if not url or not url.startswith(prefix):
+        return None
+    static_folder = os.path.abspath(app.static_folder)
+    path = os.path.normpath(os.path.join(static_folder, url[len(prefix):]))
+    if not path.startswith(static_folder + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _fresh(target, source):
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def render_variants(path, static_folder, static_url_path, formats, force=False):
+    """
+    Write the variants of the image at path and return them as
+    (format, width, height, url) tuples.
+
+    Runs in the batch job's worker processes, so it only takes plain values.
+    Files newer than their source are kept unless force is set.
+    """
+    relative = os.path.relpath(path, static_folder)
+    stem = os.path.splitext(relative)[0].replace(os.sep, '/')
+    variants = []
+    with Image.open(path) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.mode in ('LA', 'PA', 'P') else 'RGB')
+        widths = [width for width in WIDTHS if width < image.width]
+        if image.width < WIDTHS[-1]:
+            # Full size, in the smaller formats, for screens wider than the largest step
+            widths.append(image.width)
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = None
+            for image_format in formats:
+                name = f"{VARIANT_DIR}/{stem}-{width}.{image_format}"
+                target = os.path.join(static_folder, *name.split('/'))
+                if force or not _fresh(target, path):
+                    if resized is None:
+                        resized = image.resize((width, height), Image.LANCZOS)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    # Written aside and renamed so a half-written file is never served
+                    resized.save(target + '.tmp', format=image_format.upper(), quality=QUALITY[image_format])
+                    os.replace(target + '.tmp', target)
+                variants.append((image_format, width, height, f"{static_url_path}/{name}"))
+    return variants
+
+
+def save_variants(session, source_url, variants):
+    """Make the ImageVariant rows of source_url match variants"""
+    existing = {
+        (variant.format, variant.width): variant
+        for variant in session.scalars(select(ImageVariant).where(ImageVariant.source_url == source_url))
+    }
+    for image_format, width, height, url in variants:
+        variant = existing.pop((image_format, width), None)
+        if variant is None:
+            session.add(ImageVariant(source_url=source_url, format=image_format, width=width,
+                                     height=height, url=url))
+        elif (variant.height, variant.url) != (height, url):
+            variant.height = height
+            variant.url = url
+    for variant in existing.values():
+        session.delete(variant)
+
+
+def process_images(app, urls=None, workers=None, force=False):
+    """
+    Generate and record the variants of the given image URLs (default: every
+    plant image). Without force, URLs that already have variants are skipped.
+
+    workers=0 encodes in the calling thread; otherwise a process pool of that
+    many workers (default: one per CPU) is used. Each image is committed as
+    soon as it is done. Returns the number of images processed.
+    """
+    formats = available_formats()
+    if not formats:
+        logger.warning("Pillow with WebP or AVIF support is not installed; no image variants generated")
+        return 0
+
+    query = select(PlantImage.url).distinct()
+    if urls is not None:
+        query = query.where(PlantImage.url.in_(set(urls)))
+    if not force:
+        query = query.where(~exists().where(ImageVariant.source_url == PlantImage.url))
+    paths = {url: source_path(app, url) for url in db.session.scalars(query)}
+    paths = {url: path for url, path in paths.items() if path is not None}
+    if not paths:
+        return 0
+
+    static_folder = os.path.abspath(app.static_folder)
+    args = (static_folder, app.static_url_path, formats, force)
+    processed = 0
+    if workers == 0:
+        results = ((url, lambda url=url: render_variants(paths[url], *args)) for url in sorted(paths))
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = {pool.submit(render_variants, paths[url], *args): url for url in sorted(paths)}
+        results = ((futures[future], future.result) for future in as_completed(futures))
+    try:
+        for url, result in results:
+            try:
+                variants = result()
+            except Exception as e:
+                logger.error(f"Could not generate variants of {url}: {str(e)}")
+                continue
+            save_variants(db.session, url, variants)
+            db.session.commit()
+            processed += 1
+            logger.info(f"Generated {len(variants)} variants of {url}")
+    finally:
+        if workers != 0:
+            pool.shutdown(cancel_futures=True)
+    return processed
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _process_in_background(app, urls):
+    with app.app_context():
+        try:
+            process_images(app, urls, workers=0)
+        except Exception as e:
+            logger.error(f"Background image processing failed: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def schedule(app, urls):
+    """
+    Generate the variants of newly added images after the current request.
+
+    Only local files are queued, and the work runs on a single background
+    thread, so API requests never wait for an encoder. Returns the Future, or
+    None when there is nothing to do.
+    """
+    global _executor
+    if Image is None:
+        return None
+    urls = sorted({url for url in urls if source_path(app, url)})
+    if not urls:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+    return _executor.submit(_process_in_background, app, urls)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate resized WebP/AVIF variants of the plant images")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="encoder processes (default: one per CPU, 0 to encode in this process)")
+    parser.add_argument("--force", action="store_true", help="regenerate images that already have variants")
+    args = parser.parse_args(argv)
+
+    if Image is None:
+        logger.error("Pillow is required: pip install pillow")
+        return 1
+
+    # Imported here so that importing this module never builds the app
+    from app import app
+
+    with app.app_context():
+        start = time.perf_counter()
+        processed = process_images(app, workers=args.workers, force=args.force)
+        logger.info(f"Processed {processed} images in {time.perf_counter() - start:.1f}s "
+                    f"(formats: {', '.join(available_formats())})")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
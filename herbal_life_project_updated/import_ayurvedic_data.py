@@ -1,7 +1,8 @@
 import logging
 import os
 from app import app, db
-from models import Plant, Remedy, PlantCategory, RemedyCategory, Benefit, Ingredient, PreparationStep, PlantImage
+from bulk_loader import BulkLoader
+import migrations
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -13,11 +14,6 @@ def import_plants():
     
     # Define a category for Ayurvedic plants
     category_name = "Ayurvedic Medicinal Plants"
-    category = PlantCategory.query.filter_by(name=category_name).first()
-    if not category:
-        category = PlantCategory(name=category_name)
-        db.session.add(category)
-        logger.info(f"Created new plant category: {category_name}")
     
     # List of plants with their details
     plants_data = [
@@ -95,47 +91,17 @@ def import_plants():
         }
     ]
     
-    # Import each plant
+    # Import the plants in batches; existing plants are skipped
+    loader = BulkLoader()
     for plant_data in plants_data:
-        try:
-            # Check if plant already exists
-            existing_plant = Plant.query.filter_by(name=plant_data['name']).first()
-            if existing_plant:
-                logger.info(f"Plant '{plant_data['name']}' already exists, skipping")
-                continue
-            
-            # Create plant
-            plant = Plant(
-                name=plant_data['name'],
-                scientific_name=plant_data['scientific_name'],
-                description=plant_data['description'],
-                usage=plant_data['usage'],
-                category=category
-            )
-            
-            # Add benefits
-            for benefit_name in plant_data['benefits']:
-                # Find or create benefit
-                benefit = Benefit.query.filter_by(name=benefit_name).first()
-                if not benefit:
-                    benefit = Benefit(name=benefit_name)
-                    db.session.add(benefit)
-                    logger.debug(f"Created new benefit: {benefit_name}")
-                plant.benefits.append(benefit)
-            
-            # Add image
-            image_url = plant_data.get('image_url')
-            if image_url:
-                plant.images.append(PlantImage(url=image_url, is_primary=True, alt_text=f"{plant_data['name']} image"))
-            
-            # Save to database
-            db.session.add(plant)
-            db.session.commit()
-            logger.info(f"Successfully imported plant: {plant.name}")
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error importing plant {plant_data.get('name')}: {str(e)}")
+        loader.add_plant(dict(plant_data, category=category_name))
+    
+    try:
+        loader.commit()
+        logger.info(f"Imported {loader.created['plants']} plants, skipped {loader.skipped['plants']}")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing plants: {str(e)}")
     
     logger.info("Ayurvedic plants data import completed")
 
@@ -145,11 +111,6 @@ def import_remedies():
     
     # Define a category for Ayurvedic remedies
     category_name = "Traditional Ayurvedic Remedies"
-    category = RemedyCategory.query.filter_by(name=category_name).first()
-    if not category:
-        category = RemedyCategory(name=category_name)
-        db.session.add(category)
-        logger.info(f"Created new remedy category: {category_name}")
     
     # Sample remedies - Add more as needed
     remedies_data = [
@@ -224,59 +185,25 @@ def import_remedies():
         }
     ]
     
-    # Import each remedy
+    # Import the remedies in batches; existing remedies are skipped
+    loader = BulkLoader()
     for remedy_data in remedies_data:
-        try:
-            # Check if remedy already exists
-            existing_remedy = Remedy.query.filter_by(name=remedy_data['name']).first()
-            if existing_remedy:
-                logger.info(f"Remedy '{remedy_data['name']}' already exists, skipping")
-                continue
-            
-            # Create remedy
-            remedy = Remedy(
-                name=remedy_data['name'],
-                short_description=remedy_data['short_description'],
-                description=remedy_data['description'],
-                difficulty=remedy_data['difficulty'],
-                usage=remedy_data['usage'],
-                category=category
-            )
-            
-            # Add ingredients
-            for i, ingredient_name in enumerate(remedy_data['ingredients']):
-                remedy.ingredients.append(Ingredient(name=ingredient_name, order=i))
-            
-            # Add preparation steps
-            for i, step_text in enumerate(remedy_data['preparation_steps']):
-                remedy.preparation_steps.append(PreparationStep(description=step_text, step_number=i+1))
-            
-            # Add benefits
-            for benefit_name in remedy_data['benefits']:
-                # Find or create benefit
-                benefit = Benefit.query.filter_by(name=benefit_name).first()
-                if not benefit:
-                    benefit = Benefit(name=benefit_name)
-                    db.session.add(benefit)
-                    logger.debug(f"Created new benefit: {benefit_name}")
-                remedy.benefits.append(benefit)
-            
-            # Save to database
-            db.session.add(remedy)
-            db.session.commit()
-            logger.info(f"Successfully imported remedy: {remedy.name}")
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error importing remedy {remedy_data.get('name')}: {str(e)}")
+        loader.add_remedy(dict(remedy_data, category=category_name))
+    
+    try:
+        loader.commit()
+        logger.info(f"Imported {loader.created['remedies']} remedies, skipped {loader.skipped['remedies']}")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing remedies: {str(e)}")
     
     logger.info("Ayurvedic remedies data import completed")
 
 def run_import():
     """Run the complete data import process"""
     with app.app_context():
-        # Make sure all tables exist
-        db.create_all()
+        # Make sure all tables exist and are up to date
+        migrations.create_schema(db.engine)
         
         # Run imports
         import_plants()
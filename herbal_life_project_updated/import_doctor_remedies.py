@@ -3,7 +3,8 @@ Script to import doctor-recommended Ayurvedic remedies into the database
 """
 import logging
 from app import app, db
-from models import Remedy, RemedyCategory, Benefit, Ingredient, PreparationStep, User
+from models import RemedyCategory, User
+from bulk_loader import BulkLoader
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,35 +28,18 @@ def create_doctor(name, email, password):
     logger.info(f"Created doctor: {name}")
     return user
 
-def create_remedy_category(name):
-    """Create remedy category if it doesn't exist"""
-    category = RemedyCategory.query.filter_by(name=name).first()
-    if not category:
-        category = RemedyCategory(name=name)
-        db.session.add(category)
-        db.session.commit()
-        logger.info(f"Created remedy category: {name}")
-    return category
-
-def create_benefit(name):
-    """Create benefit if it doesn't exist"""
-    benefit = Benefit.query.filter_by(name=name).first()
-    if not benefit:
-        benefit = Benefit(name=name)
-        db.session.add(benefit)
-        db.session.commit()
-        logger.info(f"Created benefit: {name}")
-    return benefit
-
 def import_doctor_remedies():
     """Import doctor-recommended remedies into the database"""
     
-    # Create remedy categories
-    traditional_cat = create_remedy_category("Traditional Ayurvedic Remedies")
-    digestive_cat = create_remedy_category("Digestive Health Remedies")
-    immunity_cat = create_remedy_category("Immunity Boosting Remedies")
-    stress_cat = create_remedy_category("Stress Relief Remedies")
-    inflammation_cat = create_remedy_category("Anti-inflammatory Preparations")
+    loader = BulkLoader()
+    
+    # Create remedy categories, one INSERT for all of the missing ones
+    traditional_cat = "Traditional Ayurvedic Remedies"
+    digestive_cat = "Digestive Health Remedies"
+    immunity_cat = "Immunity Boosting Remedies"
+    stress_cat = "Stress Relief Remedies"
+    inflammation_cat = "Anti-inflammatory Preparations"
+    loader.resolve(RemedyCategory, [traditional_cat, digestive_cat, immunity_cat, stress_cat, inflammation_cat])
     
     # Create doctors
     dr_chopra = create_doctor(
@@ -206,42 +190,10 @@ def import_doctor_remedies():
         }
     ]
     
-    # Import remedies into database
+    # Import remedies into database; existing remedies are skipped
     for remedy_data in remedies_data:
-        # Check if remedy already exists
-        existing_remedy = Remedy.query.filter_by(name=remedy_data["name"]).first()
-        if existing_remedy:
-            logger.info(f"Remedy '{remedy_data['name']}' already exists, skipping")
-            continue
-            
-        # Create new remedy
-        remedy = Remedy(
-            name=remedy_data["name"],
-            short_description=remedy_data["short_description"],
-            description=remedy_data["description"],
-            difficulty=remedy_data["difficulty"],
-            usage=remedy_data["usage"],
-            category=remedy_data["category"],
-            doctor=remedy_data["doctor"]  # Set doctor association
-        )
-        
-        # Add ingredients
-        for i, ingredient_name in enumerate(remedy_data["ingredients"]):
-            remedy.ingredients.append(Ingredient(name=ingredient_name, order=i))
-            
-        # Add preparation steps
-        for i, step_text in enumerate(remedy_data["preparation_steps"]):
-            remedy.preparation_steps.append(PreparationStep(description=step_text, step_number=i+1))
-            
-        # Add benefits
-        for benefit_name in remedy_data["benefits"]:
-            benefit = create_benefit(benefit_name)
-            remedy.benefits.append(benefit)
-            
-        # Save to database
-        db.session.add(remedy)
-        db.session.commit()
-        logger.info(f"Added remedy: {remedy.name}")
+        loader.add_remedy(dict(remedy_data, doctor_id=remedy_data["doctor"].id))
+    loader.commit()
     
     logger.info("Completed importing doctor-recommended remedies")
 
@@ -2,11 +2,8 @@ import os
 import json
 import logging
 from app import db
-from models import (
-    User, PlantCategory, RemedyCategory, Plant, PlantImage, 
-    Benefit, Remedy, Ingredient, PreparationStep, 
-    plant_benefits, remedy_benefits
-)
+from models import User, PlantCategory, RemedyCategory
+from bulk_loader import BulkLoader
 from werkzeug.security import generate_password_hash
 
 logging.basicConfig(level=logging.INFO)
@@ -46,18 +43,10 @@ def create_categories():
         "Stress Relief Remedies"
     ]
     
-    # Create plant categories
-    for category_name in plant_categories:
-        if not PlantCategory.query.filter_by(name=category_name).first():
-            category = PlantCategory(name=category_name)
-            db.session.add(category)
-    
-    # Create remedy categories
-    for category_name in remedy_categories:
-        if not RemedyCategory.query.filter_by(name=category_name).first():
-            category = RemedyCategory(name=category_name)
-            db.session.add(category)
-    
+    # Create any missing categories, one INSERT per table
+    loader = BulkLoader()
+    loader.resolve(PlantCategory, plant_categories)
+    loader.resolve(RemedyCategory, remedy_categories)
     db.session.commit()
     logger.info("Categories created successfully")
 
@@ -237,58 +226,11 @@ def import_sample_plants():
         }
     ]
     
+    # Existing plants are skipped; categories and benefits are created as needed
+    loader = BulkLoader()
     for plant_data in plants_data:
-        # Check if plant already exists
-        if Plant.query.filter_by(name=plant_data["name"]).first():
-            continue
-        
-        # Get or create category
-        category = PlantCategory.query.filter_by(name=plant_data["category"]).first()
-        if not category:
-            category = PlantCategory(name=plant_data["category"])
-            db.session.add(category)
-            db.session.flush()
-        
-        # Create plant
-        plant = Plant(
-            name=plant_data["name"],
-            scientific_name=plant_data["scientific_name"],
-            description=plant_data["description"],
-            usage=plant_data["usage"],
-            category_id=category.id
-        )
-        db.session.add(plant)
-        db.session.flush()
-        
-        # Add benefits
-        for benefit_name in plant_data["benefits"]:
-            benefit = Benefit.query.filter_by(name=benefit_name).first()
-            if not benefit:
-                benefit = Benefit(name=benefit_name)
-                db.session.add(benefit)
-                db.session.flush()
-            
-            # Check if the benefit is already associated with the plant
-            if not db.session.query(plant_benefits).filter_by(
-                plant_id=plant.id, benefit_id=benefit.id
-            ).first():
-                # Add the association
-                stmt = plant_benefits.insert().values(
-                    plant_id=plant.id, benefit_id=benefit.id
-                )
-                db.session.execute(stmt)
-        
-        # Add images
-        for image_data in plant_data["images"]:
-            image = PlantImage(
-                plant_id=plant.id,
-                url=image_data["url"],
-                alt_text=image_data["alt_text"],
-                is_primary=image_data.get("is_primary", False)
-            )
-            db.session.add(image)
-    
-    db.session.commit()
+        loader.add_plant(plant_data)
+    loader.commit()
     logger.info("Sample plants imported successfully")
 
 def import_sample_remedies():
@@ -436,71 +378,11 @@ def import_sample_remedies():
         }
     ]
     
+    # Existing remedies are skipped; categories, benefits and doctors are resolved in bulk
+    loader = BulkLoader()
     for remedy_data in remedies_data:
-        # Check if remedy already exists
-        if Remedy.query.filter_by(name=remedy_data["name"]).first():
-            continue
-        
-        # Get or create category
-        category = RemedyCategory.query.filter_by(name=remedy_data["category"]).first()
-        if not category:
-            category = RemedyCategory(name=remedy_data["category"])
-            db.session.add(category)
-            db.session.flush()
-        
-        # Get doctor
-        doctor = User.query.filter_by(email=remedy_data["doctor_email"]).first()
-        
-        # Create remedy
-        remedy = Remedy(
-            name=remedy_data["name"],
-            short_description=remedy_data["short_description"],
-            description=remedy_data["description"],
-            difficulty=remedy_data["difficulty"],
-            usage=remedy_data["usage"],
-            category_id=category.id,
-            doctor_id=doctor.id if doctor else None
-        )
-        db.session.add(remedy)
-        db.session.flush()
-        
-        # Add benefits
-        for benefit_name in remedy_data["benefits"]:
-            benefit = Benefit.query.filter_by(name=benefit_name).first()
-            if not benefit:
-                benefit = Benefit(name=benefit_name)
-                db.session.add(benefit)
-                db.session.flush()
-            
-            # Check if the benefit is already associated with the remedy
-            if not db.session.query(remedy_benefits).filter_by(
-                remedy_id=remedy.id, benefit_id=benefit.id
-            ).first():
-                # Add the association
-                stmt = remedy_benefits.insert().values(
-                    remedy_id=remedy.id, benefit_id=benefit.id
-                )
-                db.session.execute(stmt)
-        
-        # Add ingredients
-        for ingredient_data in remedy_data["ingredients"]:
-            ingredient = Ingredient(
-                remedy_id=remedy.id,
-                name=ingredient_data["name"],
-                order=ingredient_data["order"]
-            )
-            db.session.add(ingredient)
-        
-        # Add preparation steps
-        for step_data in remedy_data["preparation_steps"]:
-            step = PreparationStep(
-                remedy_id=remedy.id,
-                description=step_data["description"],
-                step_number=step_data["step_number"]
-            )
-            db.session.add(step)
-    
-    db.session.commit()
+        loader.add_remedy(remedy_data)
+    loader.commit()
     logger.info("Sample remedies imported successfully")
 
 def run_initialization():
@@ -0,0 +1,276 @@
+"""
+Opt-in SQL and request instrumentation.
+
+Enabled with SQL_INSTRUMENTATION=1. Cursor execute hooks on every engine,
+the primary and any read replicas, time each statement and charge it to the current request; request hooks then
+fold the totals into per-endpoint counters:
+
+- requests, server errors and a latency histogram per endpoint
+- SQL statement count and total database time per endpoint
+- the slowest distinct statements per endpoint (parameterized SQL only,
+  so no request data is kept)
+- a WARNING log line for every statement slower than SLOW_QUERY_MS
+
+Each response carries a Server-Timing header with its database time and
+query count. The counters are served at /debug/metrics as JSON, or in
+Prometheus text format with ?format=prometheus, to requests carrying
+"Authorization: Bearer <METRICS_TOKEN>". Without METRICS_TOKEN the endpoint
+does not exist (404), since it exposes SQL text and timings.
+
+The work per statement is two perf_counter() calls and a few additions,
+and the endpoint counters are only touched once per request.
+"""
+import bisect
+import contextvars
+import hmac
+import logging
+import threading
+import time
+from flask import current_app, jsonify, request, abort
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Distinct statements kept per endpoint in the slowest statement list
+SLOWEST_STATEMENTS = 5
+STATEMENT_PREVIEW = 500
+
+
+class EndpointStats:
+    """Counters for one Flask endpoint"""
+
+    __slots__ = ('requests', 'errors', 'total_time', 'max_time', 'buckets',
+                 'queries', 'db_time', 'slow_queries', 'slowest')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.queries = 0
+        self.db_time = 0.0
+        self.slow_queries = 0
+        # (duration, statement) pairs, slowest first
+        self.slowest = []
+
+    def record_statement(self, statement, duration):
+        """Keep statement if it is among the slowest distinct ones seen"""
+        for i, (seen, text) in enumerate(self.slowest):
+            if text == statement:
+                if duration <= seen:
+                    return
+                del self.slowest[i]
+                break
+        else:
+            if len(self.slowest) >= SLOWEST_STATEMENTS and duration <= self.slowest[-1][0]:
+                return
+        self.slowest.append((duration, statement))
+        self.slowest.sort(reverse=True)
+        del self.slowest[SLOWEST_STATEMENTS:]
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_ms": round(self.total_time * 1000 / self.requests, 3) if self.requests else None,
+            "max_ms": round(self.max_time * 1000, 3),
+            "queries": self.queries,
+            "queries_per_request": round(self.queries / self.requests, 2) if self.requests else None,
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "slow_queries": self.slow_queries,
+            "slowest_statements": [
+                {"ms": round(duration * 1000, 3), "statement": statement}
+                for duration, statement in self.slowest
+            ],
+        }
+
+
+class Metrics:
+    """Per-endpoint counters shared by all request threads of the process"""
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record_request(self, endpoint, status, elapsed, queries, db_time, statements, slow_queries):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            if status >= 500:
+                stats.errors += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            stats.queries += queries
+            stats.db_time += db_time
+            stats.slow_queries += slow_queries
+            for statement, duration in statements.items():
+                stats.record_statement(statement, duration)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: stats.to_dict() for endpoint, stats in sorted(self._endpoints.items())}
+
+    def prometheus(self):
+        """The counters in Prometheus text exposition format"""
+        lines = [
+            "# HELP herbal_http_requests_total Requests served, by endpoint.",
+            "# TYPE herbal_http_requests_total counter",
+        ]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            for endpoint, stats in endpoints:
+                lines.append(f'herbal_http_requests_total{{endpoint="{endpoint}"}} {stats.requests}')
+            lines += ["# HELP herbal_http_server_errors_total Responses with a 5xx status, by endpoint.",
+                      "# TYPE herbal_http_server_errors_total counter"]
+            for endpoint, stats in endpoints:
+                lines.append(f'herbal_http_server_errors_total{{endpoint="{endpoint}"}} {stats.errors}')
+            lines += ["# HELP herbal_http_request_duration_seconds Request latency, by endpoint.",
+                      "# TYPE herbal_http_request_duration_seconds histogram"]
+            for endpoint, stats in endpoints:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'herbal_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'herbal_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats.total_time:.6f}')
+                lines.append(f'herbal_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats.requests}')
+            lines += ["# HELP herbal_db_queries_total SQL statements executed, by endpoint.",
+                      "# TYPE herbal_db_queries_total counter"]
+            for endpoint, stats in endpoints:
+                lines.append(f'herbal_db_queries_total{{endpoint="{endpoint}"}} {stats.queries}')
+            lines += ["# HELP herbal_db_time_seconds_total Time spent executing SQL, by endpoint.",
+                      "# TYPE herbal_db_time_seconds_total counter"]
+            for endpoint, stats in endpoints:
+                lines.append(f'herbal_db_time_seconds_total{{endpoint="{endpoint}"}} {stats.db_time:.6f}')
+            lines += ["# HELP herbal_db_slow_queries_total Statements slower than SLOW_QUERY_MS, by endpoint.",
+                      "# TYPE herbal_db_slow_queries_total counter"]
+            for endpoint, stats in endpoints:
+                lines.append(f'herbal_db_slow_queries_total{{endpoint="{endpoint}"}} {stats.slow_queries}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.started_at = time.time()
+
+
+metrics = Metrics()
+
+# Seconds; set from SLOW_QUERY_MS by init_app
+_slow_query_threshold = 0.2
+
+
+class _RequestTimings:
+    """Totals for the request being served; kept in a context variable, not flask.g,
+    because the cursor hooks run for every statement"""
+
+    __slots__ = ('endpoint', 'started', 'queries', 'db_time', 'slow_queries', 'statements')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slow_queries = 0
+        # Slowest duration seen per statement
+        self.statements = {}
+
+
+_current_request = contextvars.ContextVar('instrumented_request', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start_time'].pop()
+    timings = _current_request.get()
+    if duration >= _slow_query_threshold:
+        endpoint = timings.endpoint if timings else None
+        logger.warning(f"Slow query ({duration * 1000:.1f} ms, endpoint {endpoint}): "
+                       f"{statement[:STATEMENT_PREVIEW]}")
+        if timings:
+            timings.slow_queries += 1
+    if timings is None:
+        return
+    timings.queries += 1
+    timings.db_time += duration
+    if duration > timings.statements.get(statement, 0.0):
+        timings.statements[statement] = duration
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    starts = exception_context.connection.info.get('query_start_time') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def _start_request():
+    _current_request.set(_RequestTimings(request.endpoint or "<unmatched>"))
+
+
+def _finish_request(response):
+    timings = _current_request.get()
+    if timings is None:
+        return response
+    elapsed = time.perf_counter() - timings.started
+    # Only the slowest few statements of a request can matter for the endpoint
+    slowest = sorted(timings.statements.items(), key=lambda item: item[1], reverse=True)[:SLOWEST_STATEMENTS]
+    metrics.record_request(timings.endpoint, response.status_code, elapsed, timings.queries, timings.db_time,
+                           {statement[:STATEMENT_PREVIEW]: duration for statement, duration in slowest},
+                           timings.slow_queries)
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries", app;dur={elapsed * 1000:.2f}'
+    )
+    return response
+
+
+def _end_request(exception=None):
+    _current_request.set(None)
+
+
+def metrics_view():
+    """Serve the counters as JSON, or as Prometheus text with ?format=prometheus"""
+    token = current_app.config["METRICS_TOKEN"]
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+    if request.args.get("format") == "prometheus":
+        response = current_app.response_class(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+    else:
+        response = jsonify({
+            "uptime_seconds": round(time.time() - metrics.started_at, 1),
+            "slow_query_ms": _slow_query_threshold * 1000,
+            "endpoints": metrics.snapshot(),
+        })
+    response.cache_control.no_store = True
+    return response
+
+
+def init_app(app, engines):
+    """Hook the instrumentation into app and its engines when SQL_INSTRUMENTATION is on"""
+    global _slow_query_threshold
+    if not app.config.get("SQL_INSTRUMENTATION"):
+        return
+    _slow_query_threshold = app.config.get("SLOW_QUERY_MS", 200) / 1000
+    for engine in engines:
+        if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    if app.config.get("METRICS_TOKEN"):
+        app.add_url_rule('/debug/metrics', 'debug_metrics', metrics_view)
+    else:
+        logger.warning("METRICS_TOKEN is not set; /debug/metrics is disabled")
+    logger.info(f"SQL instrumentation enabled, slow query threshold {_slow_query_threshold * 1000:.0f} ms")
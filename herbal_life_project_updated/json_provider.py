@@ -0,0 +1,145 @@
+"""
+Flask JSON provider backed by orjson, with pre-encoded fragments.
+
+orjson is used when it is installed and the standard library json module
+otherwise. Both backends produce the same bytes: sorted keys, compact
+separators and UTF-8 output (no \\u escapes). Responses stay compact in debug
+mode too; set app.json.compact = False for indented output.
+
+Values wrapped in Fragment are already-encoded JSON and are copied into the
+output verbatim, so a list response made of stored documents (see
+documents.py) costs one copy per document instead of a decode and re-encode:
+
+    jsonify({"plants": [Fragment(document) for document in stored], "next_cursor": None})
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'stdlib'
+
+
+class Fragment:
+    """Pre-encoded JSON text to be spliced into the output as-is"""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data.encode('utf-8') if isinstance(data, str) else data
+
+    def __repr__(self):
+        return f"<Fragment {self.data[:40]!r}>"
+
+
+def _default(o):
+    # Fragments are handled by _splice; fall through to Flask's date,
+    # decimal, uuid and dataclass handling for everything else
+    if isinstance(o, Fragment):
+        raise TypeError("Fragment outside of a splice")
+    return DefaultJSONProvider.default(o)
+
+
+def _encode(obj, backend, sort_keys, indent=False):
+    """Encode obj to bytes; raises TypeError if it contains a Fragment"""
+    if backend == 'orjson':
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj, default=_default, sort_keys=sort_keys, ensure_ascii=False,
+        **({"indent": 2} if indent else {"separators": (',', ':')})
+    ).encode('utf-8')
+
+
+def _splice(value, parts, backend, sort_keys):
+    """Append the encoding of value to parts, copying Fragments verbatim (always compact)"""
+    if isinstance(value, Fragment):
+        parts.append(value.data)
+    elif isinstance(value, dict):
+        items = sorted(value.items()) if sort_keys else value.items()
+        parts.append(b'{')
+        for i, (key, item) in enumerate(items):
+            parts.append(b'"' if i == 0 else b',"')
+            parts.append(_encode(str(key), backend, sort_keys)[1:])
+            parts.append(b':')
+            _splice_value(item, parts, backend, sort_keys)
+        parts.append(b'}')
+    elif isinstance(value, (list, tuple)):
+        parts.append(b'[')
+        for i, item in enumerate(value):
+            if i:
+                parts.append(b',')
+            _splice_value(item, parts, backend, sort_keys)
+        parts.append(b']')
+    else:
+        parts.append(_encode(value, backend, sort_keys))
+
+
+def _splice_value(value, parts, backend, sort_keys):
+    if isinstance(value, Fragment):
+        parts.append(value.data)
+        return
+    try:
+        parts.append(_encode(value, backend, sort_keys))
+    except TypeError:
+        _splice(value, parts, backend, sort_keys)
+
+
+def encode(obj, indent=False, backend=None, sort_keys=True):
+    """Encode obj to UTF-8 bytes, splicing in any Fragments it contains; the app's response format by default"""
+    backend = backend or BACKEND
+    try:
+        return _encode(obj, backend, sort_keys, indent)
+    except TypeError:
+        # Either a Fragment, or something unserializable that _splice
+        # will raise for again with the real message
+        parts = []
+        _splice(obj, parts, backend, sort_keys)
+        return b''.join(parts)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with an orjson fast path and Fragment support"""
+
+    compact = True
+
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        self.backend = backend or BACKEND
+
+    def encode(self, obj, indent=False):
+        """Encode obj to UTF-8 bytes, splicing in any Fragments it contains"""
+        return encode(obj, indent, self.backend, self.sort_keys)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for specific json.dumps options get the stdlib
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False
+        return self._app.response_class(self.encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def dumps(obj):
+    """Encode obj outside of an app, in the same format as the app's responses"""
+    return encode(obj).decode('utf-8')
+
+
+def init_app(app):
+    """Install the provider on app"""
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,242 @@
+"""
+Script to load test the catalog endpoints over HTTP
+
+    python load_test.py --url http://localhost:5000
+    python load_test.py --server dev --server gunicorn --concurrency 16
+    python load_test.py --server gunicorn --server uvicorn --concurrency 1000
+
+With --url it drives an already running server. With --server it starts
+each named server in turn on a free local port against the same database,
+runs the same load against it and prints a throughput comparison:
+
+    dev        the Werkzeug development server (what run.py and main.py start)
+    gunicorn   gunicorn -c gunicorn.conf.py wsgi:app
+    uvicorn    uvicorn asgi:app, the async read API (WEB_CONCURRENCY workers)
+
+Every client thread keeps one keep-alive connection and requests the
+catalog endpoints in a fixed mix (list pages, details, search, suggest)
+for --duration seconds. Only GET requests are made, so the database is not
+modified. The async API does not serve /api/suggest, so suggest is left
+out of the mix whenever uvicorn is one of the servers (or --no-suggest is
+given), keeping the comparison like for like. Nor does it have the Flask
+app's response cache; set RESPONSE_CACHE_ENABLED=0 to compare the two on
+query serving alone.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SEARCH_TERMS = ["tulsi", "ginger", "digestion", "stress", "turmeric", "honey", "sleep", "neem"]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list of samples"""
+    ordered = sorted(samples)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def fetch_json(base_url, path):
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def request_mix(base_url, suggest=True):
+    """(name, weight, path factory) for each endpoint, using ids that exist"""
+    plant_ids = [plant["id"] for plant in fetch_json(base_url, "/api/plants?fields=id&limit=100")["plants"]]
+    remedy_ids = [remedy["id"] for remedy in fetch_json(base_url, "/api/remedies?fields=id&limit=100")["remedies"]]
+    if not plant_ids or not remedy_ids:
+        raise SystemExit("The catalog is empty; load one first (see catalog_generator.py)")
+    mix = [
+        ("list_plants", 3, lambda rng: "/api/plants?limit=20"),
+        ("list_remedies", 2, lambda rng: "/api/remedies?limit=20"),
+        ("plant_detail", 4, lambda rng: f"/api/plants/{rng.choice(plant_ids)}"),
+        ("remedy_detail", 3, lambda rng: f"/api/remedies/{rng.choice(remedy_ids)}"),
+        ("search", 2, lambda rng: f"/api/search?q={rng.choice(SEARCH_TERMS)}"),
+        ("suggest", 2, lambda rng: f"/api/suggest?q={rng.choice(SEARCH_TERMS)[:3]}"),
+    ]
+    return [entry for entry in mix if suggest or entry[0] != "suggest"]
+
+
+def client_thread(base_url, mix, deadline, seed, results):
+    """Issue requests until deadline, appending (name, seconds, ok) to results"""
+    parts = urlsplit(base_url)
+    rng = random.Random(seed)
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    paths = {name: factory for name, _, factory in mix}
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    samples = []
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        path = paths[name](rng)
+        start = time.perf_counter()
+        # A keep-alive connection the server closed in the meantime (idle
+        # timeout, recycled worker) is retried once on a fresh one
+        for _ in range(2):
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+                if response.will_close:
+                    connection.close()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                ok = False
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+                break
+        samples.append((name, time.perf_counter() - start, ok))
+    connection.close()
+    results.extend(samples)
+
+
+def run_load(base_url, concurrency, duration, seed=0, suggest=True):
+    """Drive base_url with concurrency clients; returns the per-endpoint summary"""
+    mix = request_mix(base_url, suggest)
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client_thread, args=(base_url, mix, deadline, seed + i, results))
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = {}
+    for name in [name for name, _, _ in mix] + ["total"]:
+        latencies = [seconds * 1000 for sample, seconds, _ in results if name in (sample, "total")]
+        if not latencies:
+            continue
+        summary[name] = {
+            "requests": len(latencies),
+            "errors": sum(1 for sample, _, ok in results if name in (sample, "total") and not ok),
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        }
+    return summary
+
+
+def print_summary(label, summary):
+    print(f"== {label}")
+    for name, row in summary.items():
+        print(f"{name:<15} {row['rps']:>8.1f} req/s  p50 {row['p50_ms']:>7.2f}  p95 {row['p95_ms']:>7.2f}"
+              f"  p99 {row['p99_ms']:>7.2f} ms  {row['requests']:>7} requests"
+              + (f"  {row['errors']} errors" if row['errors'] else ""))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port):
+    if server == "dev":
+        # The same threaded Werkzeug server run.py starts, without the reloader
+        return [sys.executable, "-m", "flask", "--app", "wsgi:app", "run",
+                "--host", "127.0.0.1", "--port", str(port), "--no-reload", "--no-debugger"]
+    if server == "uvicorn":
+        # Worker count from WEB_CONCURRENCY, as for gunicorn
+        return [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+                "--no-access-log"]
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}", "wsgi:app"]
+
+
+def start_server(server, port, verbose=False, startup_timeout=120):
+    """Start server on port and wait until it answers; returns the process"""
+    env = dict(os.environ, LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"))
+    # The servers log every request, which would drown the results
+    output = None if verbose else subprocess.DEVNULL
+    process = subprocess.Popen(server_command(server, port), cwd=HERE, env=env, stdout=output, stderr=output)
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{server} server exited with status {process.returncode}; "
+                             f"rerun with --verbose to see its output")
+        try:
+            fetch_json(f"http://127.0.0.1:{port}", "/api/plants?fields=id&limit=1")
+            return process
+        except (OSError, http.client.HTTPException, ValueError):
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"{server} server did not start within {startup_timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Herbal Life catalog endpoints")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running server")
+    target.add_argument("--server", action="append", choices=["dev", "gunicorn", "uvicorn"],
+                        help="start this server locally and test it (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load (default: %(default)s)")
+    parser.add_argument("--warmup", type=float, default=2, help="untimed seconds of load first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show the output of servers started with --server")
+    parser.add_argument("--no-suggest", action="store_true", help="leave /api/suggest out of the request mix")
+    args = parser.parse_args(argv)
+    suggest = not args.no_suggest and "uvicorn" not in (args.server or [])
+
+    results = {}
+    if args.url:
+        run_load(args.url, args.concurrency, args.warmup, args.seed, suggest)
+        results[args.url] = run_load(args.url, args.concurrency, args.duration, args.seed, suggest)
+        print_summary(args.url, results[args.url])
+    else:
+        for server in args.server:
+            port = free_port()
+            process = start_server(server, port, args.verbose)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                run_load(base_url, args.concurrency, args.warmup, args.seed, suggest)
+                results[server] = run_load(base_url, args.concurrency, args.duration, args.seed, suggest)
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+            print_summary(server, results[server])
+        if len(results) > 1:
+            first, *others = results
+            for other in others:
+                ratio = results[other]["total"]["rps"] / results[first]["total"]["rps"]
+                print(f"{other} served {ratio:.2f}x the requests per second of {first}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"concurrency": args.concurrency, "duration": args.duration, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,4 +1,10 @@
-from app import app
+from app import app, db
+import migrations
+import suggest_index
 
 if __name__ == "__main__":
+    # The app no longer touches the schema on startup
+    with app.app_context():
+        migrations.create_schema(db.engine)
+        suggest_index.ensure_built()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -1,9 +1,12 @@
 """
 Script to migrate existing remedies to have the doctor_id field
+
+Kept for existing deployment instructions; the column is now added by
+migration 1 in migrations.py, which also applies any later migrations.
 """
 import logging
-from sqlalchemy import text
 from app import app, db
+import migrations
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,19 +15,11 @@ def run_migration():
     """Run database migration to add doctor_id column to remedies table"""
     try:
         with app.app_context():
-            # Check if doctor_id column exists in remedies table
-            result = db.session.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='remedy' AND column_name='doctor_id'"))
-            if result.fetchone() is None:
-                logger.info("Adding doctor_id column to remedy table")
-                db.session.execute(text("ALTER TABLE remedy ADD COLUMN doctor_id INTEGER REFERENCES users(id)"))
-                db.session.commit()
-                logger.info("Successfully added doctor_id column to remedy table")
-            else:
-                logger.info("doctor_id column already exists in remedy table")
+            applied = migrations.upgrade(db.engine)
+            logger.info(f"Applied migrations: {applied or 'none'}")
     except Exception as e:
         logger.error(f"Error in migration: {str(e)}")
-        db.session.rollback()
         raise
 
 if __name__ == "__main__":
-    run_migration()
\ No newline at end of file
+    run_migration()
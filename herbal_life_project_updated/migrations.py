@@ -0,0 +1,316 @@
+"""
+Versioned schema migrations.
+
+db.create_all() only creates missing tables, so columns and indexes added
+to models.py never reach an existing database on its own. Each migration
+here has a version number and is applied once, in order; the applied
+versions are recorded in the schema_version table. Migrations inspect the
+live schema through SQLAlchemy's inspector instead of information_schema,
+so they run unchanged on SQLite and PostgreSQL, and they skip work that
+db.create_all() already did on a fresh database.
+
+Migrations that change what the stored API documents contain do not
+rebuild them themselves. The run rebuilds them once at the end, against the
+final schema and with the current documents.py, however many of those
+migrations it applied.
+
+Nothing here runs when the app starts. Create or upgrade the schema as a
+deploy step with either of:
+
+    python migrations.py              # create missing tables, apply pending migrations
+    flask --app app upgrade-db
+    python migrations.py --status     # list applied and pending migrations
+    python migrations.py --downgrade 1
+    python migrations.py --rebuild-documents
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+from app import db
+from models import ImageVariant, catalog_document, catalog_version
+import documents
+import search_index
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+class Migration:
+    """One schema change, with an optional way back"""
+
+    def __init__(self, version, description, upgrade, downgrade=None, rebuild_documents=False):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.downgrade = downgrade
+        # The stored API documents have to be rebuilt once this is applied
+        self.rebuild_documents = rebuild_documents
+
+
+def migration(version, description, rebuild_documents=False):
+    """Register func(connection) as the upgrade step for version"""
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} is out of order")
+        MIGRATIONS.append(Migration(version, description, func, rebuild_documents=rebuild_documents))
+        return func
+    return decorator
+
+
+def reverts(version):
+    """Register func(connection) as the downgrade step for version"""
+    def decorator(func):
+        for step in MIGRATIONS:
+            if step.version == version:
+                step.downgrade = func
+                return func
+        raise ValueError(f"Unknown migration {version}")
+    return decorator
+
+
+# Indexes that published migrations create but models.py no longer declares,
+# on detached copies of their tables so db.create_all() never sees them
+_retired = MetaData()
+RETIRED_INDEXES = {
+    index.name: index for index in (
+        Index('ix_plant_name_lower', func.lower(Table('plant', _retired, Column('name', String(100))).c.name)),
+        Index('ix_remedy_name_lower', func.lower(Table('remedy', _retired, Column('name', String(100))).c.name)),
+    )
+}
+
+
+def _index(name):
+    """The Index declared in models.py under name, or its retired definition"""
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    if name in RETIRED_INDEXES:
+        return RETIRED_INDEXES[name]
+    raise KeyError(name)
+
+
+@migration(1, "Add remedy.doctor_id")
+def add_remedy_doctor(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('remedy')}
+    if 'doctor_id' not in columns:
+        connection.execute(text("ALTER TABLE remedy ADD COLUMN doctor_id INTEGER REFERENCES users(id)"))
+
+
+LOOKUP_INDEXES = (
+    'ix_plant_name', 'ix_plant_name_lower', 'ix_plant_category_id',
+    'ix_remedy_name', 'ix_remedy_name_lower', 'ix_remedy_category_id', 'ix_remedy_doctor_id',
+    'ix_ingredient_remedy_id', 'ix_ingredient_name_lower',
+    'ix_plant_image_plant_id', 'ix_preparation_step_remedy_id',
+    'ix_plant_benefits_benefit_id', 'ix_remedy_benefits_benefit_id',
+)
+
+
+@migration(2, "Index the name lookup and foreign key columns")
+def add_lookup_indexes(connection):
+    # IF NOT EXISTS rather than the inspector, which cannot see expression
+    # indexes such as lower(name) on SQLite
+    for name in LOOKUP_INDEXES:
+        connection.execute(CreateIndex(_index(name), if_not_exists=True))
+
+
+@reverts(2)
+def drop_lookup_indexes(connection):
+    for name in LOOKUP_INDEXES:
+        connection.execute(DropIndex(_index(name), if_exists=True))
+
+
+@migration(3, "Materialize the plant and remedy API documents", rebuild_documents=True)
+def add_catalog_documents(connection):
+    catalog_document.create(connection, checkfirst=True)
+
+
+@reverts(3)
+def drop_catalog_documents(connection):
+    catalog_document.drop(connection, checkfirst=True)
+
+
+@migration(4, "Re-encode the API documents as UTF-8 with json_provider", rebuild_documents=True)
+def reencode_catalog_documents(connection):
+    # The rebuild at the end of the run does the re-encoding
+    pass
+
+
+@reverts(4)
+def keep_reencoded_documents(connection):
+    # Both encodings are valid JSON for the same data; nothing to undo
+    pass
+
+
+@migration(5, "Create the full-text search index")
+def add_search_index(connection):
+    # Creating the index used to happen on every app start
+    search_index.create_index(connection)
+
+
+@reverts(5)
+def drop_search_index(connection):
+    search_index.drop_index(connection)
+
+
+@migration(6, "Add image variants and the image_srcset document field", rebuild_documents=True)
+def add_image_variants(connection):
+    ImageVariant.__table__.create(connection, checkfirst=True)
+    connection.execute(CreateIndex(_index('ix_plant_image_url'), if_not_exists=True))
+
+
+@reverts(6)
+def drop_image_variants(connection):
+    connection.execute(DropIndex(_index('ix_plant_image_url'), if_exists=True))
+    ImageVariant.__table__.drop(connection, checkfirst=True)
+
+
+@migration(7, "Index the remedy facet columns")
+def add_facet_index(connection):
+    connection.execute(CreateIndex(_index('ix_remedy_difficulty'), if_not_exists=True))
+
+
+@reverts(7)
+def drop_facet_index(connection):
+    connection.execute(DropIndex(_index('ix_remedy_difficulty'), if_exists=True))
+
+
+@migration(8, "Add the shared catalog version counter")
+def add_catalog_version(connection):
+    catalog_version.create(connection, checkfirst=True)
+    if connection.scalar(select(func.count()).select_from(catalog_version)) == 0:
+        connection.execute(catalog_version.insert().values(id=1, version=0))
+
+
+@reverts(8)
+def drop_catalog_version(connection):
+    catalog_version.drop(connection, checkfirst=True)
+
+
+@migration(9, "Drop the unused lower(name) indexes on plant and remedy")
+def drop_name_lower_indexes(connection):
+    # Nothing filters on lower(plant.name) or lower(remedy.name); the indexes only slowed writes
+    for name in RETIRED_INDEXES:
+        connection.execute(DropIndex(_index(name), if_exists=True))
+
+
+@reverts(9)
+def keep_name_lower_indexes_dropped(connection):
+    # Recreating indexes no query uses would only slow writes again
+    pass
+
+
+def current_version(connection):
+    """Highest applied migration version, 0 for an unversioned database"""
+    schema_version.create(connection, checkfirst=True)
+    return connection.scalar(select(func.max(schema_version.c.version))) or 0
+
+
+def upgrade(engine, target=None):
+    """Apply every pending migration up to target (default: the latest)"""
+    with engine.begin() as connection:
+        version = current_version(connection)
+    applied = []
+    rebuild = False
+    for step in MIGRATIONS:
+        if step.version <= version or (target is not None and step.version > target):
+            continue
+        # One transaction per migration, so a failure keeps the earlier ones
+        try:
+            with engine.begin() as connection:
+                logger.info(f"Applying migration {step.version}: {step.description}")
+                step.upgrade(connection)
+                connection.execute(schema_version.insert().values(
+                    version=step.version, description=step.description,
+                    applied_at=datetime.now(timezone.utc).replace(tzinfo=None)
+                ))
+        except Exception:
+            if rebuild:
+                logger.error("The API documents were not rebuilt; run "
+                             "`python migrations.py --rebuild-documents` once the schema is upgraded")
+            raise
+        applied.append(step.version)
+        rebuild = rebuild or step.rebuild_documents
+    if rebuild:
+        rebuild_documents(engine)
+    return applied
+
+
+def rebuild_documents(engine):
+    """Regenerate the stored API documents in one transaction"""
+    with engine.begin() as connection:
+        documents.rebuild(connection)
+
+
+def create_schema(engine):
+    """Create any missing tables, then apply the pending migrations"""
+    db.metadata.create_all(engine)
+    return upgrade(engine)
+
+
+def downgrade(engine, target):
+    """Revert the applied migrations above target, newest first"""
+    with engine.begin() as connection:
+        version = current_version(connection)
+    reverted = []
+    for step in reversed(MIGRATIONS):
+        if step.version <= target or step.version > version:
+            continue
+        if step.downgrade is None:
+            raise RuntimeError(f"Migration {step.version} ({step.description}) cannot be reverted")
+        with engine.begin() as connection:
+            logger.info(f"Reverting migration {step.version}: {step.description}")
+            step.downgrade(connection)
+            connection.execute(schema_version.delete().where(schema_version.c.version == step.version))
+        reverted.append(step.version)
+    return reverted
+
+
+def status(engine):
+    """(version, description, applied_at or None) for every known migration"""
+    with engine.begin() as connection:
+        current_version(connection)
+        applied = dict(connection.execute(select(schema_version.c.version, schema_version.c.applied_at)).all())
+    return [(step.version, step.description, applied.get(step.version)) for step in MIGRATIONS]
+
+
+def main(argv=None):
+    # Imported here so that importing this module never builds the app
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Apply or revert Herbal Life schema migrations")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--downgrade", type=int, metavar="VERSION", help="revert down to VERSION")
+    parser.add_argument("--rebuild-documents", action="store_true",
+                        help="regenerate the stored API documents from the catalog tables")
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        if args.status:
+            for version, description, applied_at in status(db.engine):
+                state = f"applied {applied_at:%Y-%m-%d %H:%M}" if applied_at else "pending"
+                print(f"{version:>4}  {state:<22}  {description}")
+        elif args.rebuild_documents:
+            rebuild_documents(db.engine)
+        elif args.downgrade is not None:
+            reverted = downgrade(db.engine, args.downgrade)
+            logger.info(f"Reverted migrations: {reverted or 'none'}")
+        else:
+            applied = create_schema(db.engine)
+            logger.info(f"Applied migrations: {applied or 'none'}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,5 +1,7 @@
+from difflib import SequenceMatcher
 from app import db
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean
+from upsert import get_or_create_names
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.associationproxy import association_proxy
 from flask_login import UserMixin
@@ -9,14 +11,30 @@ from werkzeug.security import generate_password_hash, check_password_hash
 plant_benefits = db.Table(
     'plant_benefits',
     Column('plant_id', Integer, ForeignKey('plant.id'), primary_key=True),
-    Column('benefit_id', Integer, ForeignKey('benefit.id'), primary_key=True)
+    Column('benefit_id', Integer, ForeignKey('benefit.id'), primary_key=True, index=True)
 )
 
 # Association table for remedy-benefit many-to-many relationship
 remedy_benefits = db.Table(
     'remedy_benefits',
     Column('remedy_id', Integer, ForeignKey('remedy.id'), primary_key=True),
-    Column('benefit_id', Integer, ForeignKey('benefit.id'), primary_key=True)
+    Column('benefit_id', Integer, ForeignKey('benefit.id'), primary_key=True, index=True)
+)
+
+# Ready-to-serve JSON of each plant and remedy for the read APIs, kept up to date by documents.py
+catalog_document = db.Table(
+    'catalog_document',
+    Column('entity_type', String(10), primary_key=True),
+    Column('entity_id', Integer, primary_key=True),
+    Column('document', Text, nullable=False)
+)
+
+# One row counting the transactions that changed the catalog; worker processes
+# compare it to notice writes made by the others (see catalog_events)
+catalog_version = db.Table(
+    'catalog_version',
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False)
 )
 
 class User(UserMixin, db.Model):
@@ -74,16 +92,17 @@ class Plant(db.Model):
     __tablename__ = 'plant'
     
     id = Column(Integer, primary_key=True)
-    name = Column(String(100), nullable=False)
+    name = Column(String(100), nullable=False, index=True)
     scientific_name = Column(String(100), nullable=False)
     description = Column(Text, nullable=False)
     usage = Column(Text)
-    category_id = Column(Integer, ForeignKey('plant_category.id'))
+    category_id = Column(Integer, ForeignKey('plant_category.id'), index=True)
     
     # Relationships
     category = relationship("PlantCategory", back_populates="plants")
-    images = relationship("PlantImage", back_populates="plant", cascade="all, delete-orphan")
-    benefits = relationship("Benefit", secondary=plant_benefits)
+    images = relationship("PlantImage", back_populates="plant", cascade="all, delete-orphan",
+                          order_by="PlantImage.id")
+    benefits = relationship("Benefit", secondary=plant_benefits, order_by="Benefit.id")
     
     # For convenient access to the primary image
     @property
@@ -93,9 +112,17 @@ class Plant(db.Model):
             return self.images[0].url
         return None
     
-    def to_dict(self):
+    # Keys produced by to_dict(), selectable through the API `fields` parameter
+    api_fields = (
+        "id", "name", "scientific_name", "category", "category_id", "category_info",
+        "benefits", "description", "usage", "image", "image_srcset", "images"
+    )
+    # Keys returned for `view=summary`, enough for a card or a search result
+    api_summary_fields = ("id", "name", "scientific_name", "category", "image", "image_srcset")
+    
+    def to_dict(self, fields=None):
         """Convert plant object to dictionary for API responses"""
-        return {
+        data = {
             "id": self.id,
             "name": self.name,
             "scientific_name": self.scientific_name,
@@ -109,8 +136,14 @@ class Plant(db.Model):
             "description": self.description,
             "usage": self.usage,
             "image": self.primary_image,
+            "image_srcset": image_srcset(
+                (variant.format, variant.width, variant.url) for variant in self.images[0].variants
+            ) if self.images else None,
             "images": [image.url for image in self.images]
         }
+        if fields:
+            return {field: data[field] for field in fields}
+        return data
     
     def __repr__(self):
         return f"<Plant {self.name}>"
@@ -119,39 +152,79 @@ class PlantImage(db.Model):
     __tablename__ = 'plant_image'
     
     id = Column(Integer, primary_key=True)
-    plant_id = Column(Integer, ForeignKey('plant.id'), nullable=False)
-    url = Column(String(255), nullable=False)
+    plant_id = Column(Integer, ForeignKey('plant.id'), nullable=False, index=True)
+    url = Column(String(255), nullable=False, index=True)
     alt_text = Column(String(100))
     is_primary = Column(db.Boolean, default=False)
     
     # Relationship
     plant = relationship("Plant", back_populates="images")
+    # Resized copies generated by image_pipeline.py, shared by every image with the same url
+    variants = relationship("ImageVariant", primaryjoin="PlantImage.url == foreign(ImageVariant.source_url)",
+                            viewonly=True, order_by="(ImageVariant.format, ImageVariant.width)")
     
     def __repr__(self):
         return f"<PlantImage {self.url} for plant {self.plant_id}>"
 
+class ImageVariant(db.Model):
+    __tablename__ = 'image_variant'
+    
+    id = Column(Integer, primary_key=True)
+    source_url = Column(String(255), nullable=False, index=True)
+    format = Column(String(10), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    url = Column(String(255), nullable=False)
+    
+    __table_args__ = (UniqueConstraint('source_url', 'format', 'width', name='uq_image_variant'),)
+    
+    def __repr__(self):
+        return f"<ImageVariant {self.url}>"
+
+def image_srcset(variants):
+    """{format: srcset} from (format, width, url) triples sorted by format and width, or None"""
+    srcset = {}
+    for image_format, width, url in variants:
+        srcset.setdefault(image_format, []).append(f"{url} {width}w")
+    return {image_format: ", ".join(candidates) for image_format, candidates in srcset.items()} or None
+
 class Remedy(db.Model):
     __tablename__ = 'remedy'
     
     id = Column(Integer, primary_key=True)
-    name = Column(String(100), nullable=False)
+    name = Column(String(100), nullable=False, index=True)
     short_description = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
     difficulty = Column(String(20), nullable=False, default="Medium")
     usage = Column(Text, nullable=False)
-    category_id = Column(Integer, ForeignKey('remedy_category.id'))
-    doctor_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    category_id = Column(Integer, ForeignKey('remedy_category.id'), index=True)
+    doctor_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+
+    __table_args__ = (
+        # Covers the difficulty, category and doctor facet counts (see facets.py)
+        Index('ix_remedy_difficulty', difficulty, category_id, doctor_id),
+    )
     
     # Relationships
     category = relationship("RemedyCategory", back_populates="remedies")
-    ingredients = relationship("Ingredient", back_populates="remedy", cascade="all, delete-orphan")
-    preparation_steps = relationship("PreparationStep", back_populates="remedy", cascade="all, delete-orphan")
-    benefits = relationship("Benefit", secondary=remedy_benefits)
+    ingredients = relationship("Ingredient", back_populates="remedy", cascade="all, delete-orphan",
+                               order_by="(Ingredient.order, Ingredient.id)")
+    preparation_steps = relationship("PreparationStep", back_populates="remedy", cascade="all, delete-orphan",
+                                     order_by="(PreparationStep.step_number, PreparationStep.id)")
+    benefits = relationship("Benefit", secondary=remedy_benefits, order_by="Benefit.id")
     doctor = relationship("User", backref="remedies")
     
-    def to_dict(self):
+    # Keys produced by to_dict(), selectable through the API `fields` parameter
+    api_fields = (
+        "id", "name", "short_description", "category", "category_id", "category_info",
+        "difficulty", "ingredients", "description", "preparation_steps", "usage",
+        "benefits", "doctor"
+    )
+    api_summary_fields = ("id", "name", "short_description", "category", "difficulty")
+    
+    def to_dict(self, fields=None):
         """Convert remedy object to dictionary for API responses"""
-        return {
+        data = {
             "id": self.id,
             "name": self.name,
             "short_description": self.short_description,
@@ -176,6 +249,9 @@ class Remedy(db.Model):
                 "is_doctor": self.doctor.is_doctor
             } if self.doctor else None
         }
+        if fields:
+            return {field: data[field] for field in fields}
+        return data
     
     def __repr__(self):
         return f"<Remedy {self.name}>"
@@ -184,9 +260,11 @@ class Ingredient(db.Model):
     __tablename__ = 'ingredient'
     
     id = Column(Integer, primary_key=True)
-    remedy_id = Column(Integer, ForeignKey('remedy.id'), nullable=False)
+    remedy_id = Column(Integer, ForeignKey('remedy.id'), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     order = Column(Integer, default=0)  # For ordering ingredients in the list
+
+    __table_args__ = (Index('ix_ingredient_name_lower', func.lower(name)),)
     
     # Relationship
     remedy = relationship("Remedy", back_populates="ingredients")
@@ -198,7 +276,7 @@ class PreparationStep(db.Model):
     __tablename__ = 'preparation_step'
     
     id = Column(Integer, primary_key=True)
-    remedy_id = Column(Integer, ForeignKey('remedy.id'), nullable=False)
+    remedy_id = Column(Integer, ForeignKey('remedy.id'), nullable=False, index=True)
     description = Column(Text, nullable=False)
     step_number = Column(Integer, nullable=False)  # For ordering steps
     
@@ -207,3 +285,72 @@ class PreparationStep(db.Model):
     
     def __repr__(self):
         return f"<PreparationStep {self.step_number} for remedy {self.remedy_id}>"
+
+def get_or_create_all(model, names):
+    """
+    Instances of a name-keyed model (category or benefit) for names, in order.
+
+    Existing rows are fetched with one IN query and missing ones inserted
+    with an upsert that tolerates concurrent requests creating the same
+    names (see upsert.py). Empty names and repeats are dropped.
+    """
+    found = get_or_create_names(db.session, model, names, entities=True)
+    return [found[name] for name in dict.fromkeys(name for name in names if name)]
+
+def get_or_create(model, name):
+    """The category or benefit called name, or None for an empty name"""
+    instances = get_or_create_all(model, [name])
+    return instances[0] if instances else None
+
+def sync_benefits(collection, benefits):
+    """Make a benefits collection hold exactly `benefits`, only adding and removing the differences"""
+    wanted = set(benefits)
+    for benefit in [benefit for benefit in collection if benefit not in wanted]:
+        collection.remove(benefit)
+    present = set(collection)
+    for benefit in benefits:
+        if benefit not in present:
+            collection.append(benefit)
+            present.add(benefit)
+
+def sync_children(collection, columns, values, model, position=None, start=0):
+    """
+    Make a one-to-many collection hold one row per item of `values`, in order.
+
+    Each value is a tuple of the `columns` attributes. The current rows are
+    diffed against the values: matching rows are kept, changed rows are
+    updated in place and only the surplus is inserted or deleted, so editing
+    one step of a long remedy writes one row. `position` names the column
+    holding the order (numbered from `start`); without it the collection is
+    ordered by primary key, and new rows can then only go at the end.
+    """
+    existing = list(collection)
+    values = [tuple(value) for value in values]
+    current = [tuple(getattr(row, column) for column in columns) for row in existing]
+
+    rows = [None] * len(values)
+    removed = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, current, values, autojunk=False).get_opcodes():
+        # Overlapping rows of a replaced block are rewritten rather than deleted and re-inserted
+        reused = min(i2 - i1, j2 - j1)
+        rows[j1:j1 + reused] = existing[i1:i1 + reused]
+        removed.extend(existing[i1 + reused:i2])
+    if position is None:
+        first_new = next((j for j, row in enumerate(rows) if row is None), len(rows))
+        if any(row is not None for row in rows[first_new:]):
+            # A row inserted mid-list would sort last by id; rewrite by position instead
+            rows = existing[:len(values)] + [None] * (len(values) - len(existing))
+            removed = existing[len(values):]
+
+    for row in removed:
+        collection.remove(row)
+    for index, (value, row) in enumerate(zip(values, rows)):
+        attributes = dict(zip(columns, value))
+        if position is not None:
+            attributes[position] = index + start
+        if row is None:
+            collection.append(model(**attributes))
+            continue
+        for column, new in attributes.items():
+            if getattr(row, column) != new:
+                setattr(row, column, new)
@@ -0,0 +1,117 @@
+"""
+Keyset pagination and field selection helpers for the list APIs.
+
+Cursors are opaque to clients: a URL-safe base64 encoding of the sort order
+and the sort key values of the last row on the previous page. A cursor is
+only accepted for the sort order it came from, with values of the expected
+types, so a tampered or mismatched one is a 400 rather than a database error. Seeking past those values with
+a WHERE clause keeps every page an index range scan, unlike OFFSET which has
+to skip over all of the earlier rows again.
+"""
+import base64
+import json
+from sqlalchemy import and_, or_
+
+# Upper bound for the `limit` query parameter
+MAX_PAGE_SIZE = 100
+
+
+def parse_limit(value):
+    """Parse the `limit` query parameter, returning None when it is absent"""
+    if value is None or value == '':
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid limit: {value!r}")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_fields(value, allowed):
+    """Parse the comma-separated `fields` query parameter against the allowed names"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_projection(fields, view, allowed, summary):
+    """
+    Parse the `fields` and `view` query parameters into the keys to return,
+    or None for the full documents. view=summary selects the summary keys.
+    """
+    selected = parse_fields(fields, allowed)
+    if not view or view == 'full':
+        return selected
+    if view != 'summary':
+        raise ValueError(f"Unknown view: {view!r} (expected summary or full)")
+    if selected:
+        raise ValueError("Use either fields or view, not both")
+    return list(summary)
+
+
+def encode_cursor(values, sort=None):
+    """Encode the sort key values of a row, tagged with their sort order, as an opaque cursor string"""
+    raw = json.dumps([sort, *values], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort, types):
+    """
+    Decode a cursor that encode_cursor produced for the same sort order,
+    returning None when it is absent. types holds the accepted Python types
+    of each sort key value.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types) + 1:
+        raise ValueError("Invalid cursor")
+    if values[0] != sort:
+        raise ValueError("Cursor belongs to a different sort order")
+    values = values[1:]
+    for value, allowed in zip(values, types):
+        # bool is an int subclass but never a sort key
+        if isinstance(value, bool) or not isinstance(value, allowed):
+            raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(columns, values):
+    """Build the WHERE clause selecting rows strictly after `values` in `columns` order"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, column > values[i]))
+    return or_(*clauses)
+
+
+def paginate(query, columns, key, limit=None, cursor=None, sort=None):
+    """
+    Order `query` by `columns` and return one page of results.
+
+    `key` maps a result row to its values for `columns`, and `sort` names
+    that order in the cursor. Returns a tuple of (items, next_cursor) where
+    next_cursor is None on the last page.
+    """
+    query = query.order_by(*columns)
+    if cursor is not None:
+        query = query.filter(keyset_filter(columns, cursor))
+    if limit is None:
+        return query.all(), None
+
+    # Fetch one extra row to find out whether another page follows
+    items = query.limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(key(items[-1]), sort)
@@ -0,0 +1,144 @@
+"""
+Column-only projections for the `fields` and `view` parameters of the list APIs.
+
+A full list page reads the stored documents (see documents.py). When the
+client asks for a subset of the keys, only the columns behind those keys
+are selected instead. Scalar keys are columns of the page query, with
+categories and doctors reached through outer joins, and each collection key
+(benefits, images, ingredients, ...) costs one batched query over the ids
+of the page. No ORM objects are built and unrequested text columns are
+never read.
+"""
+from operator import itemgetter
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+import documents
+from models import Plant, Remedy, PlantCategory, RemedyCategory, PlantImage, User
+
+
+class Field:
+    """One API key: the columns it reads and how they become its value"""
+
+    def __init__(self, *columns, build=None, batch=None, default=None, join=None):
+        self.columns = columns
+        # build(*column values) -> value; None for single-column keys
+        self.build = build
+        # batch(connection, set of built values) -> {built value: final value}
+        self.batch = batch
+        # Final value when batch has nothing for a row (a factory, so lists are not shared)
+        self.default = default or (lambda: None)
+        # (target, onclause) the columns need outer joined to the page query
+        self.join = join
+
+
+_plant_category = aliased(PlantCategory, name='projected_plant_category')
+_remedy_category = aliased(RemedyCategory, name='projected_remedy_category')
+_doctor = aliased(User, name='projected_doctor')
+
+# The first image by id, which is what Plant.primary_image returns
+_primary_image = (
+    select(PlantImage.url)
+    .where(PlantImage.plant_id == Plant.id)
+    .order_by(PlantImage.id)
+    .limit(1)
+    .scalar_subquery()
+)
+
+_plant_category_join = (_plant_category, _plant_category.id == Plant.category_id)
+_remedy_category_join = (_remedy_category, _remedy_category.id == Remedy.category_id)
+
+PLANT_FIELDS = {
+    "id": Field(Plant.id),
+    "name": Field(Plant.name),
+    "scientific_name": Field(Plant.scientific_name),
+    "category": Field(_plant_category.name, join=_plant_category_join),
+    "category_id": Field(Plant.category_id),
+    "category_info": Field(Plant.category_id, _plant_category.name, build=documents.category_info,
+                           join=_plant_category_join),
+    "benefits": Field(Plant.id, batch=documents.plant_benefit_names, default=list),
+    "description": Field(Plant.description),
+    "usage": Field(Plant.usage),
+    "image": Field(_primary_image),
+    "image_srcset": Field(_primary_image, batch=documents.image_srcsets),
+    "images": Field(Plant.id, batch=documents.plant_image_urls, default=list),
+}
+
+REMEDY_FIELDS = {
+    "id": Field(Remedy.id),
+    "name": Field(Remedy.name),
+    "short_description": Field(Remedy.short_description),
+    "category": Field(_remedy_category.name, join=_remedy_category_join),
+    "category_id": Field(Remedy.category_id),
+    "category_info": Field(Remedy.category_id, _remedy_category.name, build=documents.category_info,
+                           join=_remedy_category_join),
+    "difficulty": Field(Remedy.difficulty),
+    "ingredients": Field(Remedy.id, batch=documents.remedy_ingredient_names, default=list),
+    "description": Field(Remedy.description),
+    "preparation_steps": Field(Remedy.id, batch=documents.remedy_preparation_steps, default=list),
+    "usage": Field(Remedy.usage),
+    "benefits": Field(Remedy.id, batch=documents.remedy_benefit_names, default=list),
+    "doctor": Field(_doctor.id, _doctor.name, _doctor.is_doctor, build=documents.doctor_info,
+                    join=(_doctor, _doctor.id == Remedy.doctor_id)),
+}
+
+ENTITIES = {'plant': (Plant, PLANT_FIELDS), 'remedy': (Remedy, REMEDY_FIELDS)}
+
+
+def _columns(spec, fields):
+    """Distinct columns behind fields, and the row positions of each field's columns"""
+    columns = []
+    positions = {}
+    for field in fields:
+        indexes = []
+        for column in spec[field].columns:
+            # image and image_srcset share the primary image subquery
+            index = next((i for i, existing in enumerate(columns) if existing is column), None)
+            if index is None:
+                index = len(columns)
+                columns.append(column)
+            indexes.append(index)
+        positions[field] = indexes
+    return columns, positions
+
+
+def projection_query(session, entity_type, fields):
+    """
+    Query selecting the columns behind `fields`, followed by the entity's
+    name and id (as row.name and row.id) for ordering and cursors.
+    """
+    model, spec = ENTITIES[entity_type]
+    fields = list(dict.fromkeys(fields))
+    columns, _ = _columns(spec, fields)
+    joins = []
+    for field in fields:
+        if spec[field].join is not None and all(spec[field].join is not join for join in joins):
+            joins.append(spec[field].join)
+    query = session.query(*columns, model.name, model.id).select_from(model)
+    for target, onclause in joins:
+        query = query.outerjoin(target, onclause)
+    return query
+
+
+def _getter(field, indexes):
+    if field.build is None and len(indexes) == 1:
+        return itemgetter(indexes[0])
+    build = field.build or (lambda value: value)
+    return lambda row: build(*(row[index] for index in indexes))
+
+
+def project_rows(connection, entity_type, fields, rows):
+    """Turn rows of projection_query() into API dicts holding just `fields`"""
+    _, spec = ENTITIES[entity_type]
+    fields = list(dict.fromkeys(fields))
+    _, positions = _columns(spec, fields)
+    getters = [(field, _getter(spec[field], positions[field])) for field in fields]
+    items = [{field: getter(row) for field, getter in getters} for row in rows]
+    for field in fields:
+        if spec[field].batch is None:
+            continue
+        keys = {item[field] for item in items if item[field] is not None}
+        values = spec[field].batch(connection, list(keys)) if keys else {}
+        for item in items:
+            value = values.get(item[field])
+            item[field] = value if value is not None else spec[field].default()
+    return items
@@ -0,0 +1,31 @@
+"""
+Shared loader options for the catalog API queries.
+
+Plant.to_dict() and Remedy.to_dict() walk several relationships. Loading them
+lazily issues one SELECT per row and relationship, so every query whose
+results get serialized should apply one of these profiles instead.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from models import Plant, PlantImage, Remedy
+
+
+def plant_loader_options():
+    """Loader options covering every relationship used by Plant.to_dict()"""
+    return (
+        # Many-to-one: a single LEFT OUTER JOIN on the main query
+        joinedload(Plant.category),
+        # Collections: one extra "WHERE plant_id IN (...)" query each
+        selectinload(Plant.benefits),
+        selectinload(Plant.images).selectinload(PlantImage.variants),
+    )
+
+
+def remedy_loader_options():
+    """Loader options covering every relationship used by Remedy.to_dict()"""
+    return (
+        joinedload(Remedy.category),
+        joinedload(Remedy.doctor),
+        selectinload(Remedy.benefits),
+        selectinload(Remedy.ingredients),
+        selectinload(Remedy.preparation_steps),
+    )
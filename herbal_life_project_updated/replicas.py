@@ -0,0 +1,171 @@
+"""
+Read replica routing for the catalog GET endpoints.
+
+DATABASE_REPLICA_URLS lists read-only copies of the primary database,
+comma-separated. Each one becomes a Flask-SQLAlchemy bind (replica_0,
+replica_1, ...) with the same engine options as the primary. The GET API
+views wrapped in @replica_reads run their queries on one replica, chosen
+round-robin. Everything else stays on the primary, including writes, the
+flushes inside a read, CLI scripts and the commit listeners.
+
+Failover: a replica whose connection fails is marked down for
+REPLICA_RETRY_SECONDS and skipped until then. A read that was running on it
+is retried on the next replica, and finally on the primary. No read fails
+because a replica is missing.
+
+Read-your-writes: after a successful POST, PUT, PATCH or DELETE the
+response sets a cookie, and that client's reads go to the primary for
+READ_YOUR_WRITES_SECONDS, whichever worker serves them. Those reads also
+skip the response cache, whose entries in other workers may have been
+filled from a replica before the write. The worker that committed a
+catalog change also reads from the primary for that long, so its response
+cache is not refilled from a replica that has not caught up. Keep the
+window above the replicas' usual lag.
+
+Testing locally with SQLite, using copies of the primary file opened read-only:
+
+    cp instance/herbal_life.db /tmp/replica1.db
+    cp instance/herbal_life.db /tmp/replica2.db
+    DATABASE_REPLICA_URLS="sqlite:///file:/tmp/replica1.db?mode=ro&uri=true,sqlite:///file:/tmp/replica2.db?mode=ro&uri=true" python run.py
+"""
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+BIND_PREFIX = 'replica_'
+COOKIE_NAME = 'read_primary_until'
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+DEFAULT_RETRY_SECONDS = 30
+DEFAULT_READ_YOUR_WRITES_SECONDS = 10
+
+# session.info key holding the engine the current view reads from
+READ_BIND = 'read_bind'
+
+
+def binds(urls):
+    """SQLALCHEMY_BINDS entries for the replica URLs"""
+    return {f"{BIND_PREFIX}{i}": url for i, url in enumerate(urls)}
+
+
+class ReplicaSet:
+    """Round-robin over the replica engines, skipping those that recently failed"""
+
+    def __init__(self, engines, retry_seconds=DEFAULT_RETRY_SECONDS,
+                 read_your_writes_seconds=DEFAULT_READ_YOUR_WRITES_SECONDS):
+        self.engines = list(engines)
+        self.retry_seconds = retry_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        # This process reads from the primary until then, after its own catalog commits
+        self.primary_until = 0.0
+        self._down_until = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """The next healthy replica engine, or None when all of them are down"""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._counter) % len(self.engines)]
+            if self._down_until.get(engine, 0) <= now:
+                return engine
+        return None
+
+    def is_down(self, engine):
+        return self._down_until.get(engine, 0) > time.monotonic()
+
+    def mark_down(self, engine):
+        with self._lock:
+            if not self.is_down(engine):
+                logger.warning(f"Replica {engine.url.render_as_string(hide_password=True)} failed; "
+                               f"skipping it for {self.retry_seconds}s")
+            self._down_until[engine] = time.monotonic() + self.retry_seconds
+
+    def wrote(self, changes=None):
+        """catalog_events listener: read our own writes from the primary for a while"""
+        self.primary_until = time.monotonic() + self.read_your_writes_seconds
+
+    def must_read_primary(self):
+        """Whether this request has to see the latest writes"""
+        return time.monotonic() < self.primary_until or client_wrote_recently()
+
+
+def client_wrote_recently():
+    """Whether the current request carries the cookie set by a recent write"""
+    try:
+        return float(request.cookies.get(COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class RoutingSession(Session):
+    """Session that sends a replica-routed view's reads to its chosen replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(READ_BIND)
+        if bind is None and replica is not None and not self._flushing:
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_reads(view):
+    """Run a read-only view's queries on a replica, failing over to the next one and then the primary"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.extensions.get('replicas')
+        if replicas is None or not has_request_context() or replicas.must_read_primary():
+            return view(*args, **kwargs)
+        session = current_app.extensions['sqlalchemy'].session()
+        try:
+            while True:
+                replica = replicas.choose()
+                session.info[READ_BIND] = replica
+                response = view(*args, **kwargs)
+                if replica is None or not replicas.is_down(replica):
+                    return response
+                # The replica failed during the view; its error response is not sent
+                session.rollback()
+                logger.info(f"Retrying {request.path} after replica failure")
+        finally:
+            session.info.pop(READ_BIND, None)
+    return wrapper
+
+
+def _remember_write(response):
+    """Send the client's next reads to the primary after a successful write"""
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        window = current_app.extensions['replicas'].read_your_writes_seconds
+        response.set_cookie(COOKIE_NAME, f"{time.time() + window:.3f}", max_age=window,
+                            httponly=True, samesite='Lax')
+    return response
+
+
+def init_app(app, db):
+    """Set up routing to the replica binds configured in SQLALCHEMY_BINDS, if any"""
+    import catalog_events
+
+    engines = [engine for key, engine in sorted(db.engines.items(), key=lambda item: str(item[0]))
+               if isinstance(key, str) and key.startswith(BIND_PREFIX)]
+    if not engines:
+        return
+    replicas = ReplicaSet(
+        engines,
+        app.config.get("REPLICA_RETRY_SECONDS", DEFAULT_RETRY_SECONDS),
+        app.config.get("READ_YOUR_WRITES_SECONDS", DEFAULT_READ_YOUR_WRITES_SECONDS),
+    )
+    for engine in engines:
+        # Connection failures only; a failing query on a healthy connection is not the replica's fault
+        @event.listens_for(engine, 'handle_error')
+        def _replica_failed(context, engine=engine):
+            if context.is_disconnect or context.connection is None:
+                replicas.mark_down(engine)
+    catalog_events.on_commit(replicas.wrote)
+    app.extensions['replicas'] = replicas
+    app.after_request(_remember_write)
+    logger.info(f"Routing catalog reads to {len(engines)} replicas")
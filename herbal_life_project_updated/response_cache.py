@@ -0,0 +1,172 @@
+"""
+In-process response cache for the read-only catalog endpoints.
+
+Entries are keyed on the endpoint, its URL arguments, the normalized query
+string and the shared catalog version (see catalog_events). Every commit
+that changes a plant or remedy bumps that version, which makes the older
+entries unreachable, and the cache is cleared to free their memory. Entries
+also expire after a TTL and the least recently used ones are evicted once
+the cache is full.
+
+The cache lives in each worker process. A worker sees its own commits at
+once and other workers' commits through the version row, read at most
+every REFRESH_SECONDS, so a cached response outlives a write elsewhere by
+REFRESH_SECONDS at most. After noticing another worker's write, a worker
+reads from the primary for the read-your-writes window (see replicas.py),
+so it does not refill the cache from a replica that has not caught up. A
+client that has just written (the read-your-writes cookie) bypasses the
+cache, so it never gets an entry that predates its write.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, make_response
+import catalog_events
+from replicas import client_wrote_recently
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL = 60
+# Seconds between checks of the shared catalog version
+REFRESH_SECONDS = 2
+
+
+class ResponseCache:
+    """Thread-safe LRU cache whose entries expire after a fixed number of seconds"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for the /api/cache/stats endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "catalog_version": catalog_version(),
+            }
+
+
+cache = ResponseCache()
+
+_version = None
+# When the version row was last read; None forces a read on the next request
+_checked_at = None
+_version_lock = threading.Lock()
+
+
+def _advance(version):
+    """Move to a newer catalog version and drop the entries of the older ones"""
+    global _version
+    with _version_lock:
+        if _version is not None and version <= _version:
+            return False
+        _version = version
+    cache.clear()
+    return True
+
+
+def catalog_version():
+    """The shared catalog version, re-read from the primary at most every REFRESH_SECONDS"""
+    global _checked_at
+    if _checked_at is None or time.monotonic() - _checked_at >= REFRESH_SECONDS:
+        _checked_at = time.monotonic()
+        with current_app.extensions['sqlalchemy'].engine.connect() as connection:
+            version = catalog_events.read_version(connection)
+        previous = _version
+        if version is not None and _advance(version) and previous is not None:
+            # Another worker wrote; our replicas may not have its changes yet
+            replicas = current_app.extensions.get('replicas')
+            if replicas is not None:
+                replicas.wrote()
+    return _version
+
+
+@catalog_events.on_commit
+def bump_version(changes=None):
+    """Invalidate every cached response after a catalog write"""
+    global _checked_at
+    if changes is None or changes.version is None:
+        # Version unknown; read it again on the next request
+        _checked_at = None
+        cache.clear()
+    else:
+        _advance(changes.version)
+
+
+def init_app(app):
+    """Size the cache from the app config"""
+    cache.max_entries = app.config.get("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+    cache.ttl = app.config.get("RESPONSE_CACHE_TTL", DEFAULT_TTL)
+
+
+def _cache_key(view_args):
+    # Ignore empty parameters, which the views treat as absent, and argument order
+    args = tuple(sorted(
+        (name, tuple(values)) for name, values in request.args.lists() if any(values)
+    ))
+    return (request.endpoint, tuple(sorted(view_args.items())), args, catalog_version())
+
+
+def cached_response(view):
+    """Serve successful responses of a GET view from the cache"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get("RESPONSE_CACHE_ENABLED", True) or client_wrote_recently():
+            return view(*args, **kwargs)
+
+        # Taken before the view runs, so a response built while a write
+        # commits is stored under the old version and never served
+        key = _cache_key(kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            body, mimetype, etag = cached
+            response = current_app.response_class(body, status=200, mimetype=mimetype)
+            response.set_etag(etag)
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            # Hash the body once per catalog version rather than on every hit
+            response.add_etag()
+            cache.set(key, (response.get_data(), response.mimetype, response.get_etag()[0]))
+        return response
+    return wrapper
@@ -3,10 +3,26 @@ from flask import render_template, jsonify, request, abort, redirect, url_for, f
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from models import Plant, Remedy, PlantCategory, RemedyCategory, Benefit, Ingredient, PreparationStep, User, PlantImage
+from models import get_or_create, get_or_create_all, sync_benefits, sync_children
+from bulk_loader import BulkLoader, plant_images, record_error
+from pagination import parse_limit
+import catalog_queries
+import documents
+import image_pipeline
+from json_provider import Fragment
+import search_index
+import suggest_index
+from response_cache import cache, cached_response
+from replicas import replica_reads
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+def plant_image_values(primary, urls):
+    """(url, is_primary) of a plant's images: the primary first, then the others"""
+    values = [(primary, True)] if primary else []
+    return values + [(url, False) for url in urls if url != primary]
+
 def register_routes(app):
     """Register all routes with the Flask app"""
     
@@ -116,98 +132,103 @@ def register_routes(app):
     
     # API Routes
     @app.route('/api/plants', methods=['GET'])
+    @cached_response
+    @replica_reads
     def get_plants():
+        # Validate paging parameters up front so bad input is a 400, not a 500
         try:
-            # Get query parameters for filtering
-            category = request.args.get('category')
-            search = request.args.get('search')
-            
-            # Start with all plants query
-            query = Plant.query
-            
-            # Apply filters if provided
-            if category and category.lower() != 'all':
-                query = query.join(Plant.category).filter(PlantCategory.name.ilike(f'%{category}%'))
-            
-            if search:
-                search_term = f'%{search}%'
-                query = query.filter(
-                    (Plant.name.ilike(search_term)) | 
-                    (Plant.scientific_name.ilike(search_term)) | 
-                    (Plant.description.ilike(search_term))
-                )
-            
-            # Execute the query
-            plants = query.all()
-            
-            # Convert to dictionary format
-            plants_dict = {"plants": [plant.to_dict() for plant in plants]}
-            
-            return jsonify(plants_dict)
+            params = catalog_queries.parse_list_args(request.args, 'plant')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            return jsonify(catalog_queries.list_page(db.session, 'plant', params))
         except Exception as e:
             logger.error(f"Error retrieving plants: {str(e)}")
             return jsonify({"error": str(e)}), 500
     
     @app.route('/api/plants/<int:plant_id>', methods=['GET'])
+    @cached_response
+    @replica_reads
     def get_plant(plant_id):
         try:
-            plant = Plant.query.get_or_404(plant_id)
-            return jsonify(plant.to_dict())
+            document = documents.get_document(db.session.connection(), 'plant', plant_id)
+            if document is None:
+                return jsonify({"error": f"Plant {plant_id} not found"}), 404
+            return jsonify(Fragment(document))
         except Exception as e:
             logger.error(f"Error retrieving plant {plant_id}: {str(e)}")
             return jsonify({"error": str(e)}), 500
     
     @app.route('/api/remedies', methods=['GET'])
+    @cached_response
+    @replica_reads
     def get_remedies():
+        # Validate paging parameters up front so bad input is a 400, not a 500
         try:
-            # Get query parameters for filtering
-            category = request.args.get('category')
-            search = request.args.get('search')
-            
-            # Start with all remedies query
-            query = Remedy.query
-            
-            # Apply filters if provided
-            if category and category.lower() != 'all':
-                query = query.join(Remedy.category).filter(RemedyCategory.name.ilike(f'%{category}%'))
-            
-            if search:
-                search_term = f'%{search}%'
-                query = query.filter(
-                    (Remedy.name.ilike(search_term)) | 
-                    (Remedy.description.ilike(search_term))
-                )
-                
-                # Also search through ingredients (more complex query)
-                ingredient_remedies = db.session.query(Remedy.id).join(
-                    Ingredient, Ingredient.remedy_id == Remedy.id
-                ).filter(Ingredient.name.ilike(search_term)).all()
-                
-                ingredient_remedy_ids = [r[0] for r in ingredient_remedies]
-                
-                if ingredient_remedy_ids:
-                    query = query.union(Remedy.query.filter(Remedy.id.in_(ingredient_remedy_ids)))
-            
-            # Execute the query
-            remedies = query.all()
-            
-            # Convert to dictionary format
-            remedies_dict = {"remedies": [remedy.to_dict() for remedy in remedies]}
-            
-            return jsonify(remedies_dict)
+            params = catalog_queries.parse_list_args(request.args, 'remedy')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            return jsonify(catalog_queries.list_page(db.session, 'remedy', params))
         except Exception as e:
             logger.error(f"Error retrieving remedies: {str(e)}")
             return jsonify({"error": str(e)}), 500
     
+    @app.route('/api/search', methods=['GET'])
+    @cached_response
+    @replica_reads
+    def search_catalog():
+        try:
+            limit = parse_limit(request.args.get('limit')) or 20
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            # One ranked query across plants and remedies
+            results = search_index.search_catalog(
+                db.session.connection(), request.args.get('q', ''), limit=limit
+            )
+            return jsonify({"results": results})
+        except Exception as e:
+            logger.error(f"Error searching catalog: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route('/api/suggest', methods=['GET'])
+    def suggest():
+        try:
+            limit = min(parse_limit(request.args.get('limit')) or 5, suggest_index.TOP_ENTRIES)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            # Answered from the in-memory prefix index; at most a version check hits the database
+            suggestions = suggest_index.suggest(request.args.get('q', ''), limit=limit)
+            return jsonify({"suggestions": suggestions})
+        except Exception as e:
+            logger.error(f"Error retrieving suggestions: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
     @app.route('/api/remedies/<int:remedy_id>', methods=['GET'])
+    @cached_response
+    @replica_reads
     def get_remedy(remedy_id):
         try:
-            remedy = Remedy.query.get_or_404(remedy_id)
-            return jsonify(remedy.to_dict())
+            document = documents.get_document(db.session.connection(), 'remedy', remedy_id)
+            if document is None:
+                return jsonify({"error": f"Remedy {remedy_id} not found"}), 404
+            return jsonify(Fragment(document))
         except Exception as e:
             logger.error(f"Error retrieving remedy {remedy_id}: {str(e)}")
             return jsonify({"error": str(e)}), 500
     
+    @app.route('/api/cache/stats', methods=['GET'])
+    def cache_stats():
+        response = jsonify(cache.stats())
+        response.cache_control.no_store = True
+        return response
+    
     # Admin API Routes for CRUD operations (these would normally be protected)
     @app.route('/api/plants', methods=['POST'])
     def create_plant():
@@ -215,12 +236,9 @@ def register_routes(app):
             # Get data from request
             data = request.json
             
-            # Find or create category
-            category_name = data.get('category')
-            category = PlantCategory.query.filter_by(name=category_name).first()
-            if not category and category_name:
-                category = PlantCategory(name=category_name)
-                db.session.add(category)
+            # Find or create the category and benefits, one query each
+            category = get_or_create(PlantCategory, data.get('category'))
+            benefits = get_or_create_all(Benefit, data.get('benefits', []))
             
             # Create new plant
             plant = Plant(
@@ -230,36 +248,80 @@ def register_routes(app):
                 usage=data.get('usage'),
                 category=category
             )
+            sync_benefits(plant.benefits, benefits)
             
-            # Add benefits
-            for benefit_name in data.get('benefits', []):
-                # Find or create benefit
-                benefit = Benefit.query.filter_by(name=benefit_name).first()
-                if not benefit:
-                    benefit = Benefit(name=benefit_name)
-                    db.session.add(benefit)
-                plant.benefits.append(benefit)
-            
-            # Add images
-            image_url = data.get('image')
-            if image_url:
-                plant.images.append(PlantImage(url=image_url, is_primary=True))
-            
-            # Add additional images
-            for img_url in data.get('images', []):
-                if img_url != image_url:  # Avoid duplicating the primary image
-                    plant.images.append(PlantImage(url=img_url))
+            # Add the primary image, then the additional ones
+            sync_children(plant.images, ('url', 'is_primary'),
+                          plant_image_values(data.get('image'), data.get('images', [])), PlantImage)
             
             # Save to database
             db.session.add(plant)
             db.session.commit()
             
+            # Resized variants of local images are generated in the background
+            image_pipeline.schedule(app, [image.url for image in plant.images])
+            
             return jsonify(plant.to_dict()), 201
         except Exception as e:
             db.session.rollback()
             logger.error(f"Error creating plant: {str(e)}")
             return jsonify({"error": str(e)}), 500
     
+    def bulk_create(entity_type, model):
+        """
+        Create the records of a JSON array in one transaction.
+        
+        Categories, benefits and duplicate names are looked up with one IN
+        query each and the rows and their children are written with
+        executemany INSERTs. Records whose name already exists are left as
+        they are. Any invalid record rejects the whole request with a 400.
+        """
+        records = request.get_json(silent=True)
+        if not isinstance(records, list):
+            return jsonify({"error": "Request body must be a JSON array of records"}), 400
+        max_records = app.config.get("BULK_MAX_RECORDS", 5000)
+        if len(records) > max_records:
+            return jsonify({"error": f"At most {max_records} records per request"}), 400
+        
+        invalid = []
+        seen = set()
+        for index, record in enumerate(records):
+            error = record_error(entity_type, record)
+            if error is None and record["name"] in seen:
+                error = "Duplicate name in request"
+            if error:
+                invalid.append({"index": index, "status": "invalid", "error": error})
+            else:
+                seen.add(record["name"])
+        if invalid:
+            return jsonify({"error": f"{len(invalid)} invalid records", "results": invalid}), 400
+        
+        try:
+            loader = BulkLoader()
+            if entity_type == 'plant':
+                loader.preload(plants=records)
+                added = [loader.add_plant(record) for record in records]
+            else:
+                loader.preload(remedies=records)
+                added = [loader.add_remedy(record) for record in records]
+            loader.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error bulk creating {entity_type}s: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+        
+        results = [{"index": index, "status": "created" if created else "exists",
+                    "id": loader.id_of(model, record["name"])}
+                   for index, (record, created) in enumerate(zip(records, added))]
+        if entity_type == 'plant':
+            image_pipeline.schedule(app, [image["url"] for record, created in zip(records, added) if created
+                                          for image in plant_images(record)])
+        return jsonify({"results": results, "created": sum(added), "existing": len(added) - sum(added)})
+    
+    @app.route('/api/plants:bulk', methods=['POST'])
+    def bulk_create_plants():
+        return bulk_create('plant', Plant)
+    
     @app.route('/api/plants/<int:plant_id>', methods=['PUT'])
     def update_plant(plant_id):
         try:
@@ -278,50 +340,28 @@ def register_routes(app):
             
             # Update category if provided
             if 'category' in data:
-                category_name = data['category']
-                category = PlantCategory.query.filter_by(name=category_name).first()
-                if not category:
-                    category = PlantCategory(name=category_name)
-                    db.session.add(category)
-                plant.category = category
+                plant.category = get_or_create(PlantCategory, data['category'])
             
-            # Update benefits if provided
+            # Update benefits if provided; only the added and removed links are written
             if 'benefits' in data:
-                # Clear existing benefits
-                plant.benefits = []
-                
-                # Add new benefits
-                for benefit_name in data['benefits']:
-                    benefit = Benefit.query.filter_by(name=benefit_name).first()
-                    if not benefit:
-                        benefit = Benefit(name=benefit_name)
-                        db.session.add(benefit)
-                    plant.benefits.append(benefit)
-            
-            # Update image if provided
-            if 'image' in data:
-                # Remove existing primary image if any
-                for image in plant.images:
-                    if image.is_primary:
-                        db.session.delete(image)
-                
-                # Add new primary image
-                plant.images.append(PlantImage(url=data['image'], is_primary=True))
-            
-            # Update additional images if provided
-            if 'images' in data:
-                # Keep only the primary image
-                primary_image = next((img for img in plant.images if img.is_primary), None)
-                plant.images = [primary_image] if primary_image else []
-                
-                # Add the new images
-                for img_url in data['images']:
-                    # Skip if it's the same as the primary image
-                    if primary_image and img_url == primary_image.url:
-                        continue
-                    plant.images.append(PlantImage(url=img_url))
+                sync_benefits(plant.benefits, get_or_create_all(Benefit, data['benefits']))
+            
+            # Update the primary image and/or the additional images if provided,
+            # keeping the rows whose url is unchanged
+            if 'image' in data or 'images' in data:
+                if 'image' in data:
+                    primary = data['image']
+                else:
+                    primary = next((image.url for image in plant.images if image.is_primary), None)
+                if 'images' in data:
+                    others = data['images']
+                else:
+                    others = [image.url for image in plant.images if not image.is_primary]
+                sync_children(plant.images, ('url', 'is_primary'), plant_image_values(primary, others), PlantImage)
             
             db.session.commit()
+            if 'image' in data or 'images' in data:
+                image_pipeline.schedule(app, [image.url for image in plant.images])
             return jsonify(plant.to_dict())
         except Exception as e:
             db.session.rollback()
@@ -346,12 +386,9 @@ def register_routes(app):
             # Get data from request
             data = request.json
             
-            # Find or create category
-            category_name = data.get('category')
-            category = RemedyCategory.query.filter_by(name=category_name).first()
-            if not category and category_name:
-                category = RemedyCategory(name=category_name)
-                db.session.add(category)
+            # Find or create the category and benefits, one query each
+            category = get_or_create(RemedyCategory, data.get('category'))
+            benefits = get_or_create_all(Benefit, data.get('benefits', []))
             
             # Create new remedy
             remedy = Remedy(
@@ -364,21 +401,14 @@ def register_routes(app):
             )
             
             # Add ingredients
-            for i, ingredient_name in enumerate(data.get('ingredients', [])):
-                remedy.ingredients.append(Ingredient(name=ingredient_name, order=i))
+            sync_children(remedy.ingredients, ('name',), [(name,) for name in data.get('ingredients', [])],
+                          Ingredient, position='order')
             
             # Add preparation steps
-            for i, step_text in enumerate(data.get('preparation_steps', [])):
-                remedy.preparation_steps.append(PreparationStep(description=step_text, step_number=i+1))
-            
-            # Add benefits
-            for benefit_name in data.get('benefits', []):
-                # Find or create benefit
-                benefit = Benefit.query.filter_by(name=benefit_name).first()
-                if not benefit:
-                    benefit = Benefit(name=benefit_name)
-                    db.session.add(benefit)
-                remedy.benefits.append(benefit)
+            sync_children(remedy.preparation_steps, ('description',),
+                          [(text,) for text in data.get('preparation_steps', [])],
+                          PreparationStep, position='step_number', start=1)
+            sync_benefits(remedy.benefits, benefits)
             
             # Save to database
             db.session.add(remedy)
@@ -390,6 +420,10 @@ def register_routes(app):
             logger.error(f"Error creating remedy: {str(e)}")
             return jsonify({"error": str(e)}), 500
     
+    @app.route('/api/remedies:bulk', methods=['POST'])
+    def bulk_create_remedies():
+        return bulk_create('remedy', Remedy)
+    
     @app.route('/api/remedies/<int:remedy_id>', methods=['PUT'])
     def update_remedy(remedy_id):
         try:
@@ -410,45 +444,22 @@ def register_routes(app):
             
             # Update category if provided
             if 'category' in data:
-                category_name = data['category']
-                category = RemedyCategory.query.filter_by(name=category_name).first()
-                if not category:
-                    category = RemedyCategory(name=category_name)
-                    db.session.add(category)
-                remedy.category = category
+                remedy.category = get_or_create(RemedyCategory, data['category'])
             
-            # Update ingredients if provided
+            # Update ingredients if provided; unchanged rows are left alone
             if 'ingredients' in data:
-                # Remove all existing ingredients
-                for ingredient in remedy.ingredients:
-                    db.session.delete(ingredient)
-                
-                # Add new ingredients
-                for i, ingredient_name in enumerate(data['ingredients']):
-                    remedy.ingredients.append(Ingredient(name=ingredient_name, order=i))
+                sync_children(remedy.ingredients, ('name',), [(name,) for name in data['ingredients']],
+                              Ingredient, position='order')
             
-            # Update preparation steps if provided
+            # Update preparation steps if provided; unchanged rows are left alone
             if 'preparation_steps' in data:
-                # Remove all existing steps
-                for step in remedy.preparation_steps:
-                    db.session.delete(step)
-                
-                # Add new steps
-                for i, step_text in enumerate(data['preparation_steps']):
-                    remedy.preparation_steps.append(PreparationStep(description=step_text, step_number=i+1))
+                sync_children(remedy.preparation_steps, ('description',),
+                              [(text,) for text in data['preparation_steps']],
+                              PreparationStep, position='step_number', start=1)
             
-            # Update benefits if provided
+            # Update benefits if provided; only the added and removed links are written
             if 'benefits' in data:
-                # Clear existing benefits
-                remedy.benefits = []
-                
-                # Add new benefits
-                for benefit_name in data['benefits']:
-                    benefit = Benefit.query.filter_by(name=benefit_name).first()
-                    if not benefit:
-                        benefit = Benefit(name=benefit_name)
-                        db.session.add(benefit)
-                    remedy.benefits.append(benefit)
+                sync_benefits(remedy.benefits, get_or_create_all(Benefit, data['benefits']))
             
             db.session.commit()
             return jsonify(remedy.to_dict())
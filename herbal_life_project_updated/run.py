@@ -1,22 +1,32 @@
 """
 Herbal Life - Startup Script
-This script first checks if the database exists and initializes it if needed,
-then starts the Flask application.
+This script first brings the database schema up to date, initializes the
+database with sample data if needed, then starts the Flask application.
 """
 
 import os
 import sys
 import logging
-from app import app  # Import the application instance
+from app import app, db  # Import the application instance
+import migrations
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def check_database():
-    """Check if the database file exists"""
-    db_path = "herbal_life.db"
-    return os.path.exists(db_path)
+    """Check if the database exists; a server database such as PostgreSQL always does"""
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != "sqlite":
+        return True
+    # Flask-SQLAlchemy resolves relative SQLite paths against instance/
+    return bool(url.database) and url.database != ":memory:" and os.path.exists(url.database)
+
+def prepare_database():
+    """Create missing tables and apply pending schema migrations"""
+    with app.app_context():
+        migrations.create_schema(db.engine)
 
 def initialize_database():
     """Initialize the database with sample data"""
@@ -35,11 +45,20 @@ def initialize_database():
 def start_application():
     """Start the Flask application"""
     logger.info("Starting Herbal Life application...")
+    with app.app_context():
+        import suggest_index
+        suggest_index.ensure_built()
     app.run(host="0.0.0.0", port=5000, debug=True)
 
 if __name__ == "__main__":
-    # Check if database exists, initialize if it doesn't
-    if not check_database():
+    # Checked first: creating the schema also creates the database file
+    database_exists = check_database()
+    
+    # The app no longer touches the schema on startup
+    prepare_database()
+    
+    # Fill a new database with the sample data
+    if not database_exists:
         success = initialize_database()
         if not success:
             logger.error("Database initialization failed. Exiting.")
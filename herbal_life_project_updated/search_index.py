@@ -0,0 +1,336 @@
+"""
+Full-text search index over plants and remedies.
+
+Each plant and remedy gets one search document holding its name, scientific
+name, ingredients, benefits and descriptive text, so a single indexed query
+covers all of them:
+
+- SQLite: an FTS5 virtual table ranked with bm25(). The rowid encodes the
+  entity (id * 2 for plants, id * 2 + 1 for remedies) so updates and deletes
+  are primary key lookups.
+- PostgreSQL: a table with a weighted tsvector column behind a GIN index,
+  ranked with ts_rank_cd().
+
+Other databases, and SQLite builds without FTS5, fall back to LIKE scans.
+Documents are kept in step with the ORM through catalog_events.
+"""
+import logging
+import re
+import sqlite3
+from sqlalchemy import Float, Integer, false, literal, or_, select, text
+import catalog_events
+from models import (
+    Plant, Remedy, PlantCategory, RemedyCategory, Benefit, Ingredient,
+    plant_benefits, remedy_benefits
+)
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'search_index'
+
+# Rebuilds and refreshes load this many entities per query
+BATCH_SIZE = 500
+
+ENTITY_CODES = {'plant': 0, 'remedy': 1}
+ENTITY_TYPES = {code: entity_type for entity_type, code in ENTITY_CODES.items()}
+
+# bm25() takes one weight per column, in table order
+SQLITE_RANK = f"bm25({SEARCH_TABLE}, 0.0, 10.0, 5.0, 3.0, 3.0, 1.0)"
+
+_backend = None
+
+
+def backend():
+    """Name of the active search backend: 'fts5', 'postgres' or 'like'"""
+    return _backend or 'like'
+
+
+def tokenize(term):
+    """Split a user search term into lower-case word tokens"""
+    return re.findall(r'\w+', (term or '').lower())
+
+
+def _match_expression(tokens):
+    """Build a prefix query matching documents that contain every token"""
+    if _backend == 'fts5':
+        return ' '.join(f'"{token}"*' for token in tokens)
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def _entity_rows(connection, entity_type, ids):
+    """Yield (id, name, scientific_name, ingredients, benefits, body) for the given entities"""
+    if entity_type == 'plant':
+        rows = connection.execute(
+            select(Plant.id, Plant.name, Plant.scientific_name, Plant.description,
+                   Plant.usage, PlantCategory.name)
+            .outerjoin(PlantCategory, PlantCategory.id == Plant.category_id)
+            .where(Plant.id.in_(ids))
+        ).all()
+        benefits = connection.execute(
+            select(plant_benefits.c.plant_id, Benefit.name)
+            .join(Benefit, Benefit.id == plant_benefits.c.benefit_id)
+            .where(plant_benefits.c.plant_id.in_(ids))
+        ).all()
+        ingredients = []
+    else:
+        rows = connection.execute(
+            select(Remedy.id, Remedy.name, literal(''), Remedy.description,
+                   Remedy.short_description + ' ' + Remedy.usage, RemedyCategory.name)
+            .outerjoin(RemedyCategory, RemedyCategory.id == Remedy.category_id)
+            .where(Remedy.id.in_(ids))
+        ).all()
+        benefits = connection.execute(
+            select(remedy_benefits.c.remedy_id, Benefit.name)
+            .join(Benefit, Benefit.id == remedy_benefits.c.benefit_id)
+            .where(remedy_benefits.c.remedy_id.in_(ids))
+        ).all()
+        ingredients = connection.execute(
+            select(Ingredient.remedy_id, Ingredient.name).where(Ingredient.remedy_id.in_(ids))
+        ).all()
+
+    benefits_by_id = {}
+    for entity_id, name in benefits:
+        benefits_by_id.setdefault(entity_id, []).append(name)
+    ingredients_by_id = {}
+    for entity_id, name in ingredients:
+        ingredients_by_id.setdefault(entity_id, []).append(name)
+
+    for entity_id, name, scientific_name, description, usage, category in rows:
+        body = ' '.join(part for part in (description, usage, category) if part)
+        yield (entity_id, name, scientific_name or '',
+               ' '.join(ingredients_by_id.get(entity_id, [])),
+               ' '.join(benefits_by_id.get(entity_id, [])), body)
+
+
+def _delete_documents(connection, entity_type, ids):
+    if not ids:
+        return
+    code = ENTITY_CODES[entity_type]
+    if _backend == 'fts5':
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+            [{"rowid": entity_id * 2 + code} for entity_id in ids]
+        )
+    else:
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE entity_type = :entity_type AND entity_id = :entity_id"),
+            [{"entity_type": entity_type, "entity_id": entity_id} for entity_id in ids]
+        )
+
+
+def _write_documents(connection, entity_type, ids):
+    """Replace the search documents of the given entities with their current data"""
+    ids = sorted(ids)
+    code = ENTITY_CODES[entity_type]
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        _delete_documents(connection, entity_type, batch)
+        documents = list(_entity_rows(connection, entity_type, batch))
+        if not documents:
+            continue
+        if _backend == 'fts5':
+            connection.execute(
+                text(f"INSERT INTO {SEARCH_TABLE} "
+                     "(rowid, name, scientific_name, ingredients, benefits, body) "
+                     "VALUES (:rowid, :name, :scientific_name, :ingredients, :benefits, :body)"),
+                [{"rowid": doc[0] * 2 + code, "name": doc[1], "scientific_name": doc[2],
+                  "ingredients": doc[3], "benefits": doc[4], "body": doc[5]} for doc in documents]
+            )
+        else:
+            connection.execute(
+                text(f"INSERT INTO {SEARCH_TABLE} (entity_type, entity_id, name, document) "
+                     "VALUES (:entity_type, :entity_id, :name, "
+                     "setweight(to_tsvector('english', :name), 'A') || "
+                     "setweight(to_tsvector('english', :scientific_name), 'A') || "
+                     "setweight(to_tsvector('english', :ingredients), 'B') || "
+                     "setweight(to_tsvector('english', :benefits), 'B') || "
+                     "setweight(to_tsvector('english', :body), 'D'))"),
+                [{"entity_type": entity_type, "entity_id": doc[0], "name": doc[1],
+                  "scientific_name": doc[2], "ingredients": doc[3], "benefits": doc[4],
+                  "body": doc[5]} for doc in documents]
+            )
+
+
+@catalog_events.on_flush
+def _sync_documents(session, changes):
+    """Keep the search documents in the same transaction as the catalog rows"""
+    if _backend in (None, 'like'):
+        return
+    connection = session.connection()
+    _delete_documents(connection, 'plant', sorted(changes.deleted_plants))
+    _delete_documents(connection, 'remedy', sorted(changes.deleted_remedies))
+    _write_documents(connection, 'plant', changes.plants)
+    _write_documents(connection, 'remedy', changes.remedies)
+
+
+def rebuild(connection):
+    """Regenerate every search document from the catalog tables"""
+    if _backend in (None, 'like'):
+        return
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    _write_documents(connection, 'plant', list(connection.scalars(select(Plant.id))))
+    _write_documents(connection, 'remedy', list(connection.scalars(select(Remedy.id))))
+    logger.info("Search index rebuilt")
+
+
+def _fts5_available():
+    """Whether the SQLite library behind the sqlite3 module was built with FTS5"""
+    connection = sqlite3.connect(':memory:')
+    try:
+        connection.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+def init_search(engine):
+    """Pick the search backend for the engine's dialect, without touching the database"""
+    global _backend
+
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        _backend = 'fts5' if _fts5_available() else 'like'
+        if _backend == 'like':
+            logger.warning("SQLite was built without FTS5; search falls back to LIKE scans")
+    elif dialect == 'postgresql':
+        _backend = 'postgres'
+    else:
+        _backend = 'like'
+
+
+def create_index(connection):
+    """Create and fill the search table for the active backend if it is missing"""
+    if _backend is None:
+        init_search(connection.engine)
+    if _backend == 'fts5':
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": SEARCH_TABLE}
+        ).first()
+        if not exists:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "name, scientific_name, ingredients, benefits, body, "
+                "tokenize = 'porter unicode61', prefix = '2 3')"
+            ))
+    elif _backend == 'postgres':
+        exists = connection.execute(
+            text("SELECT to_regclass(:name)"), {"name": SEARCH_TABLE}
+        ).scalar()
+        if not exists:
+            connection.execute(text(
+                f"CREATE TABLE {SEARCH_TABLE} ("
+                "entity_type VARCHAR(10) NOT NULL, "
+                "entity_id INTEGER NOT NULL, "
+                "name VARCHAR(100) NOT NULL, "
+                "document TSVECTOR NOT NULL, "
+                "PRIMARY KEY (entity_type, entity_id))"
+            ))
+            connection.execute(text(
+                f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+            ))
+    else:
+        return
+
+    if not exists:
+        rebuild(connection)
+
+
+def drop_index(connection):
+    """Drop the search table, if the active backend has one"""
+    if _backend is None:
+        init_search(connection.engine)
+    if _backend in ('fts5', 'postgres'):
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+def _like_matches(tokens, entity_type):
+    """Fallback matcher: every token must appear in one of the searchable columns"""
+    if entity_type == 'plant':
+        columns = (Plant.name, Plant.scientific_name, Plant.description)
+        query = select(Plant.id.label('entity_id'), literal(0.0).label('rank'))
+    else:
+        columns = (Remedy.name, Remedy.description)
+        query = select(Remedy.id.label('entity_id'), literal(0.0).label('rank'))
+    for token in tokens:
+        predicates = [column.ilike(f'%{token}%') for column in columns]
+        if entity_type == 'remedy':
+            predicates.append(Remedy.id.in_(
+                select(Ingredient.remedy_id).where(Ingredient.name.ilike(f'%{token}%'))
+            ))
+        query = query.where(or_(*predicates))
+    return query
+
+
+def match(term, entity_type):
+    """
+    Subquery of (entity_id, rank) for the entities of one type matching `term`.
+
+    Lower ranks are better matches, so callers order by rank ascending.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return select(literal(0).label('entity_id'), literal(0.0).label('rank')).where(false()).subquery()
+
+    if _backend == 'fts5':
+        query = text(
+            f"SELECT rowid / 2 AS entity_id, {SQLITE_RANK} AS rank FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH :query AND rowid % 2 = :code"
+        ).bindparams(query=_match_expression(tokens), code=ENTITY_CODES[entity_type])
+    elif _backend == 'postgres':
+        query = text(
+            "SELECT entity_id, -ts_rank_cd(document, to_tsquery('english', :query)) AS rank "
+            f"FROM {SEARCH_TABLE} "
+            "WHERE entity_type = :entity_type AND document @@ to_tsquery('english', :query)"
+        ).bindparams(query=_match_expression(tokens), entity_type=entity_type)
+    else:
+        return _like_matches(tokens, entity_type).subquery()
+
+    return query.columns(entity_id=Integer, rank=Float).subquery()
+
+
+def search_catalog(connection, term, limit=20):
+    """
+    Rank plants and remedies together for `term` in a single query.
+
+    Returns a list of {"type", "id", "name", "rank"} dicts, best match first.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return []
+
+    if _backend == 'fts5':
+        rows = connection.execute(
+            text(f"SELECT rowid % 2, rowid / 2, name, {SQLITE_RANK} AS rank FROM {SEARCH_TABLE} "
+                 f"WHERE {SEARCH_TABLE} MATCH :query ORDER BY rank LIMIT :limit"),
+            {"query": _match_expression(tokens), "limit": limit}
+        ).all()
+        return [{"type": ENTITY_TYPES[code], "id": entity_id, "name": name, "rank": rank}
+                for code, entity_id, name, rank in rows]
+
+    if _backend == 'postgres':
+        rows = connection.execute(
+            text("SELECT entity_type, entity_id, name, "
+                 "-ts_rank_cd(document, to_tsquery('english', :query)) AS rank "
+                 f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('english', :query) "
+                 "ORDER BY rank LIMIT :limit"),
+            {"query": _match_expression(tokens), "limit": limit}
+        ).all()
+        return [{"type": entity_type, "id": entity_id, "name": name, "rank": rank}
+                for entity_type, entity_id, name, rank in rows]
+
+    plants = _like_matches(tokens, 'plant').subquery()
+    remedies = _like_matches(tokens, 'remedy').subquery()
+    query = (
+        select(literal('plant').label('type'), Plant.id, Plant.name, plants.c.rank)
+        .join(plants, plants.c.entity_id == Plant.id)
+        .union_all(
+            select(literal('remedy'), Remedy.id, Remedy.name, remedies.c.rank)
+            .join(remedies, remedies.c.entity_id == Remedy.id)
+        )
+        .order_by(text('name'))
+        .limit(limit)
+    )
+    return [{"type": entity_type, "id": entity_id, "name": name, "rank": rank}
+            for entity_type, entity_id, name, rank in connection.execute(query)]
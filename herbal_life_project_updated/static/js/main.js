@@ -45,3 +45,13 @@ function filterByCategory(category) {
         }
     });
 }
+
+// Markup for a plant's primary image, offering the AVIF/WebP variants the API
+// lists in image_srcset and falling back to the original file
+function plantPicture(plant, className, sizes = '(max-width: 768px) 100vw, 33vw') {
+    const fallback = plant.image || 'https://via.placeholder.com/500x300?text=No+Image';
+    const sources = Object.entries(plant.image_srcset || {}).map(([format, srcset]) =>
+        `<source type="image/${format}" srcset="${srcset}" sizes="${sizes}">`
+    ).join('');
+    return `<picture>${sources}<img src="${fallback}" class="${className}" alt="${plant.name}" loading="lazy" decoding="async"></picture>`;
+}
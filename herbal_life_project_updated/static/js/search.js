@@ -19,11 +19,11 @@ async function performSearch(searchTerm) {
     }
 
     try {
-        // Use the API endpoint instead of static JSON file
-        const response = await fetch(`/api/plants?search=${encodeURIComponent(searchTerm)}`);
+        // Names only, answered from the server's prefix index
+        const response = await fetch(`/api/suggest?q=${encodeURIComponent(searchTerm)}&limit=5`);
         const data = await response.json();
         
-        if (!data.plants || data.plants.length === 0) {
+        if (!data.suggestions || data.suggestions.length === 0) {
             document.querySelector('.search-results').innerHTML = `
                 <div class="p-3 text-center">
                     <p class="text-muted">No results found for "${searchTerm}"</p>
@@ -32,7 +32,7 @@ async function performSearch(searchTerm) {
             return;
         }
         
-        displaySearchResults(data.plants);
+        displaySearchResults(data.suggestions);
         updateSearchHistory(searchTerm);
     } catch (error) {
         console.error('Error performing search:', error);
@@ -47,24 +47,22 @@ async function performSearch(searchTerm) {
 function displaySearchResults(results) {
     const resultsContainer = document.querySelector('.search-results');
     
-    // Limit to 5 results for quick search
-    const limitedResults = results.slice(0, 5);
+    // Remedies open the remedies page; plants and benefits open the plants page
+    const pageFor = result => result.type === 'remedy' ? '/remedies' : '/plants';
+    const labels = {plant: 'Plant', remedy: 'Remedy', benefit: 'Benefit'};
     
-    resultsContainer.innerHTML = limitedResults.map(plant => `
-        <div class="p-2 border-bottom hover-effect" onclick="window.location.href='/plants'">
-            <h6>${plant.name}</h6>
-            <small class="text-muted">${plant.scientific_name || ''}</small>
+    resultsContainer.innerHTML = results.map(result => `
+        <div class="p-2 border-bottom hover-effect" onclick="window.location.href='${pageFor(result)}'">
+            <h6>${result.name}</h6>
+            <small class="text-muted">${labels[result.type] || ''}</small>
         </div>
     `).join('');
     
-    // Add a "View all results" link if there are more
-    if (results.length > 5) {
-        resultsContainer.innerHTML += `
-            <div class="p-2 text-center">
-                <a href="/plants" class="text-success">View all ${results.length} results</a>
-            </div>
-        `;
-    }
+    resultsContainer.innerHTML += `
+        <div class="p-2 text-center">
+            <a href="/plants" class="text-success">View all plants</a>
+        </div>
+    `;
 }
 
 function updateSearchHistory(searchTerm) {
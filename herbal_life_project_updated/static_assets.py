@@ -0,0 +1,122 @@
+"""
+Fingerprinted static files with far-future caching.
+
+build_assets.py copies every file under static/ to static/dist/ with a hash
+of its content in the name, precompresses the text files with gzip and
+brotli, and records the mapping in static/dist/manifest.json. When that
+manifest is present, url_for('static', filename='css/style.css') returns
+the hashed URL, and the static view serves hashed files as immutable for a
+year, picking the .br or .gz copy the client accepts.
+
+Without a manifest (a fresh checkout, local development) static files are
+served exactly as before. Entries whose source file changed after the build
+are ignored, so an edited stylesheet is never hidden behind a stale copy.
+"""
+import json
+import logging
+import mimetypes
+import os
+from flask import current_app, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+# Directory under the static folder that receives the hashed copies
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+# Hashed URLs change with their content, so they can be cached for good
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Content-Encoding and file suffix of the precompressed copies, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class AssetManifest:
+    """Source path to hashed path mapping loaded from manifest.json"""
+
+    def __init__(self, assets=None):
+        # 'css/style.css' -> 'dist/css/style.0123456789ab.css'
+        self.urls = {}
+        # 'dist/css/style.0123456789ab.css' -> ('br', 'gzip')
+        self.encodings = {}
+        for source, entry in (assets or {}).items():
+            self.urls[source] = entry['path']
+            self.encodings[entry['path']] = tuple(entry.get('encodings', ()))
+
+    def __len__(self):
+        return len(self.urls)
+
+    @classmethod
+    def load(cls, static_folder):
+        """Read the manifest under static_folder, keeping only entries that are still current"""
+        path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as f:
+                assets = json.load(f).get('assets', {})
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read the static asset manifest {path}: {str(e)}")
+            return cls()
+
+        current = {}
+        for source, entry in assets.items():
+            try:
+                stat = os.stat(os.path.join(static_folder, *source.split('/')))
+            except OSError:
+                continue
+            if stat.st_size == entry.get('size') and stat.st_mtime_ns == entry.get('mtime_ns'):
+                current[source] = entry
+        if len(current) < len(assets):
+            logger.warning(f"{len(assets) - len(current)} static files changed since the last build; "
+                           f"run build_assets.py to fingerprint them again")
+        return cls(current)
+
+
+def hashed_url_defaults(endpoint, values):
+    """url_defaults hook: swap the filename of url_for('static') for its hashed copy"""
+    if endpoint != 'static' or 'filename' not in values:
+        return
+    hashed = current_app.extensions['static_assets'].urls.get(values['filename'])
+    if hashed is not None:
+        values['filename'] = hashed
+
+
+def accepted_encoding(available):
+    """The first of the available encodings the request accepts, or None"""
+    for encoding in available:
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def serve_static(filename):
+    """Static view that serves hashed files as immutable, precompressed where possible"""
+    manifest = current_app.extensions['static_assets']
+    available = manifest.encodings.get(filename)
+    if available is None:
+        return current_app.send_static_file(filename)
+
+    encoding = accepted_encoding(available)
+    suffix = dict(ENCODINGS)[encoding] if encoding else ''
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(current_app.static_folder, filename + suffix, mimetype=mimetype,
+                                   max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    if encoding:
+        response.content_encoding = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    """Load the manifest and hook hashed URLs and the static view into the app"""
+    if not app.has_static_folder:
+        return
+    manifest = AssetManifest()
+    if app.config.get("STATIC_FINGERPRINTS", True):
+        manifest = AssetManifest.load(app.static_folder)
+    app.extensions['static_assets'] = manifest
+    if manifest:
+        app.url_defaults(hashed_url_defaults)
+        app.view_functions['static'] = serve_static
+        app.logger.info(f"Serving {len(manifest)} fingerprinted static files")
@@ -0,0 +1,282 @@
+"""
+In-memory prefix index behind the /api/suggest typeahead endpoint.
+
+Plant names and scientific names, remedy names and ingredients, and the
+names of the benefits some plant or remedy links to are indexed from the
+start of every word, so "bas" finds "Holy Basil".
+Each trie node keeps the best few entries of its subtree (matches at the
+start of the name first, then other words of the name, then ingredients and
+the like, shortest key first within each group), which makes a lookup a walk
+down the prefix with no subtree search.
+
+The index is built when a server starts: wsgi.py builds it on import, once
+in the gunicorn master before the workers fork or in each worker without
+preload_app, and the development entry points build it before serving. It
+afterwards follows this process's catalog commits incrementally through
+catalog_events: changed plants and remedies are re-indexed, deleted ones
+removed, and the benefits they link to now or linked to before are
+re-checked, so a deleted, renamed or no longer linked benefit does not
+linger. Writes made by other worker processes are noticed through
+the shared catalog version, read at most every REFRESH_SECONDS by
+suggest(); when it has moved, the index is rebuilt off to the side and
+swapped in, so suggestions lag another worker's writes by REFRESH_SECONDS
+at most.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from sqlalchemy import select
+from app import db
+import catalog_events
+from models import Plant, Remedy, Benefit, Ingredient, plant_benefits, remedy_benefits
+
+logger = logging.getLogger(__name__)
+
+# Entries kept per trie node; bounds the number of suggestions per lookup
+TOP_ENTRIES = 20
+
+
+def normalize(text):
+    """Lower-case word tokens of text joined by single spaces"""
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+def _word_suffixes(text):
+    """Every suffix of the normalized text that starts at a word boundary"""
+    key = normalize(text)
+    if not key:
+        return []
+    suffixes = [key]
+    suffixes.extend(key[match.end():] for match in re.finditer(' ', key))
+    return suffixes
+
+
+class _Node:
+    __slots__ = ('children', 'entries', 'top')
+
+    def __init__(self):
+        self.children = {}
+        # Entries whose key ends at this node, mapped to their priority
+        self.entries = {}
+        # Best (priority, len(key), key, entry) items in this subtree, sorted
+        self.top = []
+
+
+class PrefixIndex:
+    """Prefix trie mapping word-start prefixes to (type, id, name) entries"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._keys = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, entry, texts):
+        """
+        Index entry under every word of texts, replacing any earlier keys for it.
+
+        The first text is the entry's own name and ranks above the others.
+        """
+        with self._lock:
+            self.remove(entry[:2])
+            keys = {}
+            for position, text in enumerate(texts):
+                for offset, suffix in enumerate(_word_suffixes(text)):
+                    priority = 2 if position else min(offset, 1)
+                    keys[suffix] = min(priority, keys.get(suffix, priority))
+            self._keys[entry[:2]] = (entry, keys)
+            for key, priority in keys.items():
+                item = (priority, len(key), key, entry)
+                node = self._root
+                for char in key:
+                    node = node.children.setdefault(char, _Node())
+                    if len(node.top) < TOP_ENTRIES or item < node.top[-1]:
+                        bisect.insort(node.top, item)
+                        del node.top[TOP_ENTRIES:]
+                node.entries[entry] = priority
+
+    def remove(self, identity):
+        """Drop the entry with the given (type, id) identity, if it is indexed"""
+        with self._lock:
+            indexed = self._keys.pop(identity, None)
+            if indexed is None:
+                return
+            entry, keys = indexed
+            for key in keys:
+                path = [self._root]
+                for char in key:
+                    path.append(path[-1].children[char])
+                path[-1].entries.pop(entry, None)
+
+                # Recompute the bounded top lists bottom-up, pruning empty nodes
+                for depth in range(len(key), 0, -1):
+                    node = path[depth]
+                    if not node.entries and not node.children:
+                        del path[depth - 1].children[key[depth - 1]]
+                        continue
+                    prefix = key[:depth]
+                    items = [(priority, depth, prefix, item) for item, priority in node.entries.items()]
+                    for child in node.children.values():
+                        items.extend(child.top)
+                    node.top = sorted(items)[:TOP_ENTRIES]
+
+    def search(self, prefix, limit=10):
+        """Return up to limit distinct entries having a word that starts with prefix"""
+        key = normalize(prefix)
+        if not key:
+            return []
+        with self._lock:
+            node = self._root
+            for char in key:
+                node = node.children.get(char)
+                if node is None:
+                    return []
+            results = []
+            for _, _, _, entry in node.top:
+                if entry not in results:
+                    results.append(entry)
+                    if len(results) == limit:
+                        break
+            return results
+
+    def clear(self):
+        with self._lock:
+            self._root = _Node()
+            self._keys = {}
+
+
+# Seconds between checks of the shared catalog version
+REFRESH_SECONDS = 2
+
+index = PrefixIndex()
+# Benefit ids each indexed ('plant' or 'remedy', id) links to, to find the
+# benefits a change may have orphaned
+_links = {}
+
+_built = False
+_build_lock = threading.Lock()
+# Catalog version the index reflects, and when it was last compared
+_version = None
+_checked_at = 0.0
+
+
+def _load(index, links, connection, plant_ids=None, remedy_ids=None, benefit_ids=()):
+    """
+    Index the given plants and remedies (all of them when ids are None) and
+    the benefits they link to. Benefits in benefit_ids and those the given
+    entities linked to before are re-checked, and dropped if nothing links
+    to them any more.
+    """
+    plants = select(Plant.id, Plant.name, Plant.scientific_name)
+    remedies = select(Remedy.id, Remedy.name)
+    ingredients = select(Ingredient.remedy_id, Ingredient.name)
+    plant_links = select(plant_benefits.c.plant_id, plant_benefits.c.benefit_id)
+    remedy_links = select(remedy_benefits.c.remedy_id, remedy_benefits.c.benefit_id)
+    # Only benefits something links to are worth suggesting
+    benefits = select(Benefit.id, Benefit.name).where(
+        Benefit.id.in_(select(plant_benefits.c.benefit_id)) | Benefit.id.in_(select(remedy_benefits.c.benefit_id))
+    )
+    checked = set(benefit_ids)
+    if plant_ids is not None:
+        plants = plants.where(Plant.id.in_(plant_ids))
+        remedies = remedies.where(Remedy.id.in_(remedy_ids))
+        ingredients = ingredients.where(Ingredient.remedy_id.in_(remedy_ids))
+        plant_links = plant_links.where(plant_benefits.c.plant_id.in_(plant_ids))
+        remedy_links = remedy_links.where(remedy_benefits.c.remedy_id.in_(remedy_ids))
+        for entity_type, ids in (('plant', plant_ids), ('remedy', remedy_ids)):
+            for entity_id in ids:
+                checked |= links.pop((entity_type, entity_id), set())
+
+    for plant_id, name, scientific_name in connection.execute(plants):
+        index.add(('plant', plant_id, name), (name, scientific_name))
+
+    ingredients_by_remedy = {}
+    for remedy_id, name in connection.execute(ingredients):
+        ingredients_by_remedy.setdefault(remedy_id, []).append(name)
+    for remedy_id, name in connection.execute(remedies):
+        index.add(('remedy', remedy_id, name), [name] + ingredients_by_remedy.get(remedy_id, []))
+
+    for entity_type, query in (('plant', plant_links), ('remedy', remedy_links)):
+        for entity_id, benefit_id in connection.execute(query):
+            links.setdefault((entity_type, entity_id), set()).add(benefit_id)
+            checked.add(benefit_id)
+
+    if plant_ids is not None:
+        if not checked:
+            return
+        benefits = benefits.where(Benefit.id.in_(sorted(checked)))
+    for benefit_id, name in connection.execute(benefits):
+        index.add(('benefit', benefit_id, name), (name,))
+        checked.discard(benefit_id)
+    # Deleted, or linked to nothing any more
+    for benefit_id in checked:
+        index.remove(('benefit', benefit_id))
+
+
+def _build():
+    """Load a fresh index and swap it in; the caller holds _build_lock"""
+    global index, _links, _built, _version, _checked_at
+    fresh, links = PrefixIndex(), {}
+    with db.engine.connect() as connection:
+        # Read first: a write committing during the load is seen again next check
+        version = catalog_events.read_version(connection)
+        _load(fresh, links, connection)
+    index, _links, _version, _checked_at, _built = fresh, links, version, time.monotonic(), True
+    logger.info(f"Suggestion index built with {len(index)} entries at catalog version {version}")
+
+
+def ensure_built():
+    """Build the index from the database unless it already is"""
+    if _built:
+        return
+    with _build_lock:
+        if not _built:
+            _build()
+
+
+def refresh():
+    """Rebuild the index if another process changed the catalog since it was built"""
+    global _checked_at
+    if time.monotonic() - _checked_at < REFRESH_SECONDS:
+        return
+    with _build_lock:
+        if time.monotonic() - _checked_at < REFRESH_SECONDS:
+            return
+        # Other threads keep answering from the current index meanwhile
+        _checked_at = time.monotonic()
+        with db.engine.connect() as connection:
+            version = catalog_events.read_version(connection)
+        if version != _version:
+            _build()
+
+
+@catalog_events.on_commit
+def _apply_changes(changes):
+    """Re-index the plants and remedies a commit touched, and the benefits they link or linked to"""
+    global _version
+    if not _built:
+        return
+    with _build_lock:
+        orphaned = set()
+        for entity_type, deleted in (('plant', changes.deleted_plants), ('remedy', changes.deleted_remedies)):
+            for entity_id in deleted:
+                index.remove((entity_type, entity_id))
+                orphaned |= _links.pop((entity_type, entity_id), set())
+        if changes.plants or changes.remedies or orphaned:
+            with db.engine.connect() as connection:
+                _load(index, _links, connection, sorted(changes.plants), sorted(changes.remedies), orphaned)
+        # Current only if no other process wrote in between; otherwise refresh() rebuilds
+        if changes.version is not None and _version is not None and changes.version == _version + 1:
+            _version = changes.version
+
+
+def suggest(prefix, limit=10):
+    """Suggestions for a typeahead prefix as {"id", "name", "type"} dicts"""
+    ensure_built()
+    refresh()
+    return [{"id": entity_id, "name": name, "type": entity_type}
+            for entity_type, entity_id, name in index.search(prefix, limit)]
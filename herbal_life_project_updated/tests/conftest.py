@@ -0,0 +1,84 @@
+"""
+Shared fixtures: one app on a scratch SQLite database for the whole run.
+
+The app modules live one directory up and import each other by module name,
+so that directory goes on sys.path. DATABASE_URL has to be set before
+`from app import app` builds the app.
+
+    cd herbal_life_project_updated && python -m pytest -q tests
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH = tempfile.mkdtemp(prefix="herbal-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'primary.db')}"
+# The tests count and compare database reads; cached responses would skip them
+os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+# Run by post_from_another_process, in a fresh interpreter
+_POST = """
+import json, sys
+from app import create_app
+from replicas import COOKIE_NAME
+
+client = create_app().test_client()
+response = client.post(sys.argv[1], json=json.loads(sys.argv[2]))
+cookie = client.get_cookie(COOKIE_NAME)
+print(json.dumps([response.status_code, cookie.value if cookie else None]))
+"""
+
+
+def post_from_another_process(url, payload):
+    """POST payload to url from a separate process, as another worker would;
+    returns the status code and the read-your-writes cookie, if one was set"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", _POST, url, json.dumps(payload)],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    status, cookie = json.loads(result.stdout.strip().splitlines()[-1])
+    return status, cookie
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app, db
+    import migrations
+
+    with app.app_context():
+        migrations.create_schema(db.engine)
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements the primary engine executes during the test, in order"""
+    from app import db
+
+    log = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield log
+    event.remove(engine, "before_cursor_execute", record)
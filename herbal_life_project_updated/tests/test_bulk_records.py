@@ -0,0 +1,29 @@
+"""Explicit falsy values in bulk records are stored as given"""
+
+
+def test_step_number_zero_is_kept(client):
+    response = client.post("/api/remedies:bulk", json=[{
+        "name": "Bulk zero steps", "short_description": "s", "description": "d", "usage": "u",
+        "preparation_steps": [{"description": "Rinse", "step_number": 0}, {"description": "Boil"}],
+    }])
+    assert response.status_code == 200, response.get_json()
+    remedy_id = response.get_json()["results"][0]["id"]
+
+    steps = client.get(f"/api/remedies/{remedy_id}").get_json()["preparation_steps"]
+    assert [(step["number"], step["description"]) for step in steps] == [(0, "Rinse"), (2, "Boil")]
+
+
+def test_null_is_primary_is_stored_as_false(app, client):
+    from app import db
+    from models import PlantImage
+
+    response = client.post("/api/plants:bulk", json=[{
+        "name": "Bulk null primary", "scientific_name": "Ocimum nullum", "description": "d",
+        "images": [{"url": "/static/images/bulk_null.jpg", "is_primary": None}],
+    }])
+    assert response.status_code == 200, response.get_json()
+    plant_id = response.get_json()["results"][0]["id"]
+
+    with app.app_context():
+        image = db.session.query(PlantImage).filter_by(plant_id=plant_id).one()
+        assert image.is_primary is False
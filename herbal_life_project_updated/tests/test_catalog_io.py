@@ -0,0 +1,32 @@
+"""catalog_io imports reject bad lines with their line number"""
+import json
+import os
+
+import pytest
+
+from conftest import SCRATCH
+
+
+def write_lines(name, records):
+    path = os.path.join(SCRATCH, name)
+    with open(path, "w", encoding="utf-8") as stream:
+        for record in records:
+            stream.write(json.dumps(record) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("record, error", [
+    ({"type": "plant", "scientific_name": "x"}, "name is required"),
+    ({"type": "remedy", "name": "r", "short_description": "s", "description": "d", "usage": "u",
+      "preparation_steps": [{"step_number": 1}]}, "preparation_steps needs a description"),
+    ([1], "Record must be an object"),
+])
+def test_bad_line_is_reported_with_its_number(app, record, error):
+    from catalog_io import import_catalog
+
+    good = {"type": "plant", "name": "Import check", "scientific_name": "Ocimum importum", "description": "d"}
+    path = write_lines("bad.ndjson", [good, record])
+    with app.app_context(), pytest.raises(ValueError) as raised:
+        import_catalog(path)
+    assert str(raised.value).startswith(f"{path}:2: ")
+    assert error in str(raised.value)
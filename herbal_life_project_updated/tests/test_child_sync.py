@@ -0,0 +1,71 @@
+"""PUT /api/plants and /api/remedies rewrite only the child rows that changed"""
+import re
+from collections import Counter
+
+WRITE = re.compile(r'\s*(INSERT INTO|UPDATE|DELETE FROM)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+def writes(statements, table):
+    """{'INSERT INTO': n, 'UPDATE': n, 'DELETE FROM': n} of the statements that write table"""
+    counts = Counter()
+    for statement in statements:
+        match = WRITE.match(statement)
+        if match and match.group(2) == table:
+            counts[match.group(1).upper()] += 1
+    return counts
+
+
+def put(client, statements, url, payload):
+    statements.clear()
+    response = client.put(url, json=payload)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_changing_one_of_twenty_steps_updates_one_row(client, statements):
+    steps = [f"Sync step {i}" for i in range(20)]
+    remedy = client.post("/api/remedies", json={
+        "name": "Sync remedy", "short_description": "s", "description": "d", "usage": "u",
+        "ingredients": ["Water", "Ginger"], "preparation_steps": steps,
+    }).get_json()
+
+    steps[7] = "Sync step 7, stirred"
+    body = put(client, statements, f"/api/remedies/{remedy['id']}", {"preparation_steps": steps})
+
+    assert writes(statements, "preparation_step") == {"UPDATE": 1}
+    assert [step["description"] for step in body["preparation_steps"]] == steps
+
+
+def test_resending_the_same_ingredients_writes_nothing(client, statements):
+    remedy = client.post("/api/remedies", json={
+        "name": "Sync remedy ingredients", "short_description": "s", "description": "d", "usage": "u",
+        "ingredients": ["Water", "Ginger", "Honey"],
+    }).get_json()
+
+    put(client, statements, f"/api/remedies/{remedy['id']}", {"ingredients": ["Water", "Ginger", "Honey"]})
+
+    assert writes(statements, "ingredient") == {}
+
+
+def test_plant_benefits_and_images_change_one_row_each(client, statements):
+    images = [f"/static/images/sync_{i}.jpg" for i in range(5)]
+    plant = client.post("/api/plants", json={
+        "name": "Sync plant", "scientific_name": "Ocimum syncum", "description": "d",
+        "benefits": ["Sync calm", "Sync focus"], "image": images[0], "images": images[1:],
+    }).get_json()
+    url = f"/api/plants/{plant['id']}"
+
+    body = put(client, statements, url, {"benefits": ["Sync calm", "Sync focus", "Sync sleep"]})
+    assert writes(statements, "plant_benefits") == {"INSERT INTO": 1}
+    assert sorted(body["benefits"]) == ["Sync calm", "Sync focus", "Sync sleep"]
+
+    put(client, statements, url, {"benefits": ["Sync calm", "Sync sleep"]})
+    assert writes(statements, "plant_benefits") == {"DELETE FROM": 1}
+
+    body = put(client, statements, url, {"images": images[1:] + ["/static/images/sync_new.jpg"]})
+    assert writes(statements, "plant_image") == {"INSERT INTO": 1}
+    assert body["images"] == images + ["/static/images/sync_new.jpg"]
+
+    body = put(client, statements, url, {"images": images[1:3] + images[4:] + ["/static/images/sync_new.jpg"]})
+    assert writes(statements, "plant_image") == {"DELETE FROM": 1}
+    assert body["images"] == images[:3] + images[4:] + ["/static/images/sync_new.jpg"]
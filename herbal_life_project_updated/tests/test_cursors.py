@@ -0,0 +1,47 @@
+"""Malformed or mismatched list cursors are rejected with a 400"""
+import base64
+import json
+
+from catalog_generator import load_catalog
+
+
+def cursor(values):
+    raw = json.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def test_next_cursor_walks_every_page(app, client):
+    with app.app_context():
+        load_catalog(20, 20, seed=1)
+    expected = [plant["id"] for plant in client.get("/api/plants?fields=id").get_json()["plants"]]
+
+    seen, url = [], "/api/plants?fields=id&limit=7"
+    while url:
+        body = client.get(url).get_json()
+        seen += [plant["id"] for plant in body["plants"]]
+        url = body["next_cursor"] and f"/api/plants?fields=id&limit=7&cursor={body['next_cursor']}"
+    assert seen == expected
+
+
+def test_bad_cursors_are_rejected(app, client):
+    with app.app_context():
+        load_catalog(20, 20, seed=1)
+    by_name = client.get("/api/plants?fields=id&limit=1").get_json()["next_cursor"]
+    by_rank = client.get("/api/plants?fields=id&limit=1&search=ayurvedic").get_json()["next_cursor"]
+    assert by_name and by_rank
+
+    bad = [
+        "/api/plants?cursor=not-base64!",
+        f"/api/plants?cursor={cursor([[], []])}",
+        f"/api/plants?cursor={cursor(['name', [], []])}",
+        f"/api/plants?cursor={cursor(['name', 'Basil', 'x'])}",
+        f"/api/plants?cursor={cursor(['name', 'Basil', True])}",
+        f"/api/plants?cursor={cursor(['name', 'Basil'])}",
+        f"/api/remedies?cursor={cursor(['rank', 'Basil', 1])}",
+        f"/api/plants?search=ayurvedic&cursor={by_name}",
+        f"/api/plants?cursor={by_rank}",
+    ]
+    for url in bad:
+        response = client.get(url)
+        assert response.status_code == 400, url
+        assert "cursor" in response.get_json()["error"].lower(), url
@@ -0,0 +1,43 @@
+"""The catalog read endpoints issue a fixed number of queries, whatever the catalog size"""
+from catalog_generator import load_catalog
+
+N = 20
+
+URLS = [
+    "/api/plants",
+    "/api/remedies",
+    "/api/plants?limit=5",
+    "/api/remedies?limit=5&facets=category,benefit,ingredient",
+    "/api/plants?limit=5&fields=name,benefits,images",
+    "/api/remedies?limit=5&fields=name,ingredients,preparation_steps,doctor",
+    "/api/plants/{plant_id}",
+    "/api/remedies/{remedy_id}",
+]
+
+
+def query_counts(client, statements):
+    ids = {
+        "plant_id": client.get("/api/plants?limit=1&fields=id").get_json()["plants"][0]["id"],
+        "remedy_id": client.get("/api/remedies?limit=1&fields=id").get_json()["remedies"][0]["id"],
+    }
+    counts = {}
+    for url in URLS:
+        statements.clear()
+        response = client.get(url.format(**ids))
+        assert response.status_code == 200, url
+        counts[url] = len(statements)
+    return counts
+
+
+def test_query_counts_do_not_grow_with_the_catalog(app, client, statements):
+    with app.app_context():
+        load_catalog(N, N, seed=1)
+    small = query_counts(client, statements)
+
+    # Same seed: the first N records already exist, the other 9N are added
+    with app.app_context():
+        load_catalog(10 * N, 10 * N, seed=1)
+    large = query_counts(client, statements)
+
+    assert large == small
+    assert all(count > 0 for count in small.values())
@@ -0,0 +1,28 @@
+"""Cached catalog responses follow writes made by other worker processes"""
+import response_cache
+from conftest import post_from_another_process
+
+URL = "/api/remedies?search=Cachefresh&fields=name"
+
+
+def names(response):
+    assert response.status_code == 200
+    return {remedy["name"] for remedy in response.get_json()["remedies"]}
+
+
+def test_write_on_another_worker_invalidates_the_cache(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "REFRESH_SECONDS", 0)
+    response_cache.cache.clear()
+
+    assert names(client.get(URL)) == set()
+    hits = response_cache.cache.hits
+    assert names(client.get(URL)) == set()
+    assert response_cache.cache.hits == hits + 1
+
+    status, _ = post_from_another_process("/api/remedies", {
+        "name": "Cachefresh tonic", "short_description": "s", "description": "d", "usage": "u",
+    })
+    assert status == 201
+
+    assert names(client.get(URL)) == {"Cachefresh tonic"}
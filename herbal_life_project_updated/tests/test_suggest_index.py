@@ -0,0 +1,43 @@
+"""The suggestion index follows renames and deletions, not only additions"""
+
+
+def suggestions(client, prefix):
+    response = client.get(f"/api/suggest?q={prefix}&limit=20")
+    assert response.status_code == 200
+    return {(item["type"], item["name"]) for item in response.get_json()["suggestions"]}
+
+
+def test_renamed_and_deleted_entries_disappear(app, client):
+    plant = client.post("/api/plants", json={
+        "name": "Suggestwort", "scientific_name": "Herba suggesta", "description": "d",
+        "benefits": ["Suggestcalm", "Suggestfocus"],
+    }).get_json()
+    url = f"/api/plants/{plant['id']}"
+    assert suggestions(client, "suggest") >= {
+        ("plant", "Suggestwort"), ("benefit", "Suggestcalm"), ("benefit", "Suggestfocus")}
+
+    client.put(url, json={"name": "Suggestleaf", "benefits": ["Suggestcalm"]})
+    found = suggestions(client, "suggest")
+    assert ("plant", "Suggestleaf") in found
+    assert ("plant", "Suggestwort") not in found
+    # Still in the benefit table, but nothing links to it any more
+    assert ("benefit", "Suggestfocus") not in found
+
+    assert client.delete(url).status_code == 200
+    assert not {name for _, name in suggestions(client, "suggest")} & {"Suggestleaf", "Suggestcalm"}
+
+
+def test_deleted_benefit_disappears(app, client):
+    from app import db
+    from models import Benefit
+
+    client.post("/api/remedies", json={
+        "name": "Suggest tonic", "short_description": "s", "description": "d", "usage": "u",
+        "benefits": ["Suggestgone"],
+    })
+    assert ("benefit", "Suggestgone") in suggestions(client, "suggestgone")
+
+    with app.app_context():
+        db.session.delete(Benefit.query.filter_by(name="Suggestgone").one())
+        db.session.commit()
+    assert suggestions(client, "suggestgone") == set()
@@ -0,0 +1,85 @@
+"""
+Concurrency-safe get-or-create for the tables keyed by a unique name
+(benefits, plant and remedy categories).
+
+A SELECT followed by an INSERT of the missing names races with other
+workers doing the same: the loser hits the unique constraint and its whole
+transaction rolls back. On SQLite and PostgreSQL the missing names are
+instead written with INSERT ... ON CONFLICT (name) DO NOTHING RETURNING,
+one statement per batch, and any name another transaction created in the
+meantime is read back afterwards. Existing names are not updated, so rows
+other requests also use are never locked. Other databases fall back to one
+SAVEPOINT per missing name.
+"""
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+# Names per statement, well under the bound parameter limits
+BATCH_SIZE = 500
+
+_DIALECT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _columns(model, entities):
+    return (model,) if entities else (model.id, model.name)
+
+
+def _store(found, rows, entities):
+    if entities:
+        found.update((instance.name, instance) for instance in rows)
+    else:
+        found.update((name, row_id) for row_id, name in rows)
+
+
+def _fetch(session, model, names, entities):
+    found = {}
+    for start in range(0, len(names), BATCH_SIZE):
+        query = select(*_columns(model, entities)).where(model.name.in_(names[start:start + BATCH_SIZE]))
+        _store(found, session.scalars(query) if entities else session.execute(query), entities)
+    return found
+
+
+def _insert_ignoring_conflicts(session, model, names, entities):
+    """Insert names, skipping existing ones; returns what was inserted in the same format"""
+    dialect_insert = _DIALECT_INSERTS.get(session.get_bind().dialect.name)
+    inserted = {}
+    if dialect_insert is None:
+        for name in names:
+            try:
+                with session.begin_nested():
+                    session.execute(insert(model).values(name=name))
+            except IntegrityError:
+                # Created by a concurrent transaction; read back below
+                continue
+        return inserted
+    for start in range(0, len(names), BATCH_SIZE):
+        statement = (
+            dialect_insert(model)
+            .values([{"name": name} for name in names[start:start + BATCH_SIZE]])
+            .on_conflict_do_nothing(index_elements=[model.name])
+            .returning(*_columns(model, entities))
+        )
+        _store(inserted, session.scalars(statement) if entities else session.execute(statement), entities)
+    return inserted
+
+
+def get_or_create_names(session, model, names, entities=False, known_missing=False):
+    """
+    {name: id} of the model rows called names, creating the missing ones.
+
+    With entities=True the values are ORM instances instead of ids. Callers
+    that keep their own cache of existing names pass known_missing=True to
+    skip the initial lookup. Empty names and repeats are ignored.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    if not names:
+        return {}
+    found = {} if known_missing else _fetch(session, model, names, entities)
+    missing = [name for name in names if name not in found]
+    if missing:
+        found.update(_insert_ignoring_conflicts(session, model, missing, entities))
+        raced = [name for name in missing if name not in found]
+        if raced:
+            found.update(_fetch(session, model, raced, entities))
+    return found
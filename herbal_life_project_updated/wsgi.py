@@ -0,0 +1,20 @@
+"""
+WSGI entry point for production servers
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app (the default in gunicorn.conf.py) this module is imported
+once in the gunicorn master before the workers are forked, so the app, the
+imported modules and the suggestion index are built a single time and
+shared copy-on-write by every worker. gunicorn.conf.py gives each worker its
+own database connections after the fork.
+"""
+from app import app, db
+import suggest_index
+
+# Warm the in-memory state the workers would otherwise each build on their
+# first request
+with app.app_context():
+    suggest_index.ensure_built()
+    for engine in db.engines.values():
+        engine.dispose()